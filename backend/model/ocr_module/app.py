@@ -4,11 +4,26 @@ Flask API for OCR Receipt Extraction Service
 Provides REST API endpoints for receipt OCR processing
 """
 
-from flask import Flask, request, jsonify
+import time
+_import_start = time.perf_counter()
+
+from flask import Flask, request, jsonify, g
+import gc
+import json
 import os
 import tempfile
-from werkzeug.utils import secure_filename
+import threading
 from receipt_extractor import ReceiptExtractor
+from ocr_backends import OCR_BACKEND
+from utils.validation import validate_receipt_data
+import metrics
+from jobs import OCRJobQueue, QueueFullError, create_job_store
+from cache import ResultCache
+from models import BatchItemResult
+
+# OCR engines, OpenCV and NumPy are imported lazily, so this stays in milliseconds
+IMPORT_SECONDS = time.perf_counter() - _import_start
+print(f"OCR API modules imported in {IMPORT_SECONDS * 1000:.0f} ms (OCR backend: {OCR_BACKEND or 'none'})")
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -16,31 +31,236 @@ app = Flask(__name__)
 # Configuration
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'tiff'}
+MAX_BATCH_FILES = int(os.getenv('OCR_MAX_BATCH_FILES', '20'))
+OCR_BATCH_SIZE = int(os.getenv('OCR_BATCH_SIZE', '8'))
+OCR_JOB_QUEUE_SIZE = int(os.getenv('OCR_JOB_QUEUE_SIZE', '32'))
+OCR_JOB_STORE = os.getenv('OCR_JOB_STORE', 'memory')  # 'memory' or 'sqlite'
+OCR_JOB_DB = os.getenv('OCR_JOB_DB', os.path.join(tempfile.gettempdir(), 'ocr_jobs.db'))
+OCR_JOB_TTL = float(os.getenv('OCR_JOB_TTL', '3600'))
+OCR_CACHE_ENABLED = os.getenv('OCR_CACHE_ENABLED', 'true').lower() == 'true'
+OCR_CACHE_SIZE = int(os.getenv('OCR_CACHE_SIZE', '256'))
+OCR_CACHE_TTL = float(os.getenv('OCR_CACHE_TTL', '86400'))
+OCR_CACHE_DB = os.getenv('OCR_CACHE_DB')  # optional SQLite tier, e.g. /tmp/ocr_cache.db
+# Build and warm the extractor at import time (gunicorn preload_app shares it with forked workers)
+OCR_PRELOAD = os.getenv('OCR_PRELOAD', 'false').lower() == 'true'
+
+# Initialize result cache (singleton, shared by every extractor in the process)
+result_cache = None
+
+def get_result_cache():
+    """Lazy initialization of the result cache (None when disabled)"""
+    global result_cache
+    if result_cache is None and OCR_CACHE_ENABLED:
+        result_cache = ResultCache(max_entries=OCR_CACHE_SIZE, ttl_seconds=OCR_CACHE_TTL, db_path=OCR_CACHE_DB)
+        print(f"OCR result cache initialized (entries: {OCR_CACHE_SIZE}, TTL: {OCR_CACHE_TTL}s, disk: {OCR_CACHE_DB or 'off'})")
+    return result_cache
 
 # Initialize OCR extractor (singleton)
 extractor = None
+extractor_init_seconds = None
+
+# Readiness: set once the extractor is built and has run a warmup inference
+extractor_ready = False
+warmup_seconds = None
+_extractor_lock = threading.Lock()
+_warmup_lock = threading.Lock()
+_warmup_thread_lock = threading.Lock()
+_warmup_thread = None
+# The OCR engines and the extractor's per-image state are not thread-safe: requests and the job worker
+# of this process take turns on the extractor, one OCR at a time (scale out with GUNICORN_WORKERS)
+_ocr_lock = threading.Lock()
 
 def get_extractor():
     """Lazy initialization of OCR extractor"""
     global extractor
     if extractor is None:
-        use_gpu = os.getenv('USE_GPU', 'false').lower() == 'true'
-        lang = os.getenv('OCR_LANG', 'th')
-        extractor = ReceiptExtractor(use_gpu=use_gpu, lang=lang)
-        print(f"OCR Extractor initialized (GPU: {use_gpu}, Language: {lang})")
+        with _extractor_lock:
+            if extractor is None:
+                extractor = create_extractor()
     return extractor
 
+def create_extractor():
+    """Create a new OCR extractor from the environment configuration"""
+    global extractor_init_seconds
+    use_gpu = os.getenv('USE_GPU', 'false').lower() == 'true'
+    lang = os.getenv('OCR_LANG', 'th')
+    start = time.perf_counter()
+    ocr = ReceiptExtractor(use_gpu=use_gpu, lang=lang, result_cache=get_result_cache())
+    init_seconds = time.perf_counter() - start
+    extractor_init_seconds = init_seconds
+    metrics.set_extractor_init_time(init_seconds)
+    print(f"OCR Extractor initialized in {init_seconds:.2f}s (GPU: {use_gpu}, Language: {lang})")
+    return ocr
+
+def warm_up_extractor(fork_safe=False):
+    """Build the extractor and run a dummy inference once (thread-safe)"""
+    global extractor_ready, warmup_seconds
+    with _warmup_lock:
+        if extractor_ready:
+            return
+        ocr = get_extractor()
+        with _ocr_lock:
+            warmup_seconds = ocr.warm_up(fork_safe=fork_safe)
+        extractor_ready = True
+        print(f"OCR Extractor warmed up in {warmup_seconds:.2f}s")
+
+def start_background_warmup():
+    """Warm the extractor of this worker in the background (non-preload mode)"""
+    global _warmup_thread
+    with _warmup_thread_lock:
+        if _warmup_thread is None and not extractor_ready:
+            _warmup_thread = threading.Thread(target=_background_warmup, name='ocr-warmup', daemon=True)
+            _warmup_thread.start()
+
+def _background_warmup():
+    global _warmup_thread
+    try:
+        warm_up_extractor()
+    except Exception as e:
+        print(f"OCR Extractor warmup failed: {e}")
+        # Allow the next /ready call to retry
+        _warmup_thread = None
+
+def preload_extractor():
+    """Build and warm the extractor in the gunicorn master before workers fork
+
+    Forked workers share the model weights copy-on-write. gc.freeze() moves every
+    object allocated so far out of the collector's reach so that garbage collection
+    in a worker does not write to (and thereby copy) the shared pages.
+    """
+    if os.getenv('USE_GPU', 'false').lower() == 'true':
+        # CUDA contexts do not survive fork; every worker loads its own model instead
+        print("OCR_PRELOAD ignored with USE_GPU=true, workers load the model on demand")
+        return
+    warm_up_extractor(fork_safe=True)
+    gc.freeze()
+
+def on_worker_forked():
+    """Per-worker setup after forking from a preloaded master (see gunicorn.conf.py)"""
+    if result_cache is not None:
+        result_cache.reopen_after_fork()
+    if extractor_init_seconds is not None:
+        metrics.set_extractor_init_time(extractor_init_seconds)
+
+# Initialize async job queue (singleton)
+job_queue = None
+
+def observe_job_metrics(job, ocr):
+    """Record the stage timings of a finished queued job"""
+    observe_extraction_metrics(ocr)
+
+def observe_extraction_metrics(ocr):
+    """Record the stage timings and decisions of the last extraction"""
+    metrics.observe_stages(ocr.timer.stages)
+    metrics.observe_region(ocr.last_region)
+    metrics.observe_resize(ocr.last_resize)
+    metrics.observe_qr(ocr.last_qr)
+    metrics.observe_engine_profile(ocr.last_engine_profile)
+    metrics.observe_regex(ocr.last_regex)
+
+def get_job_queue():
+    """Lazy initialization of the async OCR job queue"""
+    global job_queue
+    if job_queue is None:
+        store = create_job_store(OCR_JOB_STORE, db_path=OCR_JOB_DB, ttl_seconds=OCR_JOB_TTL)
+        job_queue = OCRJobQueue(
+            extractor_factory=get_extractor,
+            store=store,
+            max_queue_size=OCR_JOB_QUEUE_SIZE,
+            on_finished=observe_job_metrics,
+            extractor_lock=_ocr_lock
+        )
+        print(f"OCR job queue initialized (queue size: {OCR_JOB_QUEUE_SIZE}, store: {OCR_JOB_STORE})")
+    return job_queue
+
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def read_upload(file):
+    """Read an upload into memory, recording the read stage"""
+    start = time.perf_counter()
+    data = file.read()
+    elapsed = time.perf_counter() - start
+    metrics.observe_stage('upload_read', elapsed)
+
+    # Kept for the optional timing profile of this request
+    g.upload_stages = {'upload_read': round(elapsed * 1000, 2)}
+    return data
+
+def decode_upload(data, ocr):
+    """Decode an upload once for every OCR stage (only after a result cache miss)"""
+    start = time.perf_counter()
+    image = ocr.decode(data)
+    elapsed = time.perf_counter() - start
+    metrics.observe_stage('decode', elapsed)
+    g.upload_stages['decode'] = round(elapsed * 1000, 2)
+    return image
+
+def profiling_requested(ocr):
+    """Whether to attach a timing profile (?profile=true or OCR_PROFILE)"""
+    flag = request.args.get('profile')
+    if flag is None:
+        return ocr.profile
+    return flag.lower() in ('1', 'true', 'yes')
+
+def finish_profile(profile):
+    """Add the upload stages to an extractor profile and log it as one line"""
+    stages = dict(g.get('upload_stages', {}))
+    stages.update(profile['stages_ms'])
+    profile['stages_ms'] = stages
+    profile['total_ms'] = round(sum(stages.values()), 2)
+    print(f"[OCR profile] {json.dumps(profile, ensure_ascii=False)}")
+    return profile
+
+def _metrics_endpoint():
+    """Route pattern used as the endpoint label (bounded cardinality)"""
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+@app.before_request
+def start_request_metrics():
+    if request.path == '/metrics':
+        return
+    g.metrics_start = time.perf_counter()
+    g.metrics_endpoint = _metrics_endpoint()
+    metrics.request_started(g.metrics_endpoint)
+
+@app.after_request
+def finish_request_metrics(response):
+    start = g.pop('metrics_start', None)
+    if start is not None:
+        metrics.request_finished(g.metrics_endpoint, response.status_code, time.perf_counter() - start)
+    return response
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
         'service': 'ocr-api',
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'ocr_backend': OCR_BACKEND,
+        'extractor_loaded': extractor is not None
+    }), 200
+
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness endpoint: 200 only once the extractor is loaded and warmed up"""
+    if not extractor_ready:
+        if not OCR_PRELOAD:
+            start_background_warmup()
+        return jsonify({
+            'ready': False,
+            'status': 'warming_up',
+            'preloaded': OCR_PRELOAD
+        }), 503
+
+    return jsonify({
+        'ready': True,
+        'preloaded': OCR_PRELOAD,
+        'init_seconds': round(extractor_init_seconds, 2) if extractor_init_seconds is not None else None,
+        'warmup_seconds': round(warmup_seconds, 2),
+        'pid': os.getpid()
     }), 200
 
 @app.route('/extract', methods=['POST'])
@@ -50,6 +270,8 @@ def extract_receipt():
 
     Request:
         - file: Image file (multipart/form-data)
+        - validate: Optional query flag to validate the extracted data
+        - profile: Optional query flag to include per-stage timings
 
     Response:
         - JSON with extracted receipt data
@@ -78,35 +300,253 @@ def extract_receipt():
         }), 400
 
     try:
-        # Save file temporarily
-        filename = secure_filename(file.filename)
-        temp_dir = tempfile.gettempdir()
-        temp_path = os.path.join(temp_dir, filename)
-        file.save(temp_path)
-
-        # Extract receipt data
         ocr = get_extractor()
-        result = ocr.extract_to_dict(temp_path)
 
-        # Clean up temporary file
-        os.remove(temp_path)
+        # Look the raw upload bytes up in the result cache before decoding anything
+        data = read_upload(file)
+        cache_key = ocr.cache_key(data)
+        profile = profiling_requested(ocr)
+        with _ocr_lock:
+            result = ocr.cached_result(cache_key, profile=profile)
+            if result is not None:
+                observe_extraction_metrics(ocr)
+
+        if result is None:
+            # Decode the upload buffer straight into memory (no temp file)
+            image = decode_upload(data, ocr)
+            if image is None:
+                return jsonify({
+                    'error': 'Invalid image',
+                    'message': 'The uploaded file could not be decoded as an image'
+                }), 400
+
+            with _ocr_lock:
+                result = ocr.extract_receipt_data(image, cache_key=cache_key, profile=profile, check_cache=False)
+                observe_extraction_metrics(ocr)
+        if result.profile is not None:
+            finish_profile(result.profile)
+
+        response = {
+            'success': True,
+            'data': result.to_dict(),
+            'cache_hit': result.cache_hit
+        }
+
+        # Optional validation (?validate=true)
+        if request.args.get('validate', 'false').lower() == 'true':
+            start = time.perf_counter()
+            response['validation'] = validate_receipt_data(response['data']).to_dict()
+            metrics.observe_stage('validation', time.perf_counter() - start)
 
         # Return result
+        return jsonify(response), 200
+
+    except Exception as e:
         return jsonify({
-            'success': True,
-            'data': result
-        }), 200
+            'error': 'Extraction failed',
+            'message': str(e)
+        }), 500
+
+@app.route('/extract/batch', methods=['POST'])
+def extract_receipt_batch():
+    """
+    Extract receipt data from several uploaded images
+
+    Request:
+        - files: Image files (multipart/form-data, repeated field)
+
+    Response:
+        - JSON with one result per file, in upload order
+    """
+    files = request.files.getlist('files')
+    if not files:
+        return jsonify({
+            'error': 'No files provided',
+            'message': 'Please upload one or more image files in the "files" field'
+        }), 400
+
+    if len(files) > MAX_BATCH_FILES:
+        return jsonify({
+            'error': 'Too many files',
+            'message': f'Maximum {MAX_BATCH_FILES} files per batch'
+        }), 400
 
+    try:
+        ocr = get_extractor()
     except Exception as e:
-        # Clean up on error
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        return jsonify({
+            'error': 'Extraction failed',
+            'message': str(e)
+        }), 500
 
+    # Validate and read every upload, keeping per-item errors
+    errors = {}
+    uploads = []  # (index, raw bytes)
+    for idx, file in enumerate(files):
+        if file.filename == '':
+            errors[idx] = 'No file selected'
+        elif not allowed_file(file.filename):
+            errors[idx] = f'Invalid file type. Allowed file types: {", ".join(ALLOWED_EXTENSIONS)}'
+        else:
+            uploads.append((idx, read_upload(file)))
+
+    items = {}
+    try:
+        cache_keys = [ocr.cache_key(data, batch=True) for _, data in uploads]
+        with _ocr_lock:
+            cached = [ocr.cached_result(key, profile=False) for key in cache_keys]
+
+        # Decode only the uploads the result cache could not answer
+        images = []
+        positions = []
+        miss_keys = []
+        for (idx, data), key, result in zip(uploads, cache_keys, cached):
+            if result is not None:
+                items[idx] = BatchItemResult(index=idx, result=result)
+                continue
+            image = decode_upload(data, ocr)
+            if image is None:
+                errors[idx] = 'The uploaded file could not be decoded as an image'
+            else:
+                images.append(image)
+                positions.append(idx)
+                miss_keys.append(key)
+
+        with _ocr_lock:
+            batch_items = ocr.extract_many(images, batch_size=OCR_BATCH_SIZE, cache_keys=miss_keys,
+                                           check_cache=False) if images else []
+        items.update(zip(positions, batch_items))
+        for item in batch_items:
+            if item.result is not None and item.result.ocr_path:
+                metrics.observe_engine_profile(item.result.ocr_path.get('engine_profile'))
+    except Exception as e:
         return jsonify({
             'error': 'Extraction failed',
             'message': str(e)
         }), 500
 
+    results = [None] * len(files)
+    for idx, message in errors.items():
+        results[idx] = {'index': idx, 'success': False, 'error': message}
+    for idx, item in items.items():
+        item_dict = item.to_dict()
+        item_dict['index'] = idx
+        results[idx] = item_dict
+
+    for idx, file in enumerate(files):
+        results[idx]['filename'] = file.filename
+
+    return jsonify({
+        'success': True,
+        'count': len(results),
+        'results': results
+    }), 200
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """
+    Queue receipt extraction for an uploaded image
+
+    Request:
+        - file: Image file (multipart/form-data)
+
+    Response:
+        - 202 with the job id, or 429 with Retry-After when the queue is full
+    """
+    if 'file' not in request.files:
+        return jsonify({
+            'error': 'No file provided',
+            'message': 'Please upload an image file'
+        }), 400
+
+    file = request.files['file']
+
+    if file.filename == '':
+        return jsonify({
+            'error': 'No file selected',
+            'message': 'Please select a file to upload'
+        }), 400
+
+    if not allowed_file(file.filename):
+        return jsonify({
+            'error': 'Invalid file type',
+            'message': f'Allowed file types: {", ".join(ALLOWED_EXTENSIONS)}'
+        }), 400
+
+    ocr = get_extractor()
+    data = read_upload(file)
+    cache_key = ocr.cache_key(data)
+    with _ocr_lock:
+        cached = ocr.cached_result(cache_key, profile=False)
+
+    # A cached result needs neither a decode nor a queue slot
+    image = None
+    if cached is None:
+        image = decode_upload(data, ocr)
+        if image is None:
+            return jsonify({
+                'error': 'Invalid image',
+                'message': 'The uploaded file could not be decoded as an image'
+            }), 400
+
+    try:
+        if cached is not None:
+            job = get_job_queue().add_done(cached.to_dict())
+        else:
+            job = get_job_queue().submit(image, cache_key=cache_key, check_cache=False)
+    except QueueFullError as e:
+        response = jsonify({
+            'error': 'Queue full',
+            'message': 'Too many pending OCR jobs, please retry later',
+            'retry_after': e.retry_after
+        })
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
+
+    return jsonify({
+        'success': True,
+        'job_id': job.job_id,
+        'status': job.status,
+        'status_url': f'/jobs/{job.job_id}'
+    }), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get status and result of an async OCR job"""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({
+            'error': 'Job not found',
+            'message': f'No OCR job with id {job_id}'
+        }), 404
+
+    return jsonify({
+        'success': True,
+        'data': job.to_dict()
+    }), 200
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Result cache hit/miss counters"""
+    cache = get_result_cache()
+    if cache is None:
+        return jsonify({'enabled': False}), 200
+
+    stats = cache.stats()
+    stats['enabled'] = True
+    return jsonify(stats), 200
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus metrics (aggregated across gunicorn workers)"""
+    body, content_type = metrics.render_metrics()
+    if body is None:
+        return jsonify({
+            'error': 'Metrics unavailable',
+            'message': 'prometheus-client is not installed'
+        }), 503
+    return body, 200, {'Content-Type': content_type}
+
 @app.route('/', methods=['GET'])
 def index():
     """API information endpoint"""
@@ -115,7 +555,13 @@ def index():
         'version': '1.0.0',
         'endpoints': {
             '/health': 'Health check',
+            '/ready': 'Readiness check (503 until the OCR model is loaded and warmed up)',
             '/extract': 'Extract receipt data (POST with image file)',
+            '/extract/batch': 'Extract receipt data from several images (POST with "files" fields)',
+            '/jobs': 'Queue receipt extraction (POST with image file), returns a job id',
+            '/jobs/<job_id>': 'Status and result of a queued extraction',
+            '/cache/stats': 'Result cache hit/miss counters',
+            '/metrics': 'Prometheus metrics',
         }
     }), 200
 
@@ -143,6 +589,9 @@ def internal_error(error):
         'message': 'An unexpected error occurred'
     }), 500
 
+if OCR_PRELOAD:
+    preload_extractor()
+
 if __name__ == '__main__':
     # For development only
     app.run(host='0.0.0.0', port=8000, debug=True)
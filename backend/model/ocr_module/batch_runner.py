@@ -0,0 +1,193 @@
+"""
+Parallel batch extraction for extract_receipt.py
+Processes a directory, glob or manifest of images with a pool of worker processes,
+each holding its own warm ReceiptExtractor, and streams JSONL results as they finish.
+"""
+import glob
+import json
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, TextIO
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff'}
+
+# Extractor of the current worker process (built once by the pool initializer)
+_worker_extractor = None
+
+
+def is_batch_input(image_path: Optional[str]) -> bool:
+    """Check if the CLI input is a directory or a glob pattern rather than one image"""
+    # An existing file is one image even when its name has glob characters (slip[1].jpg)
+    if not image_path or os.path.isfile(image_path):
+        return False
+    return os.path.isdir(image_path) or glob.has_magic(image_path)
+
+
+def collect_images(image_path: Optional[str] = None, manifest: Optional[str] = None) -> List[str]:
+    """Resolve a directory, glob pattern and/or manifest file into image paths
+
+    The manifest holds one image path per line, or JSON lines with an "image_path" key.
+    Relative manifest entries are resolved against the manifest directory.
+    """
+    paths: List[str] = []
+
+    if image_path:
+        if os.path.isdir(image_path):
+            for root, _, files in os.walk(image_path):
+                for name in files:
+                    if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                        paths.append(os.path.join(root, name))
+        elif glob.has_magic(image_path) and not os.path.isfile(image_path):
+            paths.extend(
+                p for p in glob.glob(image_path, recursive=True)
+                if os.path.splitext(p)[1].lower() in IMAGE_EXTENSIONS
+            )
+        else:
+            paths.append(image_path)
+
+    if manifest:
+        base_dir = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                if line.startswith('{'):
+                    line = json.loads(line).get('image_path', '')
+                if line:
+                    paths.append(line if os.path.isabs(line) else os.path.join(base_dir, line))
+
+    return sorted(set(paths))
+
+
+def _init_worker(use_gpu: bool, lang: str) -> None:
+    """Pool initializer: build this worker's extractor once"""
+    global _worker_extractor
+    # Keep stdout for JSONL results; extractor log prints go to stderr
+    sys.stdout = sys.stderr
+    from receipt_extractor import ReceiptExtractor
+    _worker_extractor = ReceiptExtractor(use_gpu=use_gpu, lang=lang)
+
+
+def _process_image(image_path: str) -> Dict:
+    """Extract one image with the worker's extractor"""
+    start = time.perf_counter()
+    record = {'image_path': image_path}
+    _worker_extractor.timer.reset()
+    try:
+        if not os.path.exists(image_path):
+            raise FileNotFoundError(f"Image file '{image_path}' not found")
+        record['data'] = _worker_extractor.extract_to_dict(image_path)
+        record['success'] = True
+    except Exception as e:
+        record['success'] = False
+        record['error'] = str(e)
+
+    record['timings'] = _worker_extractor.timer.to_dict()
+    record['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 2)
+    return record
+
+
+def _error_record(image_path: str, error: str) -> Dict:
+    """Result line of an image that never reached an extractor"""
+    return {'image_path': image_path, 'success': False, 'error': error, 'elapsed_ms': 0.0}
+
+
+def run_batch(image_paths: List[str], jobs: int = 1, use_gpu: bool = False, lang: str = 'th',
+              out: Optional[TextIO] = None, verbose: bool = False) -> Dict:
+    """Extract every image and stream one JSON line per result as it finishes
+
+    Args:
+        image_paths: Images to process
+        jobs: Number of worker processes (1 runs in-process)
+        use_gpu: Whether to use GPU acceleration
+        lang: Language for OCR
+        out: Output stream for JSONL results (defaults to stdout)
+        verbose: Print progress to stderr
+
+    Returns:
+        Throughput summary. When an extractor cannot be built every image not
+        processed yet gets an error line, so the output covers every input.
+    """
+    out = out or sys.stdout
+    stage_totals: Dict[str, float] = {}
+    succeeded = 0
+    failed = 0
+    start = time.perf_counter()
+
+    def _emit(record: Dict) -> None:
+        nonlocal succeeded, failed
+        if record['success']:
+            succeeded += 1
+        else:
+            failed += 1
+        for stage, ms in record.get('timings', {}).items():
+            stage_totals[stage] = stage_totals.get(stage, 0.0) + ms
+        out.write(json.dumps(record, ensure_ascii=False) + '\n')
+        out.flush()
+        if verbose:
+            print(f"[{succeeded + failed}/{len(image_paths)}] {record['image_path']} "
+                  f"({record['elapsed_ms']:.0f} ms)", file=sys.stderr)
+
+    init_start = time.perf_counter()
+    if jobs <= 1:
+        with redirect_stdout(sys.stderr):
+            try:
+                _init_worker(use_gpu, lang)
+            except Exception as e:
+                init_error = f"OCR extractor could not be initialized: {e}"
+            else:
+                init_error = None
+            init_seconds = time.perf_counter() - init_start
+            for image_path in image_paths:
+                _emit(_process_image(image_path) if init_error is None else _error_record(image_path, init_error))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(use_gpu, lang)) as pool:
+            futures = {pool.submit(_process_image, p): p for p in image_paths}
+            init_seconds = None  # model loads overlap with processing in the pool
+            for future in as_completed(futures):
+                try:
+                    record = future.result()
+                except BrokenProcessPool as e:
+                    # A worker died, e.g. its extractor failed to initialize: no image can finish
+                    record = _error_record(futures[future], f"OCR worker process failed: {e}")
+                except Exception as e:
+                    record = _error_record(futures[future], str(e))
+                _emit(record)
+
+    elapsed = time.perf_counter() - start
+    total = succeeded + failed
+    summary = {
+        'images': total,
+        'succeeded': succeeded,
+        'failed': failed,
+        'jobs': max(1, jobs),
+        'elapsed_s': round(elapsed, 2),
+        'images_per_sec': round(total / elapsed, 2) if elapsed > 0 else 0.0,
+        'avg_stage_ms': {
+            stage: round(ms / total, 2) for stage, ms in sorted(stage_totals.items())
+        } if total else {}
+    }
+    if init_seconds is not None:
+        summary['init_s'] = round(init_seconds, 2)
+    return summary
+
+
+def print_summary(summary: Dict, stream: Optional[TextIO] = None) -> None:
+    """Print a human readable throughput summary"""
+    stream = stream or sys.stderr
+    print(f"\nProcessed {summary['images']} images ({summary['succeeded']} ok, "
+          f"{summary['failed']} failed) with {summary['jobs']} job(s) "
+          f"in {summary['elapsed_s']:.2f}s", file=stream)
+    print(f"Throughput: {summary['images_per_sec']:.2f} images/sec", file=stream)
+    if 'init_s' in summary:
+        print(f"Model init: {summary['init_s']:.2f}s", file=stream)
+    if summary['avg_stage_ms']:
+        print("Average per-stage time:", file=stream)
+        for stage, ms in summary['avg_stage_ms'].items():
+            print(f"  {stage:<12} {ms:10.1f} ms", file=stream)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Parse-time benchmark: pattern loop vs literal prefilter
+Runs the field and merchant patterns over a corpus of OCR texts twice - the
+plain prioritized loop (every pattern in turn) and the LiteralPrefilter path
+(one automaton pass for the required literals, then only the patterns that can match) - checks that both
+give the same values and confidences, and prints the timings.
+
+Usage: python benchmark_parse.py                      # built-in sample texts
+       python benchmark_parse.py texts/ --repeat 200  # *.txt (one OCR block per line)
+       python benchmark_parse.py corpus.jsonl         # {"text": ...} or {"blocks": [...]} per line
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from typing import List, Tuple
+
+from patterns.pattern_manager import PatternManager
+from processors.text_processor import TextProcessor
+
+FIELDS = ('date', 'amount', 'fee', 'reference_id', 'sender_name', 'receiver_name')
+
+SAMPLE_TEXTS = [
+    '\n'.join([
+        'โอนเงินสำเร็จ', '31 ส.ค. 68 14:50', 'นาย สมชาย ใจดี', 'ธ.กสิกรไทย', 'xxx-x-x1234-x',
+        'นาง ยุพดี เจียมจรรยา', 'พร้อมเพย์', 'จำนวนเงิน', '3,000.00 บาท',
+        'ค่าธรรมเนียม 0.00 บาท', 'เลขที่รายการ: 015243123456ABC789'
+    ]),
+    '\n'.join([
+        'TrueMoney', 'สุเขทา ****', 'บัญชีทรูมันนี่', 'จากวอลเล็ท', 'นาย ทดสอบ อินทร์อยู่',
+        'บัญชีทรูมันนี่', 'ยอด 120.00', '18/09/2025 12:20'
+    ]),
+    '\n'.join(['7-ELEVEN', 'สาขา ลาดพร้าว', 'total 45.50', 'ref ABC12345678']),
+    '\n'.join([
+        'SCB', 'ชำระเงินสำเร็จ', '02 ก.ย. 2568 - 09:14', 'จาก', 'นางสาว มาลี ศรีสุข', 'xxx-xxx123-4',
+        'ไปยัง', 'มทร.ตะวันออก', '(ค่าธรรมเนียมการศึกษา)', 'จำนวนเงิน', '12,500.00',
+        'รหัสอ้างอิง 2025090209140012'
+    ]),
+]
+
+
+def load_corpus(paths: List[str]) -> List[str]:
+    """OCR texts from .txt files, directories of .txt files and .jsonl files"""
+    texts = []
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(glob.glob(os.path.join(path, '*.txt')))
+        else:
+            files = [path]
+        for file_path in files:
+            with open(file_path, encoding='utf-8') as f:
+                if file_path.endswith('.jsonl'):
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        record = json.loads(line)
+                        if 'text' in record:
+                            texts.append(record['text'])
+                        else:
+                            texts.append('\n'.join(block[0] if isinstance(block, list) else block
+                                                   for block in record.get('blocks', [])))
+                else:
+                    texts.append(f.read())
+    return texts
+
+
+def parse_loop(processor: TextProcessor, text: str) -> Tuple:
+    """Current behaviour: every field's patterns in priority order"""
+    compiled = processor.pattern_manager.compiled
+    processor.guard.start()
+    values = tuple(processor.extract_field_with_patterns(text, compiled[name], None, name) for name in FIELDS)
+    return values, processor.detect_merchant_and_source(text), dict(processor.field_confidences)
+
+
+def parse_scan(processor: TextProcessor, text: str) -> Tuple:
+    """Literal prefilter (one automaton pass), then only the patterns that can match"""
+    processor.guard.start()
+    scan = processor.scan(text)
+    values = tuple(processor.extract_field(scan, name) for name in FIELDS)
+    return values, processor.detect_merchant_and_source(text, scan), dict(processor.field_confidences)
+
+
+def timed(func, processor: TextProcessor, texts: List[str], repeat: int) -> Tuple[float, List]:
+    results = [func(processor, text) for text in texts]  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            func(processor, text)
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark receipt text parsing (pattern loop vs literal prefilter)')
+    parser.add_argument('paths', nargs='*', help='.txt files, directories of .txt files or .jsonl files')
+    parser.add_argument('--repeat', type=int, default=100, help='Passes over the corpus (default: 100)')
+    args = parser.parse_args()
+
+    texts = load_corpus(args.paths) if args.paths else SAMPLE_TEXTS
+    if not texts:
+        print('No texts found', file=sys.stderr)
+        sys.exit(1)
+
+    processor = TextProcessor(PatternManager())
+    loop_seconds, loop_results = timed(parse_loop, processor, texts, args.repeat)
+    scan_seconds, scan_results = timed(parse_scan, processor, texts, args.repeat)
+
+    mismatches = [idx for idx, (a, b) in enumerate(zip(loop_results, scan_results)) if a != b]
+    runs = len(texts) * args.repeat
+    skipped = sum(len(indices) for text in texts for indices in processor.scan(text).skipped.values())
+    total = sum(len(patterns) for patterns in processor.pattern_manager.compiled.values()) * len(texts)
+
+    print(f"texts: {len(texts)}  repeat: {args.repeat}  pattern set: {processor.pattern_manager.version}")
+    print(f"pattern loop: {loop_seconds / runs * 1000:.3f} ms/text")
+    print(f"prefilter:    {scan_seconds / runs * 1000:.3f} ms/text")
+    print(f"reduction:    {(1 - scan_seconds / loop_seconds) * 100:.1f}%  "
+          f"(patterns ruled out by the prefilter: {skipped}/{total})")
+    if mismatches:
+        print(f"MISMATCH on texts: {mismatches}", file=sys.stderr)
+        sys.exit(2)
+    print('results identical')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,4 @@
+"""Result cache module"""
+from .result_cache import ResultCache
+
+__all__ = ['ResultCache']
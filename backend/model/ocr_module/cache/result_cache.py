@@ -0,0 +1,142 @@
+"""
+Result cache for repeated receipt uploads (in-memory LRU + optional SQLite tier)
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class ResultCache:
+    """Two-tier cache of extraction results keyed by image content hash"""
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 86400.0, db_path: Optional[str] = None):
+        """
+        Args:
+            max_entries: Maximum number of results kept in memory (LRU eviction)
+            ttl_seconds: How long a cached result stays valid
+            db_path: Optional SQLite database path for a tier that survives restarts
+        """
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.evictions = 0
+
+        if db_path:
+            self._connect()
+
+    def _connect(self) -> None:
+        """Open the SQLite tier"""
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            '''CREATE TABLE IF NOT EXISTS result_cache (
+                cache_key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )'''
+        )
+        self._conn.commit()
+
+    def reopen_after_fork(self) -> None:
+        """Replace the lock and SQLite connection inherited from a parent process
+
+        SQLite connections must not be shared across fork, so a worker forked
+        from a preloaded master opens its own (the inherited one is abandoned).
+        """
+        self._lock = threading.Lock()
+        self._conn = None
+        if self.db_path:
+            self._connect()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Get a cached result dictionary, or None on a miss"""
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return json.loads(value)
+                del self._entries[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    'SELECT value, created_at FROM result_cache WHERE cache_key = ?', (key,)
+                ).fetchone()
+                if row is not None and now - row[1] <= self.ttl_seconds:
+                    # Promote to the memory tier
+                    self._store_memory(key, row[0], row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return json.loads(row[0])
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: Dict) -> None:
+        """Store a result dictionary in every tier"""
+        encoded = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+
+        with self._lock:
+            self._store_memory(key, encoded, now)
+
+            if self._conn is not None:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO result_cache (cache_key, value, created_at) VALUES (?, ?, ?)',
+                    (key, encoded, now)
+                )
+                self._conn.execute(
+                    'DELETE FROM result_cache WHERE created_at < ?', (now - self.ttl_seconds,)
+                )
+                self._conn.commit()
+
+    def clear(self) -> None:
+        """Remove every cached result"""
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute('DELETE FROM result_cache')
+                self._conn.commit()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and sizes"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'disk_tier': self.db_path is not None
+            }
+
+    def _store_memory(self, key: str, encoded: str, created_at: float) -> None:
+        """Insert into the LRU tier (lock must be held)"""
+        self._entries[key] = (created_at, encoded)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
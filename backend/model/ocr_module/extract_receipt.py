@@ -4,6 +4,8 @@ Receipt/E-slip OCR Extraction Script
 Extracts structured data from Thai receipts using PaddleOCR and regex patterns.
 
 Usage: python extract_receipt.py input.jpg
+       python extract_receipt.py --serve [--socket /tmp/ocr.sock]
+       python extract_receipt.py slips/ --jobs 4 --output results.jsonl
 """
 
 import json
@@ -12,17 +14,25 @@ import os
 import argparse
 import io
 import locale
+import time
 
-try:
-    import cv2
-    import numpy as np
-except ImportError:
-    print("Required packages not installed. Please run:")
-    print("pip install opencv-python numpy")
-    sys.exit(1)
+_import_start = time.perf_counter()
 
-# Import from modular structure
+# Import from modular structure (OpenCV, NumPy and the OCR engine load on first use)
 from receipt_extractor import ReceiptExtractor
+from batch_runner import is_batch_input, collect_images, run_batch, print_summary
+from ocr_backends import require_ocr_backend
+from utils.lazy_imports import get_cv2, get_numpy
+
+IMPORT_SECONDS = time.perf_counter() - _import_start
+
+
+def require_image_libraries():
+    """Exit with install instructions when OpenCV or NumPy is missing"""
+    if get_cv2() is None or get_numpy() is None:
+        print("Required packages not installed. Please run:")
+        print("pip install opencv-python numpy")
+        sys.exit(1)
 
 
 def main():
@@ -45,21 +55,52 @@ Examples:
   python extract_receipt.py receipt.jpg
   python extract_receipt.py receipt.jpg --gpu
   python extract_receipt.py receipt.jpg --output result.json --pretty
+  python extract_receipt.py receipt.jpg --profile --pretty   # include per-stage timings
+  python extract_receipt.py archive/2025-08/ --jobs 4 --output results.jsonl
+  python extract_receipt.py "archive/**/*.jpg" --jobs 4
+  python extract_receipt.py --manifest slips.txt --jobs 4 --output results.jsonl
+  python extract_receipt.py --serve                      # JSON lines on stdin/stdout
+  python extract_receipt.py --serve --socket /tmp/ocr.sock
         """
     )
-    parser.add_argument('image_path', help='Path to receipt image')
+    parser.add_argument('image_path', nargs='?',
+                        help='Path to receipt image, or a directory / glob pattern for batch mode')
     parser.add_argument('--output', '-o', help='Output JSON file (optional)')
     parser.add_argument('--pretty', action='store_true', help='Pretty print JSON')
     parser.add_argument('--gpu', action='store_true', help='Use GPU acceleration (requires CUDA)')
     parser.add_argument('--lang', default='th', help='OCR language (default: th for Thai)')
     parser.add_argument('--verbose', '-v', action='store_true', help='Verbose output')
+    parser.add_argument('--profile', action='store_true',
+                        help='Include per-stage timings in the output (also enabled by OCR_PROFILE=1)')
     parser.add_argument('--save-db', action='store_true', help='Save to database')
     parser.add_argument('--db-path', default='receipts.db', help='Database path (default: receipts.db)')
     parser.add_argument('--user-id', type=int, help='User ID for database record')
     parser.add_argument('--category-id', type=int, help='Category ID for database record')
+    parser.add_argument('--serve', action='store_true',
+                        help='Keep the OCR model warm and answer JSON-lines requests (stdin or --socket)')
+    parser.add_argument('--socket', help='Unix socket path for --serve (default: stdin/stdout)')
+    parser.add_argument('--manifest', help='Batch mode: file with one image path (or JSON line) per line')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='Batch mode: number of worker processes, each loads its own model (default: 1)')
 
     args = parser.parse_args()
 
+    if args.verbose:
+        print(f"Modules imported in {IMPORT_SECONDS * 1000:.0f} ms", file=sys.stderr)
+
+    require_image_libraries()
+
+    if args.serve:
+        serve(args)
+        return
+
+    if args.manifest or is_batch_input(args.image_path):
+        run_batch_cli(args)
+        return
+
+    if not args.image_path:
+        parser.error('image_path is required unless --serve or --manifest is given')
+
     if not os.path.exists(args.image_path):
         print(f"Error: Image file '{args.image_path}' not found")
         sys.exit(1)
@@ -69,7 +110,8 @@ Examples:
         if args.verbose:
             print(f"Initializing OCR extractor (GPU: {args.gpu}, Language: {args.lang})")
 
-        extractor = ReceiptExtractor(use_gpu=args.gpu, lang=args.lang)
+        extractor = ReceiptExtractor(use_gpu=args.gpu, lang=args.lang,
+                                     profile=True if args.profile else None)
 
         # Extract data
         if args.verbose:
@@ -123,5 +165,61 @@ Examples:
         sys.exit(1)
 
 
+def run_batch_cli(args):
+    """Run parallel batch extraction over a directory, glob or manifest"""
+    image_paths = collect_images(args.image_path, args.manifest)
+    if not image_paths:
+        print("Error: No images found for batch processing", file=sys.stderr)
+        sys.exit(1)
+
+    # Fail fast instead of in every worker
+    try:
+        require_ocr_backend()
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.verbose:
+        print(f"Processing {len(image_paths)} images with {args.jobs} job(s)", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            summary = run_batch(image_paths, jobs=args.jobs, use_gpu=args.gpu, lang=args.lang,
+                                out=f, verbose=args.verbose)
+        print(f"Results saved to {args.output}", file=sys.stderr)
+    else:
+        summary = run_batch(image_paths, jobs=args.jobs, use_gpu=args.gpu, lang=args.lang,
+                            verbose=args.verbose)
+
+    print_summary(summary)
+    if summary['failed']:
+        sys.exit(1)
+
+
+def serve(args):
+    """Run the warm extraction server (--serve)"""
+    from contextlib import redirect_stdout
+    from receipt_server import ReceiptServer
+
+    # stdout carries the JSON-lines protocol; send every log print to stderr
+    protocol_out = sys.stdout
+    with redirect_stdout(sys.stderr):
+        try:
+            extractor = ReceiptExtractor(use_gpu=args.gpu, lang=args.lang)
+        except RuntimeError as e:
+            protocol_out.write(json.dumps({'ready': False, 'error': str(e)}) + '\n')
+            protocol_out.flush()
+            sys.exit(1)
+
+        server = ReceiptServer(extractor, protocol_out=protocol_out)
+        try:
+            if args.socket:
+                server.serve_socket(args.socket)
+            else:
+                server.serve_stdio()
+        except KeyboardInterrupt:
+            pass
+
+
 if __name__ == "__main__":
     main()
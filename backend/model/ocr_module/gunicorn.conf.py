@@ -0,0 +1,39 @@
+"""
+Gunicorn configuration for the OCR API
+Prepares the prometheus_client multiprocess directory so /metrics aggregates every worker.
+With OCR_PRELOAD=true the app (and the warmed OCR model) is loaded once in the master
+and shared copy-on-write by the forked workers.
+"""
+import os
+import shutil
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', '2'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+preload_app = os.getenv('OCR_PRELOAD', 'false').lower() == 'true'
+
+# The in-memory job store is per process: with several workers GET /jobs/<id> must see
+# jobs queued by any of them, so they share the SQLite store unless one is configured
+if workers > 1:
+    os.environ.setdefault('OCR_JOB_STORE', 'sqlite')
+
+# Start every deployment with an empty metrics directory. This runs when gunicorn reads
+# its config, before a preloaded app imports metrics.py (which opens its files here).
+_metrics_dir = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+if _metrics_dir:
+    shutil.rmtree(_metrics_dir, ignore_errors=True)
+    os.makedirs(_metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Drop live gauges (in-flight requests) of workers that exited"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def post_fork(server, worker):
+    """Reset per-process state inherited from a preloaded master"""
+    if preload_app:
+        import app
+        app.on_worker_forked()
@@ -0,0 +1,5 @@
+"""Asynchronous OCR job queue module"""
+from .job_queue import OCRJobQueue, QueueFullError
+from .job_store import InMemoryJobStore, SQLiteJobStore, create_job_store
+
+__all__ = ['OCRJobQueue', 'QueueFullError', 'InMemoryJobStore', 'SQLiteJobStore', 'create_job_store']
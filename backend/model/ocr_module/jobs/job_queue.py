@@ -0,0 +1,147 @@
+"""
+Bounded in-process work queue for asynchronous OCR jobs
+"""
+import math
+import queue
+import threading
+import time
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Optional
+
+from models.ocr_job import OCRJob, JOB_RUNNING, JOB_DONE, JOB_FAILED
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"OCR job queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class OCRJobQueue:
+    """Fixed pool of OCR worker threads fed by a bounded queue"""
+
+    def __init__(self, extractor_factory: Callable, store, num_workers: int = 1, max_queue_size: int = 32,
+                 on_finished: Optional[Callable] = None, extractor_lock: Optional[threading.Lock] = None):
+        """
+        Args:
+            extractor_factory: Callable returning a ReceiptExtractor. Without
+                extractor_lock each worker builds its own extractor because the
+                OCR engines are not thread-safe.
+            store: Job store (InMemoryJobStore or SQLiteJobStore)
+            num_workers: Number of OCR worker threads (always 1 with extractor_lock:
+                more threads would only wait on the lock)
+            max_queue_size: Maximum number of jobs waiting to be processed
+            on_finished: Optional callback(job, extractor) run after each extraction
+            extractor_lock: Optional lock held around each extraction and on_finished,
+                so the factory can return an extractor shared with other threads
+        """
+        self.extractor_factory = extractor_factory
+        self.on_finished = on_finished
+        self.extractor_lock = extractor_lock
+        self.store = store
+        self.num_workers = 1 if extractor_lock is not None else max(1, num_workers)
+        self._queue: 'queue.Queue' = queue.Queue(maxsize=max(1, max_queue_size))
+        self._workers: List[threading.Thread] = []
+        self._started = False
+        self._lock = threading.Lock()
+        # Moving average of job duration, used for the Retry-After estimate
+        self._avg_job_seconds = 5.0
+
+    def start(self) -> None:
+        """Start the worker threads (idempotent)"""
+        with self._lock:
+            if self._started:
+                return
+            for idx in range(self.num_workers):
+                worker = threading.Thread(
+                    target=self._worker_loop, name=f"ocr-job-worker-{idx}", daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+            self._started = True
+
+    def submit(self, image, cache_key: Optional[str] = None, check_cache: bool = True) -> OCRJob:
+        """Queue an image for extraction and return the created job
+
+        check_cache=False skips the result cache lookup of a key that already missed.
+
+        Raises:
+            QueueFullError: If the queue is at capacity
+        """
+        self.start()
+
+        # Save before queueing so a fast worker never sees an unknown job
+        job = OCRJob()
+        self.store.save(job)
+        try:
+            self._queue.put_nowait((job.job_id, image, cache_key, check_cache))
+        except queue.Full:
+            self.store.delete(job.job_id)
+            raise QueueFullError(self.estimate_retry_after())
+
+        return job
+
+    def add_done(self, result: Dict) -> OCRJob:
+        """Record a job whose result is already known (e.g. a result cache hit) without queueing it"""
+        job = OCRJob(status=JOB_DONE, result=result)
+        job.started_at = job.finished_at = job.created_at
+        self.store.save(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[OCRJob]:
+        """Get the current state of a job"""
+        return self.store.get(job_id)
+
+    @property
+    def depth(self) -> int:
+        """Number of jobs waiting in the queue"""
+        return self._queue.qsize()
+
+    def estimate_retry_after(self) -> int:
+        """Estimate in seconds when a slot in the queue should free up"""
+        return max(1, math.ceil(self._avg_job_seconds * self.depth / self.num_workers))
+
+    def _worker_loop(self) -> None:
+        """Process jobs forever with the extractor returned by the factory"""
+        extractor = None
+
+        while True:
+            job_id, image, cache_key, check_cache = self._queue.get()
+            try:
+                job = self.store.get(job_id) or OCRJob(job_id=job_id)
+                job.status = JOB_RUNNING
+                job.started_at = time.time()
+                self.store.save(job)
+
+                with self.extractor_lock or nullcontext():
+                    try:
+                        if extractor is None:
+                            extractor = self.extractor_factory()
+                        job.result = extractor.extract_receipt_data(
+                            image, cache_key=cache_key, check_cache=check_cache
+                        ).to_dict()
+                        job.status = JOB_DONE
+                    except Exception as e:
+                        job.error = str(e)
+                        job.status = JOB_FAILED
+
+                    job.finished_at = time.time()
+                    self._record_duration(job.finished_at - job.started_at)
+                    self.store.save(job)
+
+                    if self.on_finished is not None and extractor is not None:
+                        self.on_finished(job, extractor)
+
+            except Exception as e:
+                try:
+                    print(f"OCR job {job_id} could not be updated: {e}")
+                except UnicodeEncodeError:
+                    print(f"OCR job {job_id} could not be updated: [Unicode encoding error]")
+            finally:
+                self._queue.task_done()
+
+    def _record_duration(self, seconds: float) -> None:
+        """Update the moving average of job duration"""
+        self._avg_job_seconds = 0.8 * self._avg_job_seconds + 0.2 * seconds
@@ -0,0 +1,140 @@
+"""
+Job stores for asynchronous OCR jobs (in-memory and SQLite)
+"""
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from models.ocr_job import OCRJob
+
+
+class InMemoryJobStore:
+    """Keeps jobs in a process-local dictionary"""
+
+    def __init__(self, ttl_seconds: float = 3600.0):
+        """
+        Args:
+            ttl_seconds: How long finished jobs are kept before being purged
+        """
+        self.ttl_seconds = ttl_seconds
+        self._jobs: Dict[str, OCRJob] = {}
+        self._lock = threading.Lock()
+
+    def save(self, job: OCRJob) -> None:
+        """Insert or update a job"""
+        with self._lock:
+            self._jobs[job.job_id] = job
+        self.purge_expired()
+
+    def get(self, job_id: str) -> Optional[OCRJob]:
+        """Get a job by id, or None if unknown or expired"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def delete(self, job_id: str) -> None:
+        """Remove a job"""
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def purge_expired(self) -> int:
+        """Remove finished jobs older than the TTL"""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.is_finished and job.finished_at and job.finished_at < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+
+class SQLiteJobStore:
+    """Keeps jobs in a SQLite database, shared by every worker on the host"""
+
+    def __init__(self, db_path: str = 'ocr_jobs.db', ttl_seconds: float = 3600.0):
+        """
+        Args:
+            db_path: Path of the SQLite database file
+            ttl_seconds: How long finished jobs are kept before being purged
+        """
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            '''CREATE TABLE IF NOT EXISTS ocr_jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                result TEXT,
+                error TEXT
+            )'''
+        )
+        self._conn.commit()
+
+    def save(self, job: OCRJob) -> None:
+        """Insert or update a job"""
+        result = json.dumps(job.result, ensure_ascii=False) if job.result is not None else None
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO ocr_jobs '
+                '(job_id, status, created_at, started_at, finished_at, result, error) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job.job_id, job.status, job.created_at, job.started_at,
+                 job.finished_at, result, job.error)
+            )
+            self._conn.commit()
+        self.purge_expired()
+
+    def get(self, job_id: str) -> Optional[OCRJob]:
+        """Get a job by id, or None if unknown or expired"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT job_id, status, created_at, started_at, finished_at, result, error '
+                'FROM ocr_jobs WHERE job_id = ?',
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        return OCRJob(
+            job_id=row[0],
+            status=row[1],
+            created_at=row[2],
+            started_at=row[3],
+            finished_at=row[4],
+            result=json.loads(row[5]) if row[5] else None,
+            error=row[6]
+        )
+
+    def delete(self, job_id: str) -> None:
+        """Remove a job"""
+        with self._lock:
+            self._conn.execute('DELETE FROM ocr_jobs WHERE job_id = ?', (job_id,))
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """Remove finished jobs older than the TTL"""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            cursor = self._conn.execute(
+                'DELETE FROM ocr_jobs WHERE finished_at IS NOT NULL AND finished_at < ?',
+                (cutoff,)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+
+def create_job_store(backend: str = 'memory', db_path: str = 'ocr_jobs.db', ttl_seconds: float = 3600.0):
+    """Create a job store by backend name ('memory' or 'sqlite')"""
+    if backend == 'sqlite':
+        return SQLiteJobStore(db_path=db_path, ttl_seconds=ttl_seconds)
+    if backend != 'memory':
+        print(f"Unknown job store backend '{backend}', using in-memory store")
+    return InMemoryJobStore(ttl_seconds=ttl_seconds)
@@ -0,0 +1,185 @@
+"""
+Prometheus metrics for the OCR API
+Works with several gunicorn workers through prometheus_client multiprocess mode
+(set PROMETHEUS_MULTIPROC_DIR, see gunicorn.conf.py).
+"""
+import os
+from typing import Dict, Optional, Tuple
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        CollectorRegistry,
+        Counter,
+        Gauge,
+        Histogram,
+        generate_latest,
+        multiprocess,
+    )
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = 'text/plain; version=0.0.4; charset=utf-8'
+
+# OCR stages range from milliseconds (parsing) to tens of seconds (CPU OCR)
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+if PROMETHEUS_AVAILABLE:
+    STAGE_DURATION = Histogram(
+        'ocr_stage_duration_seconds',
+        'Time spent in each extraction stage',
+        ['stage'],
+        buckets=STAGE_BUCKETS
+    )
+    REQUEST_DURATION = Histogram(
+        'ocr_request_duration_seconds',
+        'End-to-end request latency',
+        ['endpoint'],
+        buckets=STAGE_BUCKETS
+    )
+    REQUESTS = Counter(
+        'ocr_requests_total',
+        'Requests by endpoint and outcome',
+        ['endpoint', 'outcome']
+    )
+    IN_FLIGHT = Gauge(
+        'ocr_requests_in_flight',
+        'Requests currently being processed',
+        ['endpoint'],
+        multiprocess_mode='livesum'
+    )
+    PREPROCESS_RETRIES = Counter(
+        'ocr_preprocess_retries_total',
+        'OCR passes retried on the preprocessed image'
+    )
+    RESIZE_PIXEL_REDUCTION = Histogram(
+        'ocr_resize_pixel_reduction_ratio',
+        'Fraction of pixels removed by the resize stage before OCR',
+        buckets=(0.0, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99)
+    )
+    REGION_DETECTIONS = Counter(
+        'ocr_region_detections_total',
+        'Receipt region detection outcomes before OCR',
+        ['method']
+    )
+    SLIP_QR = Counter(
+        'ocr_slip_qr_total',
+        'Slip verification QR decode attempts',
+        ['outcome']
+    )
+    ENGINE_PROFILE_DURATION = Histogram(
+        'ocr_engine_profile_duration_seconds',
+        'OCR time per image by engine profile (fast for screenshots, full for photos)',
+        ['profile', 'kind'],
+        buckets=(0.25, 0.5, 1, 2, 4, 8, 16, 32)
+    )
+    REGEX_GUARD_EVENTS = Counter(
+        'ocr_regex_guard_events_total',
+        'Regex runs over their time limit (overrun), stopped at it (stopped) or skipped (skipped)',
+        ['event']
+    )
+    REGEX_QUARANTINED = Gauge(
+        'ocr_regex_quarantined_patterns',
+        'Patterns currently skipped after repeated overruns of their time limit',
+        multiprocess_mode='livesum'
+    )
+    EXTRACTOR_INIT = Gauge(
+        'ocr_extractor_init_seconds',
+        'Time taken to initialize the OCR extractor',
+        multiprocess_mode='max'
+    )
+
+
+def outcome_for_status(status_code: int) -> str:
+    """Map an HTTP status code to a request outcome label"""
+    if status_code == 429:
+        return 'rejected'
+    if status_code >= 500:
+        return 'error'
+    if status_code >= 400:
+        return 'client_error'
+    return 'success'
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """Record the duration of one stage"""
+    if PROMETHEUS_AVAILABLE:
+        STAGE_DURATION.labels(stage=stage).observe(seconds)
+
+
+def observe_stages(stages: Dict[str, float]) -> None:
+    """Record every stage of a StageTimer (durations in seconds)"""
+    if not PROMETHEUS_AVAILABLE:
+        return
+    for stage, seconds in stages.items():
+        STAGE_DURATION.labels(stage=stage).observe(seconds)
+    if 'preprocess' in stages:
+        PREPROCESS_RETRIES.inc()
+
+
+def observe_resize(resize: Optional[Dict]) -> None:
+    """Record the pixel reduction of the resize stage (None when it did not run)"""
+    if PROMETHEUS_AVAILABLE and resize:
+        RESIZE_PIXEL_REDUCTION.observe(resize['pixel_reduction'])
+
+
+def observe_region(region: Optional[Dict]) -> None:
+    """Record how the receipt region was found ('quad', 'projection' or 'full_frame')"""
+    if PROMETHEUS_AVAILABLE and region:
+        REGION_DETECTIONS.labels(method=region['method']).inc()
+
+
+def observe_qr(qr: Optional[Dict]) -> None:
+    """Record a slip QR decode attempt ('decoded' or 'not_found', None when skipped)"""
+    if PROMETHEUS_AVAILABLE and qr is not None:
+        SLIP_QR.labels(outcome='decoded' if qr.get('decoded') else 'not_found').inc()
+
+
+def observe_regex(regex: Optional[Dict]) -> None:
+    """Record the regex time budget events of an image (None on cache hits)"""
+    if not PROMETHEUS_AVAILABLE or not regex:
+        return
+    for event, key in (('overrun', 'overruns'), ('stopped', 'stopped'), ('skipped', 'skipped')):
+        if regex[key]:
+            REGEX_GUARD_EVENTS.labels(event=event).inc(regex[key])
+    REGEX_QUARANTINED.set(regex['quarantined_patterns'])
+
+
+def observe_engine_profile(engine_profile: Optional[Dict]) -> None:
+    """Record the engine profile chosen for an image and its OCR time (None on cache hits)"""
+    if PROMETHEUS_AVAILABLE and engine_profile and 'elapsed_ms' in engine_profile:
+        ENGINE_PROFILE_DURATION.labels(
+            profile=engine_profile['name'], kind=engine_profile['kind'] or 'forced'
+        ).observe(engine_profile['elapsed_ms'] / 1000.0)
+
+
+def request_started(endpoint: str) -> None:
+    if PROMETHEUS_AVAILABLE:
+        IN_FLIGHT.labels(endpoint=endpoint).inc()
+
+
+def request_finished(endpoint: str, status_code: int, seconds: float) -> None:
+    if PROMETHEUS_AVAILABLE:
+        IN_FLIGHT.labels(endpoint=endpoint).dec()
+        REQUESTS.labels(endpoint=endpoint, outcome=outcome_for_status(status_code)).inc()
+        REQUEST_DURATION.labels(endpoint=endpoint).observe(seconds)
+
+
+def set_extractor_init_time(seconds: float) -> None:
+    if PROMETHEUS_AVAILABLE:
+        EXTRACTOR_INIT.set(seconds)
+
+
+def render_metrics() -> Tuple[Optional[bytes], str]:
+    """Render metrics in the Prometheus text format (None when prometheus_client is missing)"""
+    if not PROMETHEUS_AVAILABLE:
+        return None, CONTENT_TYPE_LATEST
+
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        # Aggregate the values written by every gunicorn worker
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+
+    from prometheus_client import REGISTRY
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
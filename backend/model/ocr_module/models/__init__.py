@@ -1,4 +1,7 @@
 """Models module for OCR extraction"""
 from .extraction_result import ExtractionResult
+from .batch_result import BatchItemResult
+from .ocr_job import OCRJob
+from .text_block import TextBlock
 
-__all__ = ['ExtractionResult']
+__all__ = ['ExtractionResult', 'BatchItemResult', 'OCRJob', 'TextBlock']
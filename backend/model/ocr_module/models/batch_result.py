@@ -0,0 +1,31 @@
+"""
+Data models for batched OCR extraction
+"""
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from .extraction_result import ExtractionResult
+
+
+@dataclass
+class BatchItemResult:
+    """Result for a single image of a batch (either a result or an error)"""
+    index: int
+    result: Optional[ExtractionResult] = None
+    error: Optional[str] = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None and self.result is not None
+
+    def to_dict(self) -> Dict:
+        item = {
+            'index': self.index,
+            'success': self.success,
+        }
+        if self.success:
+            item['data'] = self.result.to_dict()
+            item['cache_hit'] = self.result.cache_hit
+        else:
+            item['error'] = self.error or 'Extraction failed'
+        return item
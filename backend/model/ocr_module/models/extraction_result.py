@@ -1,7 +1,7 @@
 """
 Data models for OCR extraction results
 """
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Dict, Optional
 
 
@@ -18,6 +18,12 @@ class ExtractionResult:
     source: Dict[str, str] = None
     confidence: Dict[str, float] = None
     overall_confidence: float = 0.0
+    # Set when the result was served from the result cache (not serialized)
+    cache_hit: bool = field(default=False, compare=False)
+    # OCR cascade path: chosen variant, stop reason and attempts (serialized when set)
+    ocr_path: Optional[Dict] = field(default=None, compare=False)
+    # Optional timing profile (only serialized when profiling is enabled)
+    profile: Optional[Dict] = field(default=None, compare=False)
 
     def __post_init__(self):
         if self.source is None:
@@ -26,7 +32,7 @@ class ExtractionResult:
             self.confidence = {}
 
     def to_dict(self) -> Dict:
-        return {
+        data = {
             'date': self.date,
             'merchant': self.merchant,
             'reference_id': self.reference_id,
@@ -38,3 +44,24 @@ class ExtractionResult:
             'confidence': self.confidence,
             'overall_confidence': round(self.overall_confidence, 3)
         }
+        if self.ocr_path is not None:
+            data['ocr_path'] = self.ocr_path
+        if self.profile is not None:
+            data['profile'] = self.profile
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ExtractionResult':
+        return cls(
+            date=data.get('date'),
+            merchant=data.get('merchant'),
+            reference_id=data.get('reference_id'),
+            amount=data.get('amount'),
+            fee=data.get('fee'),
+            sender_name=data.get('sender_name'),
+            receiver_name=data.get('receiver_name'),
+            source=data.get('source'),
+            confidence=data.get('confidence'),
+            overall_confidence=data.get('overall_confidence', 0.0),
+            ocr_path=data.get('ocr_path')
+        )
@@ -0,0 +1,64 @@
+"""
+Data model for OCR text blocks with their geometry
+"""
+from typing import List, Optional, Sequence
+
+
+class TextBlock(tuple):
+    """OCR text block
+
+    Behaves exactly like the (text, confidence) tuples used throughout the
+    extractor, and additionally keeps the detected box (list of [x, y] points).
+    """
+
+    def __new__(cls, text: str, confidence: float, box: Optional[Sequence[Sequence[float]]] = None):
+        block = super().__new__(cls, (text, confidence))
+        block.box = [[float(x), float(y)] for x, y in box] if box is not None else None
+        return block
+
+    def __getnewargs__(self):
+        return self[0], self[1], self.box
+
+    @property
+    def text(self) -> str:
+        return self[0]
+
+    @property
+    def confidence(self) -> float:
+        return self[1]
+
+    def with_box(self, box: Optional[Sequence[Sequence[float]]]) -> 'TextBlock':
+        """Copy of this block with another box (e.g. mapped to original coordinates)"""
+        return TextBlock(self[0], self[1], box)
+
+    @property
+    def x0(self) -> float:
+        return min(x for x, _ in self.box)
+
+    @property
+    def x1(self) -> float:
+        return max(x for x, _ in self.box)
+
+    @property
+    def y0(self) -> float:
+        return min(y for _, y in self.box)
+
+    @property
+    def y1(self) -> float:
+        return max(y for _, y in self.box)
+
+    @property
+    def center_y(self) -> float:
+        return (self.y0 + self.y1) / 2.0
+
+    @property
+    def height(self) -> float:
+        return self.y1 - self.y0
+
+    def to_dict(self) -> dict:
+        return {'text': self[0], 'confidence': self[1], 'box': self.box}
+
+
+def blocks_have_geometry(blocks: List) -> bool:
+    """Check if every block carries a box (plain (text, confidence) tuples do not)"""
+    return bool(blocks) and all(getattr(block, 'box', None) for block in blocks)
@@ -1,5 +1,5 @@
 """OCR backends module"""
-from .base_ocr import OCR_BACKEND
+from .base_ocr import OCR_BACKEND, detect_ocr_backend, require_ocr_backend
 from .gpu_manager import GPUManager
 
-__all__ = ['OCR_BACKEND', 'GPUManager']
+__all__ = ['OCR_BACKEND', 'detect_ocr_backend', 'require_ocr_backend', 'GPUManager']
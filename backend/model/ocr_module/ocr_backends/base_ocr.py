@@ -1,21 +1,49 @@
 """
 Base OCR interface and backend detection
+Detection only looks up the installed packages; the engine itself (and torch /
+paddle behind it) is imported when the extractor is initialized.
 """
-import sys
-
-# Try to import OCR libraries and determine backend
-OCR_BACKEND = None
-try:
-    import easyocr
-    OCR_BACKEND = 'easyocr'
-    print("Using EasyOCR (GPU-enabled)")
-except ImportError:
+import importlib.util
+import os
+from typing import Optional
+
+# Detection order when OCR_BACKEND is not set in the environment
+SUPPORTED_BACKENDS = ('easyocr', 'paddleocr')
+
+INSTALL_HINT = (
+    "No OCR backend found. Please install one of:\n"
+    "  GPU support: pip install easyocr\n"
+    "  CPU only:    pip install paddlepaddle paddleocr"
+)
+
+
+def is_backend_installed(backend: str) -> bool:
+    """Check if an OCR package is installed without importing it"""
     try:
-        from paddleocr import PaddleOCR
-        OCR_BACKEND = 'paddleocr'
-        print("Using PaddleOCR (CPU-only)")
-    except ImportError:
-        print("No OCR backend found. Please install one of:")
-        print("  GPU support: pip install easyocr")
-        print("  CPU only:    pip install paddlepaddle paddleocr")
-        sys.exit(1)
+        return importlib.util.find_spec(backend) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def detect_ocr_backend() -> Optional[str]:
+    """Pick the OCR backend (OCR_BACKEND env override, else the first installed one)"""
+    preferred = os.getenv('OCR_BACKEND', '').strip().lower()
+    if preferred:
+        if preferred in SUPPORTED_BACKENDS and is_backend_installed(preferred):
+            return preferred
+        print(f"Warning: OCR_BACKEND={preferred} is not available, detecting installed backend")
+
+    for backend in SUPPORTED_BACKENDS:
+        if is_backend_installed(backend):
+            return backend
+    return None
+
+
+def require_ocr_backend() -> str:
+    """Return the detected backend or raise RuntimeError with install instructions"""
+    if OCR_BACKEND is None:
+        raise RuntimeError(INSTALL_HINT)
+    return OCR_BACKEND
+
+
+OCR_BACKEND = detect_ocr_backend()
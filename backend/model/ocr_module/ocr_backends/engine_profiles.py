@@ -0,0 +1,52 @@
+"""
+OCR engine profiles
+Clean screenshots need neither the angle classifier, the large detector
+canvas nor the preprocessing fallback variants that camera photos do, so
+each image is routed to a 'fast' or a 'full' profile.
+"""
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+# Image kind (see utils.image_kind) -> profile name
+PROFILE_FOR_KIND = {
+    'screenshot': 'fast',
+    'photo': 'full',
+}
+
+
+@dataclass(frozen=True)
+class EngineProfile:
+    """Per-image OCR engine settings"""
+    name: str
+    # OCR cascade variants (None: the configured cascade)
+    variants: Optional[Tuple[str, ...]] = None
+    # Extra keyword arguments for easyocr.Reader.readtext
+    easyocr_options: Dict = field(default_factory=dict)
+    # Text angle classification in PaddleOCR
+    paddle_cls: bool = True
+    # Run every stage on a single-channel image (decoded straight to gray when possible)
+    grayscale: bool = False
+
+
+ENGINE_PROFILES: Dict[str, EngineProfile] = {
+    # Rendered text is upright and sharp: one pass, smaller detector canvas, no angle classifier
+    'fast': EngineProfile(
+        name='fast',
+        variants=('original',),
+        easyocr_options={'canvas_size': 1600, 'mag_ratio': 1.0},
+        paddle_cls=False,
+        grayscale=True
+    ),
+    # Camera photos: engine defaults and the full cascade
+    'full': EngineProfile(name='full'),
+}
+
+
+def engine_profile_mode() -> str:
+    """Read OCR_ENGINE_PROFILE: 'auto' (classify each image), 'fast' or 'full'"""
+    mode = os.getenv('OCR_ENGINE_PROFILE', 'auto').lower()
+    if mode != 'auto' and mode not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown OCR engine profile: {mode} "
+                         f"(available: auto, {', '.join(ENGINE_PROFILES)})")
+    return mode
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Catastrophic backtracking check of the pattern registry
+Prints the static findings for every field and helper pattern (nested
+quantifiers, chains of overlapping repeats, syntax Python 3.10 cannot
+compile) and, with --probe, times each pattern on generated worst-case
+inputs in a child process. Exits with 1 when a pattern needs Python 3.11 or
+a probed pattern is pathological or does not finish, so it can gate pattern
+changes.
+
+Usage: python pattern_lint.py                          # static rules, every pattern
+       python pattern_lint.py --probe                  # static rules and timing probe
+       python pattern_lint.py sender_name receiver_name[10] helper:bank_name --probe --json lint.json
+"""
+import argparse
+import json
+import sys
+
+from patterns.pattern_manager import PatternManager
+from patterns.regex_lint import lint_manager
+
+FAILING_VERDICTS = ('timeout', 'pathological')
+FAILING_RULES = ('python-3.11-only',)
+
+
+def print_row(row: dict) -> None:
+    probe = row['probe']
+    if not row['findings'] and (probe is None or probe['verdict'] == 'ok'):
+        return
+    pattern = row['pattern']
+    if len(pattern) > 100:
+        pattern = pattern[:97] + '...'
+    print(f"\n{row['name']}: {pattern}")
+    for finding in row['findings']:
+        degree = f"n^{finding['degree']}" if finding['degree'] is not None else 'exponential'
+        print(f"  [{finding['rule']}, {degree}] {finding['message']}")
+        if finding['suggestion']:
+            print(f"    -> {finding['suggestion']}")
+    if probe is not None and probe['verdict'] != 'ok':
+        exponent = f"{probe['exponent']:.2f}" if probe['exponent'] is not None else '-'
+        print(f"  probe: {probe['verdict']}  {probe['short_ms']:.2f} ms -> {probe['long_ms']:.2f} ms  "
+              f"exponent {exponent}  input {probe['sample']!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Catastrophic backtracking check of the regex patterns')
+    parser.add_argument('names', nargs='*',
+                        help="Only these patterns: a field ('amount'), one pattern ('amount[3]') or 'helper:name'")
+    parser.add_argument('--probe', action='store_true', help='Also time every pattern on generated worst-case inputs')
+    parser.add_argument('--timeout', type=float, default=10.0, help='Seconds before a probed pattern counts as a timeout')
+    parser.add_argument('--min-degree', type=int, default=3,
+                        help='Report repeat chains of at least this polynomial degree (default: 3)')
+    parser.add_argument('--json', help='Also write the report rows to this JSON file')
+    args = parser.parse_args()
+
+    pattern_manager = PatternManager()
+    rows = lint_manager(pattern_manager, probe=args.probe, names=args.names,
+                        min_degree=args.min_degree, timeout=args.timeout)
+    if not rows:
+        print('No matching patterns', file=sys.stderr)
+        sys.exit(2)
+
+    for row in rows:
+        print_row(row)
+    flagged = sum(1 for row in rows if row['findings'])
+    failing = [row['name'] for row in rows
+               if any(finding['rule'] in FAILING_RULES for finding in row['findings'])
+               or (row['probe'] and row['probe']['verdict'] in FAILING_VERDICTS)]
+    print(f"\npatterns: {len(rows)}  with findings: {flagged}  failing: {len(failing)}  "
+          f"pattern set: {pattern_manager.version}")
+    if args.probe:
+        slow = sum(1 for row in rows if row['probe']['verdict'] == 'slow')
+        print(f"probe: {slow} slow (about quadratic)")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'pattern_version': pattern_manager.version, 'patterns': rows}, f, ensure_ascii=False, indent=2)
+
+    if failing:
+        print(f"failing: {', '.join(failing)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
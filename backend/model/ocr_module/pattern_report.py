@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Pattern hit-rate and latency report over a corpus
+Runs the field patterns with per-pattern statistics enabled and prints, for
+each field, how often every pattern ran, matched and was ruled out by the
+literal prefilter, the time spent in it, and the patterns that never matched. With
+--adaptive the order adaptive mode would use inside each priority tier is
+shown as well.
+
+Usage: python pattern_report.py texts/                 # OCR texts (.txt / .jsonl, see benchmark_parse.py)
+       python pattern_report.py --images slips/        # full extraction (runs OCR)
+       python pattern_report.py texts/ --field amount --sort time --json report.json
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List
+
+from benchmark_parse import FIELDS, load_corpus, parse_scan
+from patterns.pattern_manager import PatternManager
+from processors.pattern_stats import PatternStats, PatternStatsConfig
+from processors.text_processor import TextProcessor
+
+SORT_KEYS = {
+    'order': lambda row: row['index'],
+    'hits': lambda row: -row['hits'],
+    'time': lambda row: -row['total_ms'],
+    'attempts': lambda row: -row['attempts'],
+}
+
+
+def collect_from_texts(paths: List[str], stats: PatternStats) -> tuple:
+    """Parse OCR texts with statistics; returns (pattern manager, number of texts)"""
+    processor = TextProcessor(PatternManager())
+    processor.stats = stats
+    texts = load_corpus(paths)
+    for text in texts:
+        parse_scan(processor, text)
+    return processor.pattern_manager, len(texts)
+
+
+def collect_from_images(paths: List[str], stats: PatternStats, use_gpu: bool) -> tuple:
+    """Extract receipts with statistics; returns (pattern manager, number of images)"""
+    from batch_runner import collect_images
+    from receipt_extractor import ReceiptExtractor
+
+    images = sorted({image for path in paths for image in collect_images(path)})
+    extractor = ReceiptExtractor(use_gpu=use_gpu)
+    extractor.text_processor.stats = stats
+    for image_path in images:
+        try:
+            extractor.extract_receipt_data(image_path)
+        except Exception as e:
+            try:
+                print(f"Skipped {image_path}: {e}", file=sys.stderr)
+            except UnicodeEncodeError:
+                print("Skipped an image: [Unicode encoding error]", file=sys.stderr)
+    return extractor.pattern_manager, len(images)
+
+
+def print_report(rows: List[Dict], pattern_manager: PatternManager, stats: PatternStats,
+                 sort: str, show_order: bool) -> None:
+    by_field: Dict[str, List[Dict]] = {}
+    for row in rows:
+        by_field.setdefault(row['field'], []).append(row)
+
+    for field_name, field_rows in by_field.items():
+        print(f"\n{field_name}")
+        print(f"  {'#':>3} {'tier':>4} {'runs':>7} {'hits':>6} {'hit%':>6} {'skipped':>8} "
+              f"{'total ms':>9} {'mean us':>8}  pattern")
+        for row in sorted(field_rows, key=SORT_KEYS[sort]):
+            hit_rate = f"{row['hit_rate'] * 100:.1f}" if row['hit_rate'] is not None else '-'
+            mean = f"{row['mean_us']:.1f}" if row['mean_us'] is not None else '-'
+            pattern = row['pattern'] or ''
+            if len(pattern) > 60:
+                pattern = pattern[:57] + '...'
+            print(f"  {row['index']:>3} {row['tier']:>4} {row['attempts']:>7} {row['hits']:>6} {hit_rate:>6} "
+                  f"{row['skipped']:>8} {row['total_ms']:>9.2f} {mean:>8}  {pattern}")
+
+        dead = [row['index'] for row in field_rows if row['hits'] == 0]
+        if dead:
+            print(f"  never matched: {dead}")
+        if show_order:
+            order = stats.order(field_name, pattern_manager.tiers(field_name))
+            if order != sorted(order):
+                print(f"  adaptive order: {order}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-pattern hit rate and latency report')
+    parser.add_argument('paths', nargs='+', help='OCR texts (.txt files, directories, .jsonl) or images with --images')
+    parser.add_argument('--images', action='store_true', help='Paths are images/directories: run the full extraction')
+    parser.add_argument('--gpu', action='store_true', help='Use GPU acceleration with --images')
+    parser.add_argument('--field', choices=FIELDS, help='Only report this field')
+    parser.add_argument('--sort', choices=sorted(SORT_KEYS), default='order', help='Row order (default: order)')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Show the order adaptive mode would use inside each priority tier')
+    parser.add_argument('--min-attempts', type=int, default=PatternStatsConfig.min_attempts,
+                        help='Runs every pattern of a tier needs before it is reordered (with --adaptive)')
+    parser.add_argument('--json', help='Also write the report rows to this JSON file')
+    args = parser.parse_args()
+
+    # Statistics only: collection itself always runs the declared order
+    stats = PatternStats(PatternStatsConfig(enabled=True))
+    if args.images:
+        pattern_manager, count = collect_from_images(args.paths, stats, args.gpu)
+    else:
+        pattern_manager, count = collect_from_texts(args.paths, stats)
+    if not count:
+        print('No inputs found', file=sys.stderr)
+        sys.exit(1)
+
+    rows = [row for row in stats.rows(pattern_manager) if not args.field or row['field'] == args.field]
+    print(f"inputs: {count}  pattern set: {pattern_manager.version}")
+    stats.config = PatternStatsConfig(enabled=True, adaptive=args.adaptive, min_attempts=args.min_attempts)
+    print_report(rows, pattern_manager, stats, args.sort, args.adaptive)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'inputs': count, 'pattern_version': pattern_manager.version, 'patterns': rows},
+                      f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
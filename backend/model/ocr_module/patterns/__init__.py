@@ -1,4 +1,5 @@
 """Patterns module for regex patterns"""
-from .pattern_manager import PatternManager
+from .pattern_manager import BrandMatch, PatternManager
+from .regex_lint import LintFinding, ProbeResult, lint_pattern, probe_pattern
 
-__all__ = ['PatternManager']
+__all__ = ['PatternManager', 'BrandMatch', 'LintFinding', 'ProbeResult', 'lint_pattern', 'probe_pattern']
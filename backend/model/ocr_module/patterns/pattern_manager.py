@@ -1,7 +1,41 @@
 """
 Pattern Manager for regex patterns used in receipt extraction
+Every pattern is compiled once when the manager is created; call sites use
+the compiled objects instead of passing pattern strings to re.search.
 """
-from typing import Dict, List
+import hashlib
+import json
+import re
+from typing import Dict, List, NamedTuple, Pattern, Tuple
+
+from utils.aho_corasick import AhoCorasick
+
+# Flags field and merchant patterns are compiled with
+FIELD_FLAGS = re.IGNORECASE | re.MULTILINE
+
+# Brand priority by source type (a brand entry may set its own 'priority');
+# among matches of equal priority the longest key wins, then the earliest
+BRAND_TYPE_PRIORITY = {
+    'bank': 4,
+    'retail': 3,
+    'e_wallet': 2,
+    'ride_hailing': 1,
+    'food_delivery': 1,
+}
+
+
+class BrandMatch(NamedTuple):
+    """A brand key found in the uppercased receipt text"""
+    key: str
+    start: int
+    end: int
+    type: str
+    brand: str
+    priority: int
+
+    def to_dict(self) -> Dict:
+        return {'key': self.key, 'start': self.start, 'end': self.end,
+                'type': self.type, 'brand': self.brand, 'priority': self.priority}
 
 
 class PatternManager:
@@ -9,25 +43,95 @@ class PatternManager:
 
     def __init__(self):
         self.patterns = self._init_patterns()
+        self.merchant_patterns = self._init_merchant_patterns()
+        self.helper_patterns = self._init_helper_patterns()
         self.brand_patterns = self._init_brand_patterns()
+        self.pattern_tiers = self._init_pattern_tiers()
+
+        # Compiled registry: field -> patterns in priority order, helper name -> pattern
+        self.compiled: Dict[str, List[Pattern]] = {
+            field_name: [re.compile(pattern, FIELD_FLAGS) for pattern in patterns]
+            for field_name, patterns in self.patterns.items()
+        }
+        self.compiled['merchant'] = [re.compile(pattern, FIELD_FLAGS) for pattern in self.merchant_patterns]
+        self.helpers: Dict[str, Pattern] = {
+            name: re.compile(pattern, flags) for name, (pattern, flags) in self.helper_patterns.items()
+        }
+        self.brand_automaton = AhoCorasick(self.brand_patterns)
+        self.version = self._compute_version()
+
+    def _compute_version(self) -> str:
+        """Content hash of the pattern set (patterns and flags), changes whenever a pattern changes"""
+        content = json.dumps(
+            {
+                'patterns': self.patterns,
+                'field_flags': int(FIELD_FLAGS),
+                'merchant_patterns': self.merchant_patterns,
+                'helper_patterns': {name: [pattern, int(flags)]
+                                    for name, (pattern, flags) in self.helper_patterns.items()},
+                'brand_patterns': self.brand_patterns
+            },
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
+
+    def helper(self, name: str) -> Pattern:
+        """Compiled helper pattern by name"""
+        return self.helpers[name]
+
+    def tiers(self, field_name: str) -> List[int]:
+        """Priority tier of each pattern of a field (undeclared: every pattern its own tier)"""
+        tiers = self.pattern_tiers.get(field_name)
+        if tiers is None:
+            return list(range(len(self.compiled.get(field_name, []))))
+        return tiers
+
+    def brand_priority(self, key: str) -> int:
+        """Priority of a brand key (explicit, else by its source type)"""
+        info = self.brand_patterns[key]
+        return info.get('priority', BRAND_TYPE_PRIORITY.get(info['type'], 0))
+
+    def find_brands(self, text: str) -> List[BrandMatch]:
+        """Every brand key in the text in one pass, best match first
+
+        Positions index into text.upper(). Matches are ordered by priority,
+        then key length (longest first), then position.
+        """
+        matches = []
+        for start, end, key in self.brand_automaton.iter_matches(text.upper()):
+            info = self.brand_patterns[key]
+            matches.append(BrandMatch(key, start, end, info['type'], info['brand'], self.brand_priority(key)))
+        matches.sort(key=lambda match: (-match.priority, -(match.end - match.start), match.start))
+        return matches
 
     def _init_patterns(self) -> Dict[str, List[str]]:
-        """Initialize regex patterns for field extraction"""
+        """Initialize regex patterns for field extraction
+
+        Patterns have to stay close to linear on garbled OCR text and compile
+        on Python 3.10 (no possessive quantifiers). A run in front of a token
+        that cannot start with the run's characters takes the whole run
+        (\s*(?!\s)), stop lookaheads skip spaces up to the first newline, and
+        a pattern that starts with a character run has a run-boundary
+        lookbehind. Where a name may start with whitespace, the whole run is
+        tried first and the alternatives after it give back only the
+        whitespace the original greedy form could give back, so matches stay
+        the same. Check changes with pattern_lint.py.
+        """
         return {
             'amount': [
-                r"(?:ยอดรวม|รวม|total|amount)\s*:?\s*(\d+[.,]\d{2})",
+                r"(?:ยอดรวม|รวม|total|amount)\s*(?!\s):?\s*(?!\s)(\d+[.,]\d{2})",
                 r"(?:จำนวนเงิน).*?(\d{1,3}(?:,\d{3})*\.?\d{2})",
                 r"(\d{1,3}(?:,\d{3})*\.?\d{2})\s*บาท",
-                r"(\d+[.,]\d{2})\s*(?:บาท|THB|baht)",
+                r"(?<!\d)(\d+[.,]\d{2})\s*(?!\s)(?:บาท|THB|baht)",
                 r"(?:ยอด|total).*?(\d+\.\d{2})",
                 # Enhanced bank transfer patterns
-                r"จำนวนเงิน\s*[^\d]*(\d{1,3}(?:,\d{3})*\.?\d{2})",
+                r"จำนวนเงิน[^\d]*(?![^\d])(\d{1,3}(?:,\d{3})*\.?\d{2})",
                 r"(\d{1,3},\d{3}\.\d{2})",  # Specific for 3,000.00 format
                 # OCR error patterns - common misreads
                 r"(?:b|฿)\s*([1lioO0]+[.,]\d{2})",  # ฿ read as 'b', digits as letters
                 r"(?:b|฿)\s*(\d+[.,]\d{2})",        # Normal ฿ pattern
-                r"([1lioO0]+[oO0][.,]\d{2})",       # OCR digit confusion
-                r"(\d+[oO][.,]\d{2})"               # Zero read as 'O'
+                r"(?<![1lioO0])([1lioO0]+[oO0][.,]\d{2})",       # OCR digit confusion
+                r"(?<!\d)(\d+[oO][.,]\d{2})"               # Zero read as 'O'
             ],
             'fee': [
                 r"(?:ค่าธรรมเนียม|fee|charge).*?(\d+[.,]\d{2})",
@@ -37,12 +141,12 @@ class PatternManager:
             ],
             'reference_id': [
                 r"(?:เลขที่รายการ|reference|ref#?|tid|r#|รหัสอ้างอิง)\s*:?\s*([A-Za-z0-9]+)",
-                r"(\d{12}[A-Za-z0-9]{3,}\d+)",  # KBank format: 12 digits + 3+ alphanumeric + digits
-                r"(\d{10,}[A-Za-z0-9]+)",  # Generic: 10+ digits followed by alphanumeric
+                r"(?<!\d)(\d{12}[A-Za-z0-9]{3,}\d+)",  # KBank format: 12 digits + 3+ alphanumeric + digits
+                r"(?<!\d)(\d{10,}[A-Za-z0-9]+)",  # Generic: 10+ digits followed by alphanumeric
                 r"(?:transaction|ref)\s*id.*?([A-Za-z0-9]+)",
                 r"(?:หมายเลข|รหัส).*?([A-Za-z0-9]{8,})",
                 r"([A-Za-z]{3}\d{8,})",
-                r"(\d{10,}:\s*[A-Z0-9]+)"
+                r"(?<!\d)(\d{10,}:\s*(?!\s)[A-Z0-9]+)"
             ],
             'date': [
                 r"(\d{1,2}/\d{1,2}/\d{2,4})(?:\s*[|\s]\s*(\d{1,2}:\d{2}))?",
@@ -56,95 +160,159 @@ class PatternManager:
             ],
             'sender_name': [
                 # Pattern หาชื่อที่มีคำนำหน้า - ป้องกันการรวม "พร้อมเพย์"
-                r"จาก[^\n]*?((?:นาย|นาง|นางสาว|เด็กชาย|เด็กหญิง)\s+[ก-๙a-zA-Z\s]{2,}?)(?=\s*(?:พร้อมเพย์|บัญชี|ธนาคาร|bank|\n|$))",
-                r"ผู้โอน[:\s]*((?:นาย|นาง|นางสาว|เด็กชาย|เด็กหญิง)\s+[ก-๙a-zA-Z\s]{2,}?)(?=\s*(?:พร้อมเพย์|บัญชี|ธนาคาร|bank|\n|$))",
-                r"ส่งเงินจาก[:\s]*((?:นาย|นาง|นางสาว|เด็กชาย|เด็กหญิง)\s+[ก-๙a-zA-Z\s]{2,}?)(?=\s*(?:พร้อมเพย์|บัญชี|ธนาคาร|bank|\n|$))",
+                r"จาก[^\n]*?((?:นาย|นาง|นางสาว|เด็กชาย|เด็กหญิง)(?:\s+(?!\s)[ก-๙a-zA-Z\s]{2,}?|\s+[ก-๙a-zA-Z\s]{2}))(?=[^\S\n]*(?![^\S\n])(?:พร้อมเพย์|บัญชี|ธนาคาร|bank|\n|$))",
+                r"ผู้โอน[:\s]*(?![:\s])((?:นาย|นาง|นางสาว|เด็กชาย|เด็กหญิง)(?:\s+(?!\s)[ก-๙a-zA-Z\s]{2,}?|\s+[ก-๙a-zA-Z\s]{2}))(?=[^\S\n]*(?![^\S\n])(?:พร้อมเพย์|บัญชี|ธนาคาร|bank|\n|$))",
+                r"ส่งเงินจาก[:\s]*(?![:\s])((?:นาย|นาง|นางสาว|เด็กชาย|เด็กหญิง)(?:\s+(?!\s)[ก-๙a-zA-Z\s]{2,}?|\s+[ก-๙a-zA-Z\s]{2}))(?=[^\S\n]*(?![^\S\n])(?:พร้อมเพย์|บัญชี|ธนาคาร|bank|\n|$))",
                 # Bank transfer patterns - look for names near account info
-                r"((?:นาย|นาง|นางสาว)\s+[ก-๙a-zA-Z\s]{3,}?)(?=\s*(?:บัญชี|ไอแบงก์|อินทร์))",
-                r"(?:นาย|นาง|นางสาว)\s+([\w\s]+?)\s+(?:อินทร์)",  # For "สุดเขต อินทร์อยู่" pattern
+                r"((?:นาย|นาง|นางสาว)(?:\s+(?!\s)[ก-๙a-zA-Z\s]{3,}?|\s+[ก-๙a-zA-Z\s]{3}))(?=\s*(?!\s)(?:บัญชี|ไอแบงก์|อินทร์))",
+                r"(?:นาย|นาง|นางสาว)(?:\s+(?!\s)|\s+(?=\s\s(?!\s)))([\w\s]+?)\s+(?!\s)(?:อินทร์)",  # For "สุดเขต อินทร์อยู่" pattern
                 # Pattern หาชื่อที่ไม่มีคำนำหน้าแต่อยู่หลัง "จาก"
-                r"จาก[^\n]*?([ก-๙a-zA-Z\s]{3,})(?=\s*(?:บัญชี|ธนาคาร|bank|\n|$))",
+                r"จาก(?:[^\n]*?[^ก-๙a-zA-Z\s])??([ก-๙a-zA-Z\s]{3,})(?=[^\S\n]*(?![^\S\n])(?:บัญชี|ธนาคาร|bank|\n|$))",
                 # KBank transfer: first name after success message (usually sender)
-                r"โอนเงินสำเร็จ[^ก-๙]*?([ก-๙a-zA-Z\s]{3,}?)(?=\s*xxx|$)",
+                r"โอนเงินสำเร็จ(?:[^ก-๙]*?[^ก-๙a-zA-Z\s])??([ก-๙a-zA-Z\s]{3,}?)(?=\s*(?!\s)xxx|$)",
                 # Pattern สำหรับ TrueMoney - ชื่อผู้ส่งที่อยู่หลัง "จากวอลเล็ท"
-                r"จากวอลเล็ท\s+((?:สุเขทา|[ก-๙a-zA-Z\s]+?)\s+[ก-๙a-zA-Z\s]{2,}?)(?=\s*บัญชีทรูมันนี่)",
+                r"จากวอลเล็ท(?=[ก-๙a-zA-Z\s]*?บัญชีทรูมันนี่)(?:\s+(?!\s)|\s+(?=\s\s(?!\s))|\s+(?=\s{3}(?!\s))|\s+(?=\s{4}(?!\s)))((?:สุเขทา|[ก-๙a-zA-Z\s]+?)(?:\s+(?!\s)[ก-๙a-zA-Z\s]{2,}?|\s+(?=\s(?!\s))\s[ก-๙a-zA-Z\s]|\s+(?=\s\s(?!\s))\s\s))(?=\s*(?!\s)บัญชีทรูมันนี่)",
                 # Pattern สำหรับชื่อที่อยู่ก่อน "อินทร์" (TrueMoney specific) - รวมถึง ****
-                r"([ก-๙a-zA-Z\s\*]{3,}?)\s+อินทร์",
+                r"(?<![ก-๙a-zA-Z\s\*])([ก-๙a-zA-Z\s\*]{3,}?)\s+(?!\s)อินทร์",
                 # Pattern สำหรับชื่อแบบอิสระที่ไม่มี masked characters
-                r"^((?:นาย|นาง|นางสาว)\s+[ก-๙a-zA-Z\s]{2,}?)(?=\s*(?:บัญชี|ธนาคาร|bank|\n))",
+                r"^((?:นาย|นาง|นางสาว)(?:\s+(?!\s)[ก-๙a-zA-Z\s]{2,}?|\s+[ก-๙a-zA-Z\s]{2}))(?=[^\S\n]*(?![^\S\n])(?:บัญชี|ธนาคาร|bank|\n))",
                 # Pattern สำหรับ multi-line names
-                r"((?:นาย|นาง|นางสาว)\s*\n\s*[ก-๙a-zA-Z\s]{2,})"
+                r"((?:นาย|นาง|นางสาว)[^\S\n]*(?![^\S\n])\n[ก-๙a-zA-Z\s]{2,})"
             ],
             'receiver_name': [
                 # ========== PRIORITY 1: Organizations/Institutions (มีความจำเพาะสูง) ==========
                 # มหาวิทยาลัย/สถาบัน - Pattern เฉพาะที่มีวงเล็บ
-                r"(มทร\.\s*[ก-๙a-zA-Z\s]*)\s*\(\s*([ก-๙a-zA-Z\s]*)\s*\)",  # "มทร.ตะวันออก (ค่าธรรมเนียมการศึกษา)"
-                r"((?:มหาวิทยาลัย|มทร\.|บทร\.|มข\.|มอ\.|ม\.)[ก-๙a-zA-Z\s\.]*)\s*\([^)]+\)",  # ชื่อมหาวิทยาลัยที่มีวงเล็บ
+                r"(มทร\.\s*(?!\s)[ก-๙a-zA-Z\s]*(?![ก-๙a-zA-Z\s]))\s*(?!\s)\(\s*(?!\s)([ก-๙a-zA-Z\s]*(?![ก-๙a-zA-Z\s]))\s*(?!\s)\)",  # "มทร.ตะวันออก (ค่าธรรมเนียมการศึกษา)"
+                r"((?:มหาวิทยาลัย|มทร\.|บทร\.|มข\.|มอ\.|ม\.)[ก-๙a-zA-Z\s\.]*(?![ก-๙a-zA-Z\s\.]))\s*\([^)]+(?![^)])\)",  # ชื่อมหาวิทยาลัยที่มีวงเล็บ
 
                 # องค์กร/สถาบัน - มีคำสำคัญ
-                r"([ก-๙a-zA-Z\s\.]+(?:โรงเรียน|มหาวิทยาลัย|วิทยาลัย|สถาบัน|ศูนย์|องค์การ|กรม|กระทรวง|เทศบาล|องค์การบริหาร|สำนัก)[ก-๙a-zA-Z\s\(\)\.]*?)(?=\s*\d{5,}|\s*พร้อมเพย์|\n|$)",
+                r"(?<![ก-๙a-zA-Z\s\.])([ก-๙a-zA-Z\s\.]+(?:โรงเรียน|มหาวิทยาลัย|วิทยาลัย|สถาบัน|ศูนย์|องค์การ|กรม|กระทรวง|เทศบาล|องค์การบริหาร|สำนัก)[ก-๙a-zA-Z\s\(\)\.]*?)(?=\s*(?!\s)\d{5,}|\s*(?!\s)พร้อมเพย์|\n|$)",
 
                 # บริษัท/ร้านค้า
-                r"((?:บริษัท|ห้างหุ้นส่วน|หจก\.|บจก\.)[ก-๙a-zA-Z\s\(\)\.]+?)(?=\s*\d{5,}|\s*พร้อมเพย์|\n|$)",
+                r"((?:บริษัท|ห้างหุ้นส่วน|หจก\.|บจก\.)[ก-๙a-zA-Z\s\(\)\.]+?)(?=\s*(?!\s)\d{5,}|\s*(?!\s)พร้อมเพย์|\n|$)",
 
                 # ชื่อที่มีวงเล็บ (มักเป็นองค์กร)
-                r"([ก-๙a-zA-Z\s]+\s*\([ก-๙a-zA-Z\s]+\))(?=\s*\d{5,}|\s*\d{10,}|\s*พร้อมเพย์|\n|$)",
+                r"(?<![ก-๙a-zA-Z\s])([ก-๙a-zA-Z\s]+(?![ก-๙a-zA-Z\s])\([ก-๙a-zA-Z\s]+(?![ก-๙a-zA-Z\s])\))(?=\s*(?!\s)\d{5,}|\s*(?!\s)\d{10,}|\s*(?!\s)พร้อมเพย์|\n|$)",
 
                 # ========== PRIORITY 2: Context-based (มีคำนำ "ถึง", "ผู้รับ") ==========
                 # "ถึง" + คำนำหน้า (นาย/นาง/นางสาว) - แม่นยำสูง
-                r"ถึง\s*[:\-]?\s*((?:นาย|นาง|นางสาว|น\.ส\.|ด\.ช\.|ด\.ญ\.)\s+[ก-๙a-zA-Z\s]{2,}?)(?=\s*(?:พร้อมเพย์|บัญชี|ธนาคาร|เบอร์|xxx|\*|\d{10}|\n|$))",
+                r"ถึง\s*(?!\s)[:\-]?\s*(?!\s)((?:นาย|นาง|นางสาว|น\.ส\.|ด\.ช\.|ด\.ญ\.)(?:\s+(?!\s)[ก-๙a-zA-Z\s]{2,}?|\s+[ก-๙a-zA-Z\s]{2}))(?=[^\S\n]*(?![^\S\n])(?:พร้อมเพย์|บัญชี|ธนาคาร|เบอร์|xxx|\*|\d{10}|\n|$))",
 
                 # "ถึง" multi-line - OCR แยกบรรทัด
-                r"ถึง\s*[:\-]?\s*\n\s*((?:นาย|นาง|นางสาว|น\.ส\.)\s+[ก-๙a-zA-Z\s]{2,}?)(?=\s*(?:พร้อมเพย์|บัญชี|\n|$))",
+                r"ถึง(?:\s*(?!\s)[:\-]|(?!\s*[:\-]))(?=\s*\n)\s*(?!\s)((?:นาย|นาง|นางสาว|น\.ส\.)(?:\s+(?!\s)[ก-๙a-zA-Z\s]{2,}?|\s+[ก-๙a-zA-Z\s]{2}))(?=[^\S\n]*(?![^\S\n])(?:พร้อมเพย์|บัญชี|\n|$))",
 
                 # "ผู้รับ" / "รับเงินที่" - explicit receiver
-                r"ผู้รับ\s*[:\-]?\s*((?:นาย|นาง|นางสาว|น\.ส\.)\s+[ก-๙a-zA-Z\s]{2,}?)(?=\s*(?:พร้อมเพย์|บัญชี|ธนาคาร|\n|$))",
-                r"รับเงิน(?:ที่|จาก)?\s*[:\-]?\s*((?:นาย|นาง|นางสาว)\s+[ก-๙a-zA-Z\s]{2,}?)(?=\s*(?:พร้อมเพย์|บัญชี|\n|$))",
+                r"ผู้รับ\s*(?!\s)[:\-]?\s*(?!\s)((?:นาย|นาง|นางสาว|น\.ส\.)(?:\s+(?!\s)[ก-๙a-zA-Z\s]{2,}?|\s+[ก-๙a-zA-Z\s]{2}))(?=[^\S\n]*(?![^\S\n])(?:พร้อมเพย์|บัญชี|ธนาคาร|\n|$))",
+                r"รับเงิน(?:ที่|จาก)?\s*(?!\s)[:\-]?\s*(?!\s)((?:นาย|นาง|นางสาว)(?:\s+(?!\s)[ก-๙a-zA-Z\s]{2,}?|\s+[ก-๙a-zA-Z\s]{2}))(?=[^\S\n]*(?![^\S\n])(?:พร้อมเพย์|บัญชี|\n|$))",
 
                 # "ถึง" ไม่มีคำนำหน้า (ลำดับถัดไป)
-                r"ถึง\s*[:\-]?\s*([ก-๙a-zA-Z\s]{3,}?)(?=\s*(?:พร้อมเพย์|บัญชี|ธนาคาร|\d{10}|\n|$))",
+                r"ถึง(?:\s*[:\-])?(?:\s*(?!\s)|\s*(?=[ก-๙a-zA-Z\s]{3}(?:[^\S\n]*(?![^\S\n])(?:พร้อมเพย์|บัญชี|ธนาคาร|\d{10}|\n|$))))([ก-๙a-zA-Z\s]{3,}?)(?=[^\S\n]*(?![^\S\n])(?:พร้อมเพย์|บัญชี|ธนาคาร|\d{10}|\n|$))",
 
                 # ========== PRIORITY 3: PromptPay/Bank specific patterns ==========
                 # "พร้อมเพย์" แล้วตามด้วยชื่อ - Bank transfers
-                r"พร้อมเพย์\s*[:\-]?\s*(?:\d{10})?\s*\n?\s*((?:นาย|นาง|นางสาว)\s+[ก-๙a-zA-Z\s]{3,}?)(?=\s*(?:อินทร์|xxx|\*|\n|$))",
+                r"พร้อมเพย์\s*(?!\s)[:\-]?\s*(?!\s)(?:\d{10}|(?!\d{10}))\s*(?!\s)((?:นาย|นาง|นางสาว)(?:\s+(?!\s)[ก-๙a-zA-Z\s]{3,}?|\s+[ก-๙a-zA-Z\s]{3}))(?=[^\S\n]*(?![^\S\n])(?:อินทร์|xxx|\*|\n|$))",
 
                 # "พร้อมเพย์" ข้ามบรรทัด
-                r"พร้อมเพย์[^\n]*\n[^\n]*?((?:นาย|นาง|นางสาว)\s+[ก-๙a-zA-Z\s]{3,}?)(?=\s*(?:อินทร์|พร้อมเพย์|xxx|\n|$))",
+                r"พร้อมเพย์[^\n]*\n[^\n]*?((?:นาย|นาง|นางสาว)(?:\s+(?!\s)[ก-๙a-zA-Z\s]{3,}?|\s+[ก-๙a-zA-Z\s]{3}))(?=[^\S\n]*(?![^\S\n])(?:อินทร์|พร้อมเพย์|xxx|\n|$))",
 
                 # หลัง PromptPay หลายบรรทัด
-                r"(?:พร้อมเพย์.*?\n.*?)((?:นาย|นาง|นางสาว)\s+[ก-๙a-zA-Z\s]+?)(?=\s*(?:อินทร์|xxx|\*|\d{10}|\n|$))",
+                r"(?:พร้อมเพย์.*?\n.*?)((?:นาย|นาง|นางสาว)(?:\s+(?!\s)[ก-๙a-zA-Z\s]+?|\s+[ก-๙a-zA-Z\s]))(?=[^\S\n]*(?![^\S\n])(?:อินทร์|xxx|\*|\d{10}|\n|$))",
 
                 # KBank: หลัง xxx (masked account)
-                r"xxx[^ก-๙]*?([ก-๙a-zA-Z\s]{3,}?)(?=\s*(?:xxx|บัญชี|พร้อมเพย์|$))",
+                r"xxx(?:[^ก-๙]*?[^ก-๙a-zA-Z\s])??([ก-๙a-zA-Z\s]{3,}?)(?=[^\S\n]*(?![^\S\n])(?:xxx|บัญชี|พร้อมเพย์|$))",
 
                 # ========== PRIORITY 4: Position-based (ตำแหน่งในข้อความ) ==========
                 # หลังเลขบัญชี/เบอร์โทร 10 หลัก
-                r"\d{10}\s*\n?\s*((?:นาย|นาง|นางสาว)\s+[ก-๙a-zA-Z\s]{2,}?)(?=\s*(?:พร้อมเพย์|บัญชี|อินทร์|\n|$))",
+                r"\d{10}\s*(?!\s)((?:นาย|นาง|นางสาว)(?:\s+(?!\s)[ก-๙a-zA-Z\s]{2,}?|\s+[ก-๙a-zA-Z\s]{2}))(?=[^\S\n]*(?![^\S\n])(?:พร้อมเพย์|บัญชี|อินทร์|\n|$))",
 
                 # หลังคำว่า "บัญชี" / "account"
-                r"(?:บัญชี|account)\s*[:\-]?\s*([ก-๙a-zA-Z\s]{3,}?)(?=\s*(?:\d{5,}|พร้อมเพย์|\n|$))",
+                r"(?:บัญชี|account)(?:\s*[:\-])?(?:\s*(?!\s)|\s*(?=[ก-๙a-zA-Z\s]{3}(?:[^\S\n]*(?![^\S\n])(?:\d{5,}|พร้อมเพย์|\n|$))))([ก-๙a-zA-Z\s]{3,}?)(?=[^\S\n]*(?![^\S\n])(?:\d{5,}|พร้อมเพย์|\n|$))",
 
                 # ชื่อที่มี "อินทร์" ต่อท้าย (TrueMoney pattern)
-                r"([ก-๙a-zA-Z\s]{3,}?)\s+อินทร์(?:\s*[ก-๙a-zA-Z\s]*)?(?=\s*(?:บัญชี|พร้อมเพย์|\n|$))",
+                r"(?<![ก-๙a-zA-Z\s])([ก-๙a-zA-Z\s]{3,}?)\s+(?!\s)อินทร์[ก-๙a-zA-Z\s]*(?=[^\S\n]*(?![^\S\n])(?:บัญชี|พร้อมเพย์|\n|$))",
 
                 # ========== PRIORITY 5: Generic patterns (ใช้ตอนสุดท้าย) ==========
                 # ชื่อที่มีคำนำหน้า ตามด้วย stop words
-                r"((?:นาย|นาง|นางสาว|น\.ส\.)\s+[ก-๙a-zA-Z\s]{2,}?)(?=\s*(?:บัญชี|ธนาคาร|bank|พร้อมเพย์|xxx|\*|\d{10}|\n|$))",
+                r"((?:นาย|นาง|นางสาว|น\.ส\.)(?:\s+(?!\s)[ก-๙a-zA-Z\s]{2,}?|\s+[ก-๙a-zA-Z\s]{2}))(?=[^\S\n]*(?![^\S\n])(?:บัญชี|ธนาคาร|bank|พร้อมเพย์|xxx|\*|\d{10}|\n|$))",
 
                 # ชื่อเต็มที่แยกคำนำหน้ากับชื่อ (OCR แยก)
-                r"(?:นาย|นาง|นางสาว)\s*\n\s*([ก-๙a-zA-Z\s]{2,}?)(?=\s*(?:บัญชี|พร้อมเพย์|\n|$))",
+                r"(?:นาย|นาง|นางสาว)[^\S\n]*\n(?:\s*(?!\s)|\s*(?=[ก-๙a-zA-Z\s]{2}(?:[^\S\n]*(?![^\S\n])(?:บัญชี|พร้อมเพย์|\n|$))))([ก-๙a-zA-Z\s]{2,}?)(?=[^\S\n]*(?![^\S\n])(?:บัญชี|พร้อมเพย์|\n|$))",
 
                 # Fallback: ชื่อทั่วไปที่มี 2-3 คำขึ้นไป
-                r"\b([ก-๙]{2,}\s+[ก-๙]{2,}(?:\s+[ก-๙]{2,})?)(?=\s*(?:พร้อมเพย์|บัญชี|xxx|\d{10}|\n|$))",
+                r"\b([ก-๙]{2,}\s+(?!\s)[ก-๙]{2,}(?:\s+(?!\s)[ก-๙]{2,})?)(?=[^\S\n]*(?![^\S\n])(?:พร้อมเพย์|บัญชี|xxx|\d{10}|\n|$))",
             ]
         }
 
-    def _init_brand_patterns(self) -> Dict[str, Dict[str, str]]:
-        """Initialize brand detection patterns"""
+    def _init_pattern_tiers(self) -> Dict[str, List[int]]:
+        """Initialize priority tiers: patterns in one tier are interchangeable in order
+
+        Only used by adaptive ordering (see processors.pattern_stats).
+        """
+        tiers = {
+            # PRIORITY 1-5 groups of the receiver_name patterns
+            'receiver_name': [1] * 5 + [2] * 5 + [3] * 4 + [4] * 3 + [5] * 3,
+        }
+        for field_name, field_tiers in tiers.items():
+            if len(field_tiers) != len(self.patterns[field_name]):
+                raise ValueError(f"Pattern tiers of {field_name} do not match its patterns")
+        return tiers
+
+    def _init_merchant_patterns(self) -> List[str]:
+        """Initialize merchant (business name) patterns
+
+        The label patterns are linear forms of LABEL\s*:?\s*([^\n\r]+): the
+        whitespace run after the label is taken whole, and when only whitespace
+        follows the label up to the end of the text the last two branches give
+        back what the greedy form gave back (its last space, or the colon).
+        """
+        return [
+            r"สาขา\s+([^:\n\r]+)",
+            r"(?:ร้าน|shop|store)(?:\s*(?!\s)(?::\s*(?=\S)|(?=[^:\s])|:\s*(?=[^\S\n\r][\n\r]*\Z)|(?=:[\n\r]*\Z))|\s*(?=[^\S\n\r][\n\r]*\Z))([^\n\r]+)",
+            r"(?:merchant|ผู้ขาย)(?:\s*(?!\s)(?::\s*(?=\S)|(?=[^:\s])|:\s*(?=[^\S\n\r][\n\r]*\Z)|(?=:[\n\r]*\Z))|\s*(?=[^\S\n\r][\n\r]*\Z))([^\n\r]+)",
+            r"^([A-Z\s]{3,20})(?:ที่|@|location)",
+            r"รหัสร้าน\s*:\s*(\d+)",
+            # Pattern for coffee shop names
+            r"(เดอะเฟิร์สเอสเปรสโซ่โรสเตอร์)",
+            r"(บจก\.\s*[^\n\r]+)",
+            # General business name patterns
+            r"(?<![ก-๙a-zA-Z\s])([ก-๙a-zA-Z\s]+(?:โรสเตอร์|คอฟฟี่|ร้าน|เซ็นเตอร์))",
+        ]
+
+    def _init_helper_patterns(self) -> Dict[str, Tuple[str, int]]:
+        """Initialize named helper patterns: name -> (pattern, flags)"""
+        return {
+            # Field format validation
+            'amount_format': (r"^\d+([.,]\d{2})?$", 0),
+            'date_format': (r"\d{1,2}/\d{1,2}/\d{2,4}|\d{1,2}-\d{1,2}-\d{2,4}|\d{1,2}\s+[ก-๙]{1,3}\.?\s*\d{2,4}", 0),
+            'reference_format': (r"^[A-Za-z0-9:]+$", 0),
+            'thai_letters': (r"[ก-๙]", 0),
+            'latin_letters': (r"[a-zA-Z]", 0),
+            'year': (r"(\d{4})", 0),
+            # Organization names split across blocks
+            'org_region': (r"(?<![ก-๙a-zA-Z\.])[ก-๙a-zA-Z\.]+(?:ตะวันออก|ตะวันตก|เหนือ|ใต้|กลาง)", 0),
+            'org_keyword': (r"มทร\.|บทร\.|โรงเรียน|มหาวิทยาลัย|วิทยาลัย", 0),
+            'org_parentheses': (r"\([ก-๙a-zA-Z\s]*\)|\([ก-๙a-zA-Z\s]*$|^[ก-๙a-zA-Z\s]*\)", 0),
+            # TrueMoney: top account (sender) -> "จากวอลเล็ท" -> bottom account (receiver)
+            'truemoney_sender': (r"(?<![ก-๙a-zA-Z\s\*])([ก-๙a-zA-Z\s\*]{3,}?)\s+(?!\s)(?=บัญชีทรูมันนี่.*?จากวอลเล็ท)", re.IGNORECASE | re.DOTALL),
+            'truemoney_receiver': (r"จากวอลเล็ท(?:\s*(?!\s)|\s*(?=[ก-๙a-zA-Z\s]{3}(?:\s*(?!\s)บัญชีทรูมันนี่|$)))([ก-๙a-zA-Z\s]{3,}?)(?=\s*(?!\s)บัญชีทรูมันนี่|$)", re.IGNORECASE | re.DOTALL),
+            'truemoney_account_name': (r"(?=[ก-๙a-zA-Z\s\*]*?บัญชีทรูมันนี่)([ก-๙a-zA-Z\s\*]{3,}?)(?=\s*(?!\s)บัญชีทรูมันนี่)", re.IGNORECASE),
+            'truemoney_word': (r"([ก-๙a-zA-Z\s]{3,}?)(?=\s|$)", 0),
+            # Bank transfers
+            'titled_name_prefix': (r"^(?:นาย|นาง|นางสาว|น\.ส\.|เด็กชาย|เด็กหญิง)\s+[ก-๙a-zA-Z\s]+", 0),
+            'bank_name': (r"((?:นาย|นาง|นางสาว)(?:\s+(?!\s)[ก-๙a-zA-Z\s]{3,}?|\s+[ก-๙a-zA-Z\s]{3}))(?=[^\S\n]*(?![^\S\n])(?:อินทร์|บัญชี|พร้อมเพย์|\*|\n|$))", re.IGNORECASE),
+            'titled_name_block': (r"^(นาย|นาง|นางสาว)\s+[ก-๙\s]+$", 0),
+            'title_only': (r"^(นาย|นาง|นางสาว)$", 0),
+            'inthra_name_block': (r"^[ก-๙\s]{3,}.*อินทร์.*$", 0),
+            # Small amounts for the fallback search
+            'fallback_amount': (r"(\d{2,3}\.\d{2})", 0),
+        }
+
+    def _init_brand_patterns(self) -> Dict[str, Dict]:
+        """Initialize brand detection patterns (uppercase key -> type, brand, optional priority)"""
         return {
             # Banks - all grouped under "Bank"
             'K PLUS': {'type': 'bank', 'brand': 'Bank'},
-            'K+': {'type': 'bank', 'brand': 'Bank'},
+            'K+': {'type': 'bank', 'brand': 'Bank', 'priority': 0},
             'กสิกรไทย': {'type': 'bank', 'brand': 'Bank'},
             'KBANK': {'type': 'bank', 'brand': 'Bank'},
             'KASIKORN': {'type': 'bank', 'brand': 'Bank'},
@@ -158,14 +326,14 @@ class PatternManager:
             'ทหารไทย': {'type': 'bank', 'brand': 'Bank'},
             'UOB': {'type': 'bank', 'brand': 'Bank'},
             'CIMB': {'type': 'bank', 'brand': 'Bank'},
-            # Generic bank detection patterns
-            'BANK': {'type': 'bank', 'brand': 'Bank'},
+            # Generic bank detection patterns (only when nothing more specific matches)
+            'BANK': {'type': 'bank', 'brand': 'Bank', 'priority': 0},
             # Retail stores
             '7-ELEVEN': {'type': 'retail', 'brand': '7-Eleven'},
             '7-ELEVE': {'type': 'retail', 'brand': '7-Eleven'},
             '7-ELEVEท': {'type': 'retail', 'brand': '7-Eleven'},
             'เซเว่น': {'type': 'retail', 'brand': '7-Eleven'},
-            'CP': {'type': 'retail', 'brand': 'CP'},
+            'CP': {'type': 'retail', 'brand': 'CP', 'priority': 0},
             'เซ็นทรัล': {'type': 'retail', 'brand': 'Central'},
             'โลตัส': {'type': 'retail', 'brand': 'Lotus'},
             'บิ๊กซี': {'type': 'retail', 'brand': 'Big C'},
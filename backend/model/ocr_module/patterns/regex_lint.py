@@ -0,0 +1,426 @@
+"""
+Catastrophic backtracking checks for the receipt patterns
+Static rules look at the parsed pattern for the shapes that make the
+backtracking re engine super-linear: quantifiers nested inside quantifiers,
+adjacent repeats whose characters overlap (the engine tries every split of
+the text between them) and an unanchored leading run (search() restarts
+inside the run). The probe runs a pattern in a child process on inputs built
+from its own literals and character classes at two lengths and estimates the
+growth exponent of the slowest one; a pattern that does not finish is
+reported as a timeout.
+"""
+import math
+import multiprocessing
+import re
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional, Pattern, Sequence, Set, Tuple
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
+
+_MAXREPEAT = sre_constants.MAXREPEAT
+_GREEDY = sre_constants.MAX_REPEAT
+_LAZY = sre_constants.MIN_REPEAT
+_POSSESSIVE = getattr(sre_constants, 'POSSESSIVE_REPEAT', None)
+_ATOMIC_GROUP = getattr(sre_constants, 'ATOMIC_GROUP', None)
+_BACKTRACKING = (_GREEDY, _LAZY)
+
+# Characters the class overlap check and the probe inputs are built from
+ALPHABET = ('กขนมยรลวสหอะาิีุู่้๊๋์ำเแโใไๆ๐๑๙'
+            'aeoxzAEKOXZl0159 \t\n.,:;-_/()*#@฿')
+
+_CATEGORIES = {
+    sre_constants.CATEGORY_DIGIT: str.isdecimal,
+    sre_constants.CATEGORY_NOT_DIGIT: lambda char: not char.isdecimal(),
+    sre_constants.CATEGORY_SPACE: str.isspace,
+    sre_constants.CATEGORY_NOT_SPACE: lambda char: not char.isspace(),
+    sre_constants.CATEGORY_WORD: lambda char: char.isalnum() or char == '_',
+    sre_constants.CATEGORY_NOT_WORD: lambda char: not (char.isalnum() or char == '_'),
+}
+
+# Probe verdicts: a pattern is pathological when it grows at least this fast and is measurably slow
+PATHOLOGICAL_EXPONENT = 2.5
+SLOW_EXPONENT = 1.5
+MIN_SIGNIFICANT_MS = 0.5
+# Appended to every probe input (nothing, and a character no receipt pattern expects)
+PROBE_SUFFIXES = ('', '!')
+
+
+class LintFinding(NamedTuple):
+    """One static finding on a pattern"""
+    rule: str
+    degree: Optional[int]  # estimated polynomial degree of one search (None: exponential)
+    message: str
+    suggestion: str
+
+    def to_dict(self) -> Dict:
+        return {'rule': self.rule, 'degree': self.degree, 'message': self.message, 'suggestion': self.suggestion}
+
+
+class ProbeResult(NamedTuple):
+    """Slowest generated input of a pattern at the probe lengths"""
+    short_ms: float
+    long_ms: float
+    exponent: Optional[float]  # None when the pattern timed out
+    sample: str                # prefix + repeated unit + suffix of the slowest input
+    timed_out: bool
+
+    @property
+    def verdict(self) -> str:
+        """'timeout', 'pathological' (super-quadratic), 'slow' (about quadratic) or 'ok'"""
+        if self.timed_out:
+            return 'timeout'
+        if self.long_ms < MIN_SIGNIFICANT_MS:
+            return 'ok'
+        if self.exponent >= PATHOLOGICAL_EXPONENT:
+            return 'pathological'
+        if self.exponent >= SLOW_EXPONENT:
+            return 'slow'
+        return 'ok'
+
+    def to_dict(self) -> Dict:
+        return {'verdict': self.verdict, 'short_ms': round(self.short_ms, 3), 'long_ms': round(self.long_ms, 3),
+                'exponent': round(self.exponent, 2) if self.exponent is not None else None,
+                'sample': self.sample}
+
+
+def _parse(pattern: Pattern):
+    return sre_parse.parse(pattern.pattern, pattern.flags)
+
+
+def _char_set(op, av, flags: int) -> Optional[Set[str]]:
+    """Alphabet characters a single-character item matches (None: not a single-character item)"""
+    ignore_case = flags & re.IGNORECASE
+
+    def literal(code: int, char: str) -> bool:
+        if ignore_case:
+            return char.lower() == chr(code).lower()
+        return char == chr(code)
+
+    if op is sre_constants.LITERAL:
+        return {char for char in ALPHABET if literal(av, char)}
+    if op is sre_constants.NOT_LITERAL:
+        return {char for char in ALPHABET if not literal(av, char)}
+    if op is sre_constants.ANY:
+        return {char for char in ALPHABET if char != '\n' or flags & re.DOTALL}
+    if op is not sre_constants.IN:
+        return None
+
+    negate = False
+    tests = []
+    for item_op, item_av in av:
+        if item_op is sre_constants.NEGATE:
+            negate = True
+        elif item_op is sre_constants.LITERAL:
+            tests.append(lambda char, code=item_av: literal(code, char))
+        elif item_op is sre_constants.RANGE:
+            low, high = item_av
+            tests.append(lambda char, low=low, high=high: any(
+                low <= ord(variant) <= high
+                for variant in ((char, char.lower(), char.upper()) if ignore_case else (char,))))
+        elif item_op is sre_constants.CATEGORY and item_av in _CATEGORIES:
+            tests.append(_CATEGORIES[item_av])
+        else:
+            return None
+    return {char for char in ALPHABET if any(test(char) for test in tests) != negate}
+
+
+def _repeat_chars(op, av, flags: int) -> Optional[Set[str]]:
+    """Character set of a repeat of one character (None otherwise)"""
+    body = list(av[2])
+    if len(body) != 1:
+        return None
+    return _char_set(body[0][0], body[0][1], flags)
+
+
+def _flatten(items) -> List:
+    """Items of a sequence with plain groups inlined (groups do not change backtracking)"""
+    flat = []
+    for op, av in items:
+        if op is sre_constants.SUBPATTERN and not av[1] and not av[2]:
+            flat.extend(_flatten(av[3]))
+        else:
+            flat.append((op, av))
+    return flat
+
+
+def _describe(chars: Set[str]) -> str:
+    shown = ''.join(sorted(chars))
+    return repr(shown if len(shown) <= 12 else shown[:12] + '...')
+
+
+def _is_repeat(op, av, backtracking_only: bool = True) -> bool:
+    if op in _BACKTRACKING:
+        return True
+    return not backtracking_only and _POSSESSIVE is not None and op is _POSSESSIVE
+
+
+def _unbounded(av) -> bool:
+    return av[1] == _MAXREPEAT or av[1] - av[0] > 16
+
+
+def _walk(items) -> Iterator[Tuple]:
+    """Every sequence in the parsed pattern (branches, groups, repeat bodies, assertions)"""
+    yield items
+    for op, av in items:
+        if op is sre_constants.SUBPATTERN:
+            yield from _walk(av[3])
+        elif op is sre_constants.BRANCH:
+            for branch in av[1]:
+                yield from _walk(branch)
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            yield from _walk(av[1])
+        elif _is_repeat(op, av, backtracking_only=False):
+            yield from _walk(av[2])
+        elif _ATOMIC_GROUP is not None and op is _ATOMIC_GROUP:
+            yield from _walk(av)
+
+
+def _contains_variable_repeat(items) -> bool:
+    for op, av in items:
+        if op in _BACKTRACKING and av[0] != av[1] and av[1] > 1:
+            return True
+        if op is sre_constants.SUBPATTERN and _contains_variable_repeat(av[3]):
+            return True
+        if op is sre_constants.BRANCH and any(_contains_variable_repeat(branch) for branch in av[1]):
+            return True
+    return False
+
+
+def _nested_quantifiers(parsed) -> List[LintFinding]:
+    findings = []
+    for items in _walk(parsed):
+        for op, av in items:
+            if op in _BACKTRACKING and _unbounded(av) and _contains_variable_repeat(av[2]):
+                findings.append(LintFinding(
+                    'nested-quantifier', None,
+                    'variable repeat inside an unbounded repeat: exponential number of ways to split the text',
+                    'make the inner repeat fixed-length, or the alternatives of the outer repeat unable to match '
+                    'the same text'))
+    return findings
+
+
+def _python_311_only(parsed) -> List[LintFinding]:
+    """Possessive repeats and atomic groups do not compile before Python 3.11"""
+    for items in _walk(parsed):
+        for op, av in items:
+            if (_POSSESSIVE is not None and op is _POSSESSIVE) or (_ATOMIC_GROUP is not None and op is _ATOMIC_GROUP):
+                return [LintFinding(
+                    'python-3.11-only', None,
+                    'possessive repeat or atomic group: re.error on Python 3.10',
+                    'take a whole run with a negative lookahead instead (\\s*(?!\\s))')]
+    return []
+
+
+def _linear(items) -> List:
+    """Items in matching order: plain groups and positive lookaheads inlined"""
+    flat = []
+    for op, av in _flatten(items):
+        if op is sre_constants.ASSERT and av[0] == 1:
+            flat.extend(_linear(av[1]))
+        else:
+            flat.append((op, av))
+    return flat
+
+
+def _as_repeat(op, av, flags: int) -> Optional[Tuple[bool, Set[str]]]:
+    """(backtracks, characters) of an unbounded one-character repeat, or of an alternation offering one"""
+    if _is_repeat(op, av, backtracking_only=False) and _unbounded(av):
+        chars = _repeat_chars(op, av, flags)
+        if chars:
+            return op in _BACKTRACKING, chars
+    elif op is sre_constants.BRANCH:
+        for branch in av[1]:
+            branch = _flatten(branch)
+            if len(branch) == 1:
+                found = _as_repeat(branch[0][0], branch[0][1], flags)
+                if found:
+                    return found
+    return None
+
+
+def _can_be_empty(op, av) -> bool:
+    return op is sre_constants.AT or (_is_repeat(op, av, backtracking_only=False) and av[0] == 0)
+
+
+def _chain_length(flat: List, start: int, flags: int) -> Tuple[int, Set[str]]:
+    """Adjacent overlapping repeats from flat[start]: each backtracking one multiplies the work by n"""
+    backtracks, common = _as_repeat(*flat[start], flags)
+    length = 1
+    idx = start + 1
+    while backtracks and idx < len(flat):
+        found = _as_repeat(*flat[idx], flags)
+        if found and found[1] & common:
+            backtracks, chars = found
+            common = common & chars
+            length += 1
+        elif not _can_be_empty(*flat[idx]):
+            break
+        idx += 1
+    return length, common
+
+
+def _backtracking_chains(parsed, flags: int, min_degree: int) -> List[LintFinding]:
+    """Runs of adjacent repeats that can all match the same characters (optionally a leading run too)"""
+    findings = []
+    for items in _walk(parsed):
+        flat = _linear(items)
+        best = (0, set(), False)
+        for start in range(len(flat)):
+            if not _as_repeat(*flat[start], flags):
+                continue
+            length, common = _chain_length(flat, start, flags)
+            # search() restarts inside an unanchored leading run: one more factor of n
+            leading = items is parsed and start == 0
+            if length + leading > best[0] + best[2]:
+                best = (length, common, leading)
+        length, common, leading = best
+        if length + leading < min_degree:
+            continue
+        findings.append(LintFinding(
+            'backtracking-chain', length + leading,
+            f"{length} adjacent repeats can all match {_describe(common)}"
+            + (' at the start of the pattern' if leading else '')
+            + f": about n^{length + leading} steps on such text",
+            'make all but the last repeat take their whole run (\\s*(?!\\s)) where the next token cannot match '
+            'the same characters, merge optional whitespace into one \\s*, or add a run-boundary lookbehind '
+            '(?<!CLASS) to a leading run'))
+    return findings
+
+
+def lint_pattern(pattern: Pattern, min_degree: int = 3) -> List[LintFinding]:
+    """Static findings for a compiled pattern (backtracking chains of at least min_degree)"""
+    try:
+        parsed = _parse(pattern)
+    except Exception as e:
+        return [LintFinding('parse-error', None, str(e), '')]
+    return (_python_311_only(parsed) + _nested_quantifiers(parsed)
+            + _backtracking_chains(parsed, pattern.flags, min_degree))
+
+
+def _literals(items, found: Set[str]) -> None:
+    run = []
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            run.append(chr(av))
+            continue
+        if run:
+            found.add(''.join(run))
+            run = []
+        if op is sre_constants.SUBPATTERN:
+            _literals(av[3], found)
+        elif op is sre_constants.BRANCH:
+            for branch in av[1]:
+                _literals(branch, found)
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            _literals(av[1], found)
+        elif _is_repeat(op, av, backtracking_only=False):
+            _literals(av[2], found)
+        elif _ATOMIC_GROUP is not None and op is _ATOMIC_GROUP:
+            _literals(av, found)
+    if run:
+        found.add(''.join(run))
+
+
+def probe_units(pattern: Pattern, max_literals: int = 6) -> Tuple[List[str], List[str]]:
+    """(prefixes, repeated units) of the probe inputs, built from the pattern's literals and classes"""
+    parsed = _parse(pattern)
+    literals: Set[str] = set()
+    _literals(parsed, literals)
+    literals = sorted(literals, key=lambda literal: (-len(literal), literal))[:max_literals]
+
+    samples = {' ', '\n'}
+    for items in _walk(parsed):
+        for op, av in items:
+            chars = _char_set(op, av, pattern.flags)
+            if chars:
+                samples.add(sorted(chars)[0])
+    units = sorted(samples)
+    units += [char + sep for char in sorted(samples - {' ', '\n'}) for sep in (' ', '\n')]
+    units += [literal + ' ' for literal in literals] + [literal + '\n' for literal in literals]
+    prefixes = [''] + [literal + sep for literal in literals for sep in ('', ' ', '\n')]
+    return prefixes, units
+
+
+def _best_time(pattern: Pattern, text: str, repeat: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pattern.search(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _probe_worker(source: str, flags: int, sizes: Tuple[int, int], queue) -> None:
+    pattern = re.compile(source, flags)
+    prefixes, units = probe_units(pattern)
+    candidates = []
+    for unit in units:
+        for prefix in prefixes:
+            # A run ending at the end of the text often matches through $; the terminator forces a failure
+            for suffix in PROBE_SUFFIXES:
+                # Announce the input first so a timeout can report the one that hung
+                queue.put(('input', prefix + unit + suffix))
+                text = prefix + unit * (sizes[1] // len(unit) + 1) + suffix
+                candidates.append((_best_time(pattern, text, repeat=1), prefix, unit, suffix))
+    # Time the slowest inputs again at both lengths
+    worst = (0.0, 0.0, '')
+    for _, prefix, unit, suffix in sorted(candidates, reverse=True)[:3]:
+        short = _best_time(pattern, prefix + unit * (sizes[0] // len(unit) + 1) + suffix)
+        long = _best_time(pattern, prefix + unit * (sizes[1] // len(unit) + 1) + suffix)
+        if long > worst[1]:
+            worst = (short, long, prefix + unit + suffix)
+    queue.put(('done', worst))
+
+
+def probe_pattern(pattern: Pattern, sizes: Tuple[int, int] = (100, 400), timeout: float = 10.0) -> ProbeResult:
+    """Time the pattern on generated inputs in a child process (killed after timeout seconds)"""
+    context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+    queue = context.Queue()
+    process = context.Process(target=_probe_worker, args=(pattern.pattern, pattern.flags, sizes, queue), daemon=True)
+    process.start()
+    deadline = time.monotonic() + timeout
+    last_input = ''
+    while True:
+        try:
+            kind, value = queue.get(timeout=max(deadline - time.monotonic(), 0.01))
+        except Exception:  # queue.Empty: the child is stuck in one input
+            process.terminate()
+            process.join()
+            return ProbeResult(timeout * 1000, timeout * 1000, None, last_input, True)
+        if kind == 'input':
+            last_input = value
+            continue
+        process.join()
+        short, long, sample = value
+        exponent = math.log(max(long, 1e-7) / max(short, 1e-7), sizes[1] / sizes[0])
+        return ProbeResult(short * 1000, long * 1000, exponent, sample, False)
+
+
+def named_patterns(pattern_manager) -> List[Tuple[str, Pattern]]:
+    """('field[index]' or 'helper:name', compiled pattern) for every pattern of a PatternManager"""
+    named = [(f"{field_name}[{idx}]", pattern)
+             for field_name, patterns in pattern_manager.compiled.items()
+             for idx, pattern in enumerate(patterns)]
+    named += [(f"helper:{name}", pattern) for name, pattern in pattern_manager.helpers.items()]
+    return named
+
+
+def lint_manager(pattern_manager, probe: bool = False, names: Optional[Sequence[str]] = None,
+                 min_degree: int = 3, timeout: float = 10.0) -> List[Dict]:
+    """Report rows for every pattern of a PatternManager (optionally probed)"""
+    rows = []
+    for name, pattern in named_patterns(pattern_manager):
+        if names and not any(name == wanted or name.startswith(wanted + '[') for wanted in names):
+            continue
+        row = {
+            'name': name,
+            'pattern': pattern.pattern,
+            'findings': [finding.to_dict() for finding in lint_pattern(pattern, min_degree)],
+            'probe': probe_pattern(pattern, timeout=timeout).to_dict() if probe else None
+        }
+        rows.append(row)
+    return rows
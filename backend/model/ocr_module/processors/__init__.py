@@ -1,4 +1,11 @@
 """Processors module for text processing"""
 from .text_processor import TextProcessor
+from .ocr_cascade import CascadeConfig
+from .field_retry import FieldRetryConfig
+from .tiled_ocr import TilingConfig
+from .literal_prefilter import LiteralPrefilter
+from .pattern_stats import PatternStats, PatternStatsConfig
+from .regex_guard import RegexBudgetConfig, RegexGuard
 
-__all__ = ['TextProcessor']
+__all__ = ['TextProcessor', 'CascadeConfig', 'FieldRetryConfig', 'TilingConfig', 'LiteralPrefilter',
+           'PatternStats', 'PatternStatsConfig', 'RegexGuard', 'RegexBudgetConfig']
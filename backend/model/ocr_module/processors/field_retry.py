@@ -0,0 +1,112 @@
+"""
+Targeted re-recognition of weak fields
+When a field such as the amount is missing or only found by the fallback
+search, the area next to its label (right of and below "จำนวนเงิน",
+"ค่าธรรมเนียม", ...) is cropped from the full-resolution image, enlarged and
+recognized again. This costs a fraction of another full-image OCR pass.
+"""
+import os
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from models.text_block import TextBlock
+from processors.layout_index import FIELD_LABELS, LayoutIndex, VALUE_PARSERS
+from utils.image_preprocessing import apply_clahe
+from utils.lazy_imports import get_cv2
+
+# Crop variants tried in order: enlarged crop, then enlarged crop with CLAHE
+CROP_VARIANTS = ('upscaled', 'clahe')
+
+# Longest side of an enlarged crop (keeps the retry far cheaper than a full pass)
+_MAX_CROP_SIDE = 2048
+
+
+@dataclass
+class FieldRetryConfig:
+    """Which fields are re-recognized and how"""
+    enabled: bool = True
+    fields: Tuple[str, ...] = ('amount', 'fee')
+    min_confidence: float = 0.6     # retry fields below this confidence
+    target_text_height: int = 48    # label text height after enlarging the crop
+    max_upscale: float = 4.0
+
+    @classmethod
+    def from_env(cls) -> 'FieldRetryConfig':
+        """Read OCR_FIELD_RETRY and OCR_FIELD_RETRY_TEXT_HEIGHT"""
+        return cls(
+            enabled=os.getenv('OCR_FIELD_RETRY', 'true').lower() == 'true',
+            target_text_height=int(os.getenv('OCR_FIELD_RETRY_TEXT_HEIGHT', str(cls.target_text_height)))
+        )
+
+
+def find_label(layout: LayoutIndex, field_name: str) -> Optional[TextBlock]:
+    """First label block of a field in reading order"""
+    labels = layout.labels.get(field_name)
+    if not labels:
+        return None
+    return layout.blocks[labels[0][0]]
+
+
+def label_crop_box(label_box: Sequence[Sequence[float]],
+                   image_shape: Tuple[int, ...]) -> Optional[Tuple[int, int, int, int]]:
+    """Crop (x0, y0, x1, y1) covering a label and the area right of and below it"""
+    height, width = image_shape[:2]
+    xs = [x for x, _ in label_box]
+    ys = [y for _, y in label_box]
+    line_height = max(1.0, max(ys) - min(ys))
+
+    x0 = max(0, int(min(xs) - line_height))
+    x1 = width
+    y0 = max(0, int(min(ys) - line_height * 0.5))
+    y1 = min(height, int(max(ys) + line_height * 2.5))
+    if x1 - x0 < 8 or y1 - y0 < 8:
+        return None
+    return x0, y0, x1, y1
+
+
+def crop_variants(crop: 'np.ndarray', label_height: float,
+                  config: FieldRetryConfig) -> List[Tuple[str, 'np.ndarray']]:
+    """Enlarged versions of a field crop, in the order they are tried"""
+    cv2 = get_cv2()
+    height, width = crop.shape[:2]
+    scale = min(config.max_upscale, max(1.0, config.target_text_height / max(1.0, label_height)))
+    scale = min(scale, max(1.0, _MAX_CROP_SIDE / float(max(height, width))))
+    if scale > 1.0:
+        crop = cv2.resize(crop, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_CUBIC)
+
+    variants = []
+    for name in CROP_VARIANTS:
+        if name == 'upscaled':
+            variants.append((name, crop))
+        elif name == 'clahe':
+            variants.append((name, apply_clahe(crop)))
+    return variants
+
+
+def value_from_blocks(blocks: List[TextBlock], field_name: str) -> Optional[Tuple[str, TextBlock]]:
+    """Field value in re-recognized crop blocks
+
+    Pairs by layout when the label is part of the crop, otherwise takes the
+    first block (reading order) that parses as a value of the field.
+    """
+    if not blocks:
+        return None
+
+    layout = LayoutIndex(blocks)
+    paired = layout.value_for(field_name)
+    if paired:
+        return paired
+
+    parse = VALUE_PARSERS[field_name]
+    keywords = FIELD_LABELS[field_name]
+    for row in layout.rows:
+        for idx in row:
+            text = layout.blocks[idx].text.strip()
+            for keyword in keywords:
+                if text.lower().startswith(keyword):
+                    text = text[len(keyword):].strip(' :')
+                    break
+            value = parse(text)
+            if value:
+                return value, layout.blocks[idx]
+    return None
@@ -0,0 +1,204 @@
+"""
+Spatial index over OCR text blocks
+Groups blocks into visual rows and column bands so that a label block
+(จำนวนเงิน, ถึง, จาก, เลขที่รายการ, ...) can be paired with its value by layout:
+the rest of the label block, the next block on the same row, or the block
+directly below it.
+"""
+import re
+from bisect import bisect_right
+from typing import Callable, Dict, List, Optional, Tuple
+
+from models.text_block import TextBlock
+
+# Field -> label keywords (matched at the start of a block, case-insensitive)
+FIELD_LABELS: Dict[str, Tuple[str, ...]] = {
+    'amount': ('จำนวนเงิน', 'ยอดเงิน', 'ยอดโอน', 'ยอดชำระ', 'amount'),
+    'fee': ('ค่าธรรมเนียม', 'fee'),
+    'reference_id': ('เลขที่รายการ', 'เลขที่อ้างอิง', 'รหัสอ้างอิง', 'หมายเลขอ้างอิง',
+                     'transaction id', 'reference', 'ref'),
+    'sender_name': ('ผู้โอน', 'จาก', 'from'),
+    'receiver_name': ('ผู้รับ', 'ถึง', 'to'),
+}
+
+# Number of column bands across the page
+COLUMN_BANDS = 12
+
+# Anchored (linear-time) value formats
+_AMOUNT_RE = re.compile(r'(?:฿|b)?\s*(\d{1,3}(?:,\d{3})+|\d+)\.(\d{2})(?:\s*(?:บาท|thb|baht))?', re.IGNORECASE)
+_REFERENCE_RE = re.compile(r'[A-Za-z0-9]{8,}')
+_NAME_LETTERS_RE = re.compile(r'[ก-๙a-zA-Z]')
+_NAME_STOP_WORDS = ('บาท', 'จำนวน', 'ค่าธรรมเนียม', 'เลขที่', 'วันที่', 'xxx', 'ธนาคาร', 'ธ.', 'bank')
+
+
+def _parse_amount(text: str) -> Optional[str]:
+    match = _AMOUNT_RE.fullmatch(text.strip())
+    if match:
+        return f"{match.group(1)}.{match.group(2)}"
+    return None
+
+
+def _parse_reference(text: str) -> Optional[str]:
+    compact = text.replace(' ', '').strip(':')
+    if _REFERENCE_RE.fullmatch(compact) and any(c.isdigit() for c in compact):
+        return compact
+    return None
+
+
+def _parse_name(text: str) -> Optional[str]:
+    text = ' '.join(text.split()).strip(':- ')
+    if len(text) < 3 or not _NAME_LETTERS_RE.search(text):
+        return None
+    if any(word in text.lower() for word in _NAME_STOP_WORDS):
+        return None
+    return text
+
+
+# Field -> value parser (returns the normalized value or None)
+VALUE_PARSERS: Dict[str, Callable[[str], Optional[str]]] = {
+    'amount': _parse_amount,
+    'fee': _parse_amount,
+    'reference_id': _parse_reference,
+    'sender_name': _parse_name,
+    'receiver_name': _parse_name,
+}
+
+
+class LayoutIndex:
+    """Row / column index of text blocks for label-value pairing"""
+
+    def __init__(self, blocks: List[TextBlock], row_tolerance: float = 0.5):
+        """
+        Args:
+            blocks: Text blocks with boxes
+            row_tolerance: Blocks whose vertical centers differ by less than this
+                fraction of the median line height share a row
+        """
+        self.blocks = [block for block in blocks if getattr(block, 'box', None)]
+        heights = sorted(block.height for block in self.blocks) or [0.0]
+        self.line_height = max(1.0, heights[len(heights) // 2])
+
+        self.rows: List[List[int]] = []
+        self.row_of: Dict[int, int] = {}
+        self._build_rows(row_tolerance)
+
+        self.columns: Dict[int, List[Tuple[int, int]]] = {}
+        self._build_columns()
+
+        self.labels: Dict[str, List[Tuple[int, str]]] = {}
+        self._index_labels()
+
+    def _build_rows(self, row_tolerance: float) -> None:
+        """Cluster blocks into rows by vertical center, each row ordered left to right"""
+        order = sorted(range(len(self.blocks)), key=lambda i: self.blocks[i].center_y)
+        current: List[int] = []
+        current_y = None
+        for idx in order:
+            center = self.blocks[idx].center_y
+            if current and abs(center - current_y) > self.line_height * row_tolerance:
+                self._add_row(current)
+                current = []
+            current.append(idx)
+            current_y = sum(self.blocks[i].center_y for i in current) / len(current)
+        if current:
+            self._add_row(current)
+
+    def _add_row(self, indices: List[int]) -> None:
+        row = sorted(indices, key=lambda i: self.blocks[i].x0)
+        for idx in row:
+            self.row_of[idx] = len(self.rows)
+        self.rows.append(row)
+
+    def _build_columns(self) -> None:
+        """Column bands: band -> (row, block index) pairs sorted by row"""
+        if not self.blocks:
+            return
+        left = min(block.x0 for block in self.blocks)
+        right = max(block.x1 for block in self.blocks)
+        self._left = left
+        self._band_width = max(1.0, (right - left) / COLUMN_BANDS)
+        for idx, block in enumerate(self.blocks):
+            for band in self._bands(block):
+                self.columns.setdefault(band, []).append((self.row_of[idx], idx))
+        for entries in self.columns.values():
+            entries.sort()
+
+    def _bands(self, block: TextBlock) -> range:
+        first = int((block.x0 - self._left) / self._band_width)
+        last = int((block.x1 - self._left) / self._band_width)
+        return range(max(0, first), min(COLUMN_BANDS - 1, last) + 1)
+
+    def _index_labels(self) -> None:
+        """Find label blocks once: field -> [(block index, matched keyword)] in reading order"""
+        for row in self.rows:
+            for idx in row:
+                text = self.blocks[idx].text.strip().lower()
+                for field_name, keywords in FIELD_LABELS.items():
+                    for keyword in keywords:
+                        if text.startswith(keyword) and (
+                                len(text) == len(keyword) or not text[len(keyword)].isalnum()):
+                            self.labels.setdefault(field_name, []).append((idx, keyword))
+                            break
+
+    def right_of(self, idx: int, limit: int = 2) -> List[int]:
+        """Blocks to the right of a block on the same row (nearest first)"""
+        row = self.rows[self.row_of[idx]]
+        position = row.index(idx)
+        return row[position + 1:position + 1 + limit]
+
+    def below(self, idx: int, max_rows: int = 2) -> Optional[int]:
+        """Nearest block in the rows below that overlaps the block horizontally"""
+        row = self.row_of[idx]
+        best = None
+        for band in self._bands(self.blocks[idx]):
+            entries = self.columns.get(band, [])
+            position = bisect_right(entries, (row, len(self.blocks)))
+            if position < len(entries):
+                candidate_row, candidate = entries[position]
+                if candidate_row - row <= max_rows and (best is None or candidate_row < best[0]):
+                    best = (candidate_row, candidate)
+        return best[1] if best else None
+
+    def context_rows(self, idx: int, radius: int = 1) -> List[str]:
+        """Texts of the rows around a block (including its own row)"""
+        row = self.row_of[idx]
+        texts = []
+        for row_idx in range(max(0, row - radius), min(len(self.rows), row + radius + 1)):
+            texts.extend(self.blocks[i].text for i in self.rows[row_idx])
+        return texts
+
+    def find(self, text: str) -> Optional[int]:
+        """Index of the first block (reading order) containing the given text"""
+        for row in self.rows:
+            for idx in row:
+                if text in self.blocks[idx].text:
+                    return idx
+        return None
+
+    def value_for(self, field_name: str) -> Optional[Tuple[str, TextBlock]]:
+        """Pair the field's label with its value by layout
+
+        Returns:
+            (value, value block) or None when no label has a valid value next to it
+        """
+        parse = VALUE_PARSERS[field_name]
+        for idx, keyword in self.labels.get(field_name, []):
+            label = self.blocks[idx]
+
+            # Value in the same block: "จำนวนเงิน 1,000.00 บาท"
+            rest = label.text.strip()[len(keyword):].strip(' :')
+            if rest:
+                value = parse(rest)
+                if value:
+                    return value, label
+
+            # Value to the right, then directly below
+            candidates = self.right_of(idx)
+            below = self.below(idx)
+            if below is not None:
+                candidates.append(below)
+            for candidate in candidates:
+                value = parse(self.blocks[candidate].text)
+                if value:
+                    return value, self.blocks[candidate]
+        return None
@@ -0,0 +1,136 @@
+"""
+Required-literal prefilter for the field patterns
+Most field patterns can only match when a fixed piece of text is present
+(a label such as "จำนวนเงิน", "ค่าธรรมเนียม", "ถึง", a unit such as "บาท").
+Those required literals are derived once from the compiled patterns and put
+into one Aho-Corasick automaton. Each receipt text is folded and run through
+the automaton once, and the patterns whose literals are absent are skipped.
+This is a prefilter, not a candidate extractor: the remaining patterns still
+run one by one in their priority order, so the extracted values and
+confidences do not change.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Pattern, Set
+
+from utils.aho_corasick import AhoCorasick
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
+
+# Characters matched case-insensitively by re beyond str.lower()
+_FOLD_TABLE = str.maketrans({'İ': 'i', 'ı': 'i', 'ſ': 's', 'K': 'k'})
+
+_REPEATS = tuple(getattr(sre_constants, name) for name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT')
+                 if hasattr(sre_constants, name))
+_ATOMIC_GROUP = getattr(sre_constants, 'ATOMIC_GROUP', None)
+
+
+def fold_text(text: str) -> str:
+    """Case-fold text the way the literal check compares it"""
+    return text.translate(_FOLD_TABLE).lower()
+
+
+def _selectivity(literals: FrozenSet[str]):
+    # Longer shortest literal first, then fewer alternatives
+    return min(len(literal) for literal in literals), -len(literals)
+
+
+def _required(items) -> Optional[FrozenSet[str]]:
+    """Set of literals of which at least one occurs in every match (None if unknown)"""
+    candidates = []
+    run = []
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            run.append(chr(av))
+            continue
+        if run:
+            candidates.append(frozenset([''.join(run)]))
+            run = []
+
+        sub = None
+        if op is sre_constants.SUBPATTERN:
+            _, add_flags, del_flags, pattern = av
+            if not add_flags and not del_flags:
+                sub = _required(pattern)
+        elif op is sre_constants.BRANCH:
+            branches = [_required(branch) for branch in av[1]]
+            if all(branches):
+                sub = frozenset().union(*branches)
+        elif op in _REPEATS:
+            low, _, pattern = av
+            if low >= 1:
+                sub = _required(pattern)
+        elif op is sre_constants.ASSERT:
+            # Positive lookahead / lookbehind: its text must be there too
+            sub = _required(av[1])
+        elif _ATOMIC_GROUP is not None and op is _ATOMIC_GROUP:
+            sub = _required(av)
+        if sub:
+            candidates.append(sub)
+    if run:
+        candidates.append(frozenset([''.join(run)]))
+
+    candidates = [literals for literals in candidates if all(literals)]
+    if not candidates:
+        return None
+    return max(candidates, key=_selectivity)
+
+
+def required_literals(pattern: Pattern) -> Optional[FrozenSet[str]]:
+    """Folded literals of which at least one must occur for the pattern to match
+
+    Returns None when the pattern has no such literal (it is always run).
+    """
+    try:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    except Exception:
+        return None
+    literals = _required(parsed)
+    if literals is None:
+        return None
+    return frozenset(fold_text(literal) for literal in literals)
+
+
+@dataclass
+class TextScan:
+    """Literals present in one receipt text and the patterns they rule out"""
+    text: str
+    present: FrozenSet[str]
+    skipped: Dict[str, Set[int]] = field(default_factory=dict)
+
+
+class LiteralPrefilter:
+    """Required-literal index over the compiled patterns of a PatternManager"""
+
+    def __init__(self, pattern_manager):
+        self.version = pattern_manager.version
+        # field -> per pattern: required literals or None
+        self.requirements: Dict[str, List[Optional[FrozenSet[str]]]] = {
+            field_name: [required_literals(pattern) for pattern in patterns]
+            for field_name, patterns in pattern_manager.compiled.items()
+        }
+        self.literals: List[str] = sorted({
+            literal
+            for requirements in self.requirements.values()
+            for literals in requirements if literals
+            for literal in literals
+        })
+        self._automaton = AhoCorasick(self.literals)
+
+    def scan(self, text: str) -> TextScan:
+        """Find every literal in one automaton pass and record which patterns cannot match"""
+        present = frozenset(self._automaton.keys_in(fold_text(text)))
+        skipped = {
+            field_name: {idx for idx, literals in enumerate(requirements)
+                         if literals is not None and not (literals & present)}
+            for field_name, requirements in self.requirements.items()
+        }
+        return TextScan(text=text, present=present, skipped=skipped)
+
+    def coverage(self) -> Dict[str, int]:
+        """Number of patterns per field that have a required literal"""
+        return {field_name: sum(1 for literals in requirements if literals is not None)
+                for field_name, requirements in self.requirements.items()}
@@ -0,0 +1,99 @@
+"""
+Confidence-driven OCR cascade
+Runs OCR on progressively different variants of the image until the critical
+fields are found with enough confidence or the time budget is spent.
+"""
+import os
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from models.extraction_result import ExtractionResult
+from utils.image_io import ImageInput, is_path_input, load_image
+from utils.image_preprocessing import PreprocessingPipeline, apply_clahe, to_grayscale
+from utils.lazy_imports import get_cv2
+
+# Variant name -> short description (in the default cascade order first)
+VARIANTS = {
+    'original': 'Image as uploaded (after the resize stage)',
+    'enhanced': 'Full preprocessing pipeline (threshold, morphology, sharpen)',
+    'gray_reduced': 'Grayscale at 75% size (less noise for the detector)',
+    'clahe': 'Grayscale with CLAHE contrast only',
+}
+
+# Scale of the gray_reduced variant relative to the OCR input
+GRAY_REDUCED_SCALE = 0.75
+
+
+@dataclass
+class CascadeConfig:
+    """Which OCR variants to try and when to stop"""
+    variants: Tuple[str, ...] = ('original', 'enhanced', 'gray_reduced')
+    budget_seconds: float = 8.0                 # per request, 0 = only the first variant
+    confidence_threshold: float = 0.6           # minimum confidence of each critical field
+    critical_fields: Tuple[str, ...] = ('amount', 'date', 'reference_id')
+
+    def __post_init__(self):
+        unknown = [name for name in self.variants if name not in VARIANTS]
+        if unknown:
+            raise ValueError(f"Unknown OCR variant(s): {', '.join(unknown)} "
+                             f"(available: {', '.join(VARIANTS)})")
+
+    @classmethod
+    def from_env(cls) -> 'CascadeConfig':
+        """Read OCR_CASCADE_VARIANTS, OCR_CASCADE_BUDGET and OCR_CASCADE_MIN_CONFIDENCE"""
+        variants = os.getenv('OCR_CASCADE_VARIANTS')
+        return cls(
+            variants=tuple(v.strip() for v in variants.split(',') if v.strip()) if variants else cls.variants,
+            budget_seconds=float(os.getenv('OCR_CASCADE_BUDGET', str(cls.budget_seconds))),
+            confidence_threshold=float(os.getenv('OCR_CASCADE_MIN_CONFIDENCE', str(cls.confidence_threshold)))
+        )
+
+
+def make_variant(name: str, image: ImageInput,
+                 preprocessing: PreprocessingPipeline) -> Tuple[Optional[ImageInput], float]:
+    """Build one OCR variant of an image
+
+    Returns:
+        (variant, scale) where scale maps variant coordinates to the input image
+        (variant is None when it cannot be built, e.g. OpenCV is missing)
+    """
+    if name == 'original':
+        return image, 1.0
+
+    if is_path_input(image):
+        image = load_image(image)
+        if image is None:
+            return None, 1.0
+
+    if name == 'enhanced':
+        return preprocessing.run(image), 1.0
+
+    cv2 = get_cv2()
+    if cv2 is None:
+        return None, 1.0
+
+    if name == 'clahe':
+        return apply_clahe(image), 1.0
+
+    if name == 'gray_reduced':
+        gray = to_grayscale(image)
+        height, width = gray.shape[:2]
+        size = (max(1, int(width * GRAY_REDUCED_SCALE)), max(1, int(height * GRAY_REDUCED_SCALE)))
+        return cv2.resize(gray, size, interpolation=cv2.INTER_AREA), GRAY_REDUCED_SCALE
+
+    raise ValueError(f"Unknown OCR variant: {name}")
+
+
+def critical_fields_found(result: ExtractionResult, config: CascadeConfig) -> int:
+    """Number of critical fields present with at least the threshold confidence"""
+    confidence = result.confidence or {}
+    return sum(
+        1 for field_name in config.critical_fields
+        if getattr(result, field_name) is not None
+        and confidence.get(field_name, 0.0) >= config.confidence_threshold
+    )
+
+
+def cascade_score(result: ExtractionResult, config: CascadeConfig) -> Tuple[int, float]:
+    """Rank of a pass: confident critical fields first, then overall confidence"""
+    return critical_fields_found(result, config), result.overall_confidence
@@ -0,0 +1,142 @@
+"""
+Per-pattern hit rate and latency statistics
+Records, for every field pattern, how often it runs, how often it matches
+and the time spent in it, to find dead or slow patterns. In adaptive mode
+the patterns inside one priority tier (see PatternManager.tiers) are run in
+order of observed hit rate once every pattern of the tier has enough data.
+Confidence still uses each pattern's declared position.
+"""
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+# Per pattern counters: attempts, hits, seconds, skipped (ruled out by the literal prefilter)
+_ATTEMPTS, _HITS, _SECONDS, _SKIPPED = range(4)
+
+
+@dataclass
+class PatternStatsConfig:
+    """Pattern statistics and adaptive ordering settings"""
+    enabled: bool = False
+    adaptive: bool = False
+    # Every pattern of a tier needs this many attempts before the tier is reordered
+    min_attempts: int = 200
+    # A pattern moves ahead of a declared-earlier one only when its hit rate is higher by this much
+    min_hit_rate_gap: float = 0.05
+
+    @classmethod
+    def from_env(cls) -> 'PatternStatsConfig':
+        """Read OCR_PATTERN_STATS, OCR_PATTERN_ADAPTIVE and OCR_PATTERN_ADAPTIVE_MIN_ATTEMPTS"""
+        adaptive = os.getenv('OCR_PATTERN_ADAPTIVE', 'false').lower() == 'true'
+        return cls(
+            # Adaptive ordering needs the statistics
+            enabled=adaptive or os.getenv('OCR_PATTERN_STATS', 'false').lower() == 'true',
+            adaptive=adaptive,
+            min_attempts=int(os.getenv('OCR_PATTERN_ADAPTIVE_MIN_ATTEMPTS', str(cls.min_attempts)))
+        )
+
+
+class PatternStats:
+    """Thread-safe per-field, per-pattern counters"""
+
+    def __init__(self, config: Optional[PatternStatsConfig] = None):
+        self.config = config or PatternStatsConfig.from_env()
+        self._lock = threading.Lock()
+        self._counts: Dict[str, List[List[float]]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.enabled
+
+    def _field(self, field_name: str, total: int) -> List[List[float]]:
+        counts = self._counts.get(field_name)
+        if counts is None or len(counts) != total:
+            counts = self._counts[field_name] = [[0, 0, 0.0, 0] for _ in range(total)]
+        return counts
+
+    def record(self, field_name: str, pattern_idx: int, total: int, seconds: float, hit: bool) -> None:
+        """Record one run of a pattern"""
+        with self._lock:
+            counts = self._field(field_name, total)[pattern_idx]
+            counts[_ATTEMPTS] += 1
+            counts[_SECONDS] += seconds
+            if hit:
+                counts[_HITS] += 1
+
+    def record_skipped(self, field_name: str, indices: Sequence[int], total: int) -> None:
+        """Record patterns the literal prefilter ruled out"""
+        with self._lock:
+            counts = self._field(field_name, total)
+            for pattern_idx in indices:
+                counts[pattern_idx][_SKIPPED] += 1
+
+    def hit_rate(self, field_name: str, pattern_idx: int) -> Optional[float]:
+        counts = self._counts.get(field_name)
+        if not counts or not counts[pattern_idx][_ATTEMPTS]:
+            return None
+        return counts[pattern_idx][_HITS] / counts[pattern_idx][_ATTEMPTS]
+
+    def order(self, field_name: str, tiers: Sequence[int]) -> List[int]:
+        """Execution order of a field's patterns
+
+        Tiers keep their declared order. Inside a tier whose patterns all have
+        min_attempts runs, patterns are ordered by hit rate; a pattern only
+        passes a declared-earlier one when its hit rate is min_hit_rate_gap higher.
+        """
+        order = list(range(len(tiers)))
+        if not self.config.adaptive:
+            return order
+        counts = self._counts.get(field_name)
+        if not counts or len(counts) != len(tiers):
+            return order
+
+        result = []
+        start = 0
+        while start < len(tiers):
+            end = start
+            while end < len(tiers) and tiers[end] == tiers[start]:
+                end += 1
+            tier = order[start:end]
+            if len(tier) > 1 and all(counts[idx][_ATTEMPTS] >= self.config.min_attempts for idx in tier):
+                tier = self._reorder(field_name, tier)
+            result.extend(tier)
+            start = end
+        return result
+
+    def _reorder(self, field_name: str, tier: List[int]) -> List[int]:
+        # Insertion sort: move a pattern forward only past clearly weaker ones
+        ordered: List[int] = []
+        for idx in tier:
+            rate = self.hit_rate(field_name, idx)
+            position = len(ordered)
+            while position and rate - self.hit_rate(field_name, ordered[position - 1]) >= self.config.min_hit_rate_gap:
+                position -= 1
+            ordered.insert(position, idx)
+        return ordered
+
+    def rows(self, pattern_manager) -> List[Dict]:
+        """Report rows: one per pattern of every field with statistics"""
+        rows = []
+        with self._lock:
+            for field_name, counts in self._counts.items():
+                patterns = pattern_manager.compiled.get(field_name, [])
+                tiers = pattern_manager.tiers(field_name)
+                for idx, (attempts, hits, seconds, skipped) in enumerate(counts):
+                    rows.append({
+                        'field': field_name,
+                        'index': idx,
+                        'tier': tiers[idx] if idx < len(tiers) else idx,
+                        'attempts': int(attempts),
+                        'hits': int(hits),
+                        'skipped': int(skipped),
+                        'hit_rate': round(hits / attempts, 4) if attempts else None,
+                        'total_ms': round(seconds * 1000, 3),
+                        'mean_us': round(seconds * 1e6 / attempts, 2) if attempts else None,
+                        'pattern': patterns[idx].pattern if idx < len(patterns) else None
+                    })
+        return rows
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = {}
@@ -0,0 +1,243 @@
+"""
+Time budgets for running the receipt patterns
+Every pattern run on receipt text goes through a RegexGuard, which enforces
+a per-pattern limit and a per-receipt total. Runs are timed in CPU time of
+the calling thread, so OCR threads and other workers competing for the cores
+do not count against a pattern. The standard re engine cannot be interrupted,
+so the limits apply between runs: a pattern that overran its limit several
+times is not run again on texts at least that long until its quarantine
+expires, and once a receipt has spent its total the remaining patterns are
+skipped. With OCR_REGEX_HARD_LIMITS=true and the optional `regex` package
+installed, runs are also stopped when they reach their limit. A stopped or
+skipped run counts as no match, and skipped patterns are reported by name.
+"""
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Pattern, Tuple
+
+from utils.lazy_imports import optional_import
+
+# Patterns using these run on re even with `regex` installed (word boundaries differ for Thai marks)
+_RE_ONLY = re.compile(r"\\[wWbB]")
+_REGEX_FLAGS = re.IGNORECASE | re.MULTILINE | re.DOTALL
+
+
+@dataclass
+class RegexBudgetConfig:
+    """Per-pattern and per-receipt regex time limits (0 disables a limit)"""
+    pattern_ms: float = 50.0
+    receipt_ms: float = 500.0
+    # Overruns of one pattern before it is quarantined, and how long the quarantine lasts
+    quarantine_after: int = 3
+    quarantine_seconds: float = 600.0
+    # Stop runs at the limit with the `regex` package (a different engine, so opt-in)
+    hard_limits: bool = False
+
+    @classmethod
+    def from_env(cls) -> 'RegexBudgetConfig':
+        """Read OCR_REGEX_PATTERN_MS, OCR_REGEX_RECEIPT_MS, OCR_REGEX_QUARANTINE_AFTER,
+        OCR_REGEX_QUARANTINE_SECONDS and OCR_REGEX_HARD_LIMITS"""
+        return cls(
+            pattern_ms=float(os.getenv('OCR_REGEX_PATTERN_MS', str(cls.pattern_ms))),
+            receipt_ms=float(os.getenv('OCR_REGEX_RECEIPT_MS', str(cls.receipt_ms))),
+            quarantine_after=int(os.getenv('OCR_REGEX_QUARANTINE_AFTER', str(cls.quarantine_after))),
+            quarantine_seconds=float(os.getenv('OCR_REGEX_QUARANTINE_SECONDS', str(cls.quarantine_seconds))),
+            hard_limits=os.getenv('OCR_REGEX_HARD_LIMITS', 'false').lower() == 'true'
+        )
+
+
+@dataclass
+class _ReceiptBudget:
+    """Time spent and events of the current receipt (one per thread)"""
+    seconds: float = 0.0
+    runs: int = 0
+    skipped: int = 0
+    overruns: int = 0
+    stopped: int = 0
+    slowest: float = 0.0
+    # Names of the patterns skipped because they are quarantined
+    quarantined: List[str] = field(default_factory=list)
+
+
+class RegexGuard:
+    """Runs compiled patterns within the configured time budgets"""
+
+    def __init__(self, config: Optional[RegexBudgetConfig] = None, names: Optional[Dict[Pattern, str]] = None):
+        """
+        Args:
+            config: Time limits (default: RegexBudgetConfig.from_env())
+            names: Optional pattern -> report name ('amount[3]', 'helper:bank_name')
+        """
+        self.config = config or RegexBudgetConfig.from_env()
+        self.names = names or {}
+        regex_module = optional_import('regex') if self.config.hard_limits else None
+        # Older `regex` releases have no timeout argument
+        self._regex = regex_module if regex_module is not None and _supports_timeout(regex_module) else None
+        self._twins: Dict[Pattern, Optional[object]] = {}  # re pattern -> `regex` twin (None: run on re)
+        self._strikes: Dict[Pattern, Tuple[int, int]] = {}  # pattern -> (overruns, shortest text length)
+        self._quarantine: Dict[Pattern, Tuple[int, float]] = {}  # pattern -> (shortest length, expiry)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def hard_limits(self) -> bool:
+        """True when runs are stopped at the limit (OCR_REGEX_HARD_LIMITS and `regex` installed)"""
+        return self._regex is not None
+
+    def start(self) -> None:
+        """Start the budget of a new receipt (on this thread)"""
+        self._local.receipt = _ReceiptBudget()
+
+    def _receipt(self) -> Optional[_ReceiptBudget]:
+        return getattr(self._local, 'receipt', None)
+
+    def search(self, pattern: Pattern, text: str):
+        """pattern.search(text) within the budgets (None when stopped or skipped)"""
+        return self._run(pattern, text, pattern.search, 'search', None)
+
+    def findall(self, pattern: Pattern, text: str) -> List:
+        """pattern.findall(text) within the budgets ([] when stopped or skipped)"""
+        return self._run(pattern, text, pattern.findall, 'findall', [])
+
+    def _run(self, pattern: Pattern, text: str, run, method: str, empty):
+        config = self.config
+        if config.pattern_ms <= 0 and config.receipt_ms <= 0:
+            return run(text)
+        receipt = getattr(self._local, 'receipt', None)
+        if self._quarantine and self._quarantined(pattern, len(text)):
+            if receipt is not None:
+                receipt.skipped += 1
+                receipt.quarantined.append(self.name(pattern))
+            return empty
+        pattern_limit = config.pattern_ms / 1000
+        limit = pattern_limit
+        if receipt is not None and config.receipt_ms > 0:
+            remaining = config.receipt_ms / 1000 - receipt.seconds
+            if remaining <= 0:
+                receipt.skipped += 1
+                return empty
+            limit = min(limit, remaining) if limit > 0 else remaining
+
+        twin = self._twin(pattern) if self._regex is not None else None
+        # CPU time of this thread: time spent waiting for the cores is not the pattern's fault
+        start = time.thread_time()
+        try:
+            result = getattr(twin, method)(text, timeout=limit) if twin is not None else run(text)
+        except TimeoutError:
+            result = empty
+            elapsed = time.thread_time() - start
+            if receipt is not None:
+                receipt.stopped += 1
+            # A strike only when the pattern's own limit stopped it, not the end of the receipt budget
+            if pattern_limit > 0 and limit >= pattern_limit:
+                self._overran(pattern, text, elapsed, stopped=True)
+        else:
+            elapsed = time.thread_time() - start
+            if 0 < pattern_limit < elapsed:
+                self._overran(pattern, text, elapsed, stopped=False)
+                if receipt is not None:
+                    receipt.overruns += 1
+
+        if receipt is not None:
+            receipt.seconds += elapsed
+            receipt.runs += 1
+            if elapsed > receipt.slowest:
+                receipt.slowest = elapsed
+        return result
+
+    def _twin(self, pattern: Pattern):
+        """Equivalent `regex` pattern that accepts a timeout (None: run on re)"""
+        try:
+            return self._twins[pattern]
+        except KeyError:
+            pass
+        twin = None
+        if not _RE_ONLY.search(pattern.pattern):
+            try:
+                twin = self._regex.compile(pattern.pattern, (pattern.flags & _REGEX_FLAGS) | self._regex.VERSION0)
+            except Exception:
+                twin = None
+        self._twins[pattern] = twin
+        return twin
+
+    def name(self, pattern: Pattern) -> str:
+        """Report name of a pattern (its source, shortened, when it has no name)"""
+        return self.names.get(pattern) or pattern.pattern[:80]
+
+    def _quarantined(self, pattern: Pattern, length: int) -> bool:
+        entry = self._quarantine.get(pattern)
+        if entry is None:
+            return False
+        shortest, expires = entry
+        if time.monotonic() >= expires:
+            # Give the pattern another chance (it has to overrun repeatedly again)
+            with self._lock:
+                self._quarantine.pop(pattern, None)
+            return False
+        return length >= shortest
+
+    def _overran(self, pattern: Pattern, text: str, seconds: float, stopped: bool) -> None:
+        """Count an overrun; repeated overruns skip the pattern on texts this long for a while"""
+        config = self.config
+        with self._lock:
+            count, shortest = self._strikes.get(pattern, (0, len(text)))
+            count, shortest = count + 1, min(shortest, len(text))
+            quarantine = count >= max(1, config.quarantine_after)
+            if quarantine:
+                self._strikes.pop(pattern, None)
+                self._quarantine[pattern] = (shortest, time.monotonic() + config.quarantine_seconds)
+            else:
+                self._strikes[pattern] = (count, shortest)
+
+        action = 'stopped' if stopped else 'finished'
+        if quarantine:
+            outcome = f"skipped for {config.quarantine_seconds:.0f}s on texts of {shortest}+ chars"
+        else:
+            outcome = f"overrun {count} of {config.quarantine_after}"
+        try:
+            print(f"Regex {self.name(pattern)} {action} after {seconds * 1000:.0f} ms CPU "
+                  f"on {len(text)} chars, {outcome}")
+        except UnicodeEncodeError:
+            print(f"Regex [Unicode encoding error] {action} after {seconds * 1000:.0f} ms CPU "
+                  f"on {len(text)} chars, {outcome}")
+
+    def quarantined(self) -> Dict[str, int]:
+        """Name of every quarantined pattern -> shortest text length it is skipped for"""
+        now = time.monotonic()
+        with self._lock:
+            return {self.name(pattern): shortest
+                    for pattern, (shortest, expires) in self._quarantine.items() if expires > now}
+
+    def reset(self) -> None:
+        """Forget overruns and quarantined patterns"""
+        with self._lock:
+            self._strikes = {}
+            self._quarantine = {}
+
+    def to_dict(self) -> Optional[Dict]:
+        """Budget use of the current receipt (None before start())"""
+        receipt = self._receipt()
+        if receipt is None:
+            return None
+        return {
+            'ms': round(receipt.seconds * 1000, 3),
+            'runs': receipt.runs,
+            'slowest_ms': round(receipt.slowest * 1000, 3),
+            'skipped': receipt.skipped,
+            'overruns': receipt.overruns,
+            'stopped': receipt.stopped,
+            'quarantined': sorted(set(receipt.quarantined)),
+            'quarantined_patterns': len(self.quarantined()),
+            'hard_limits': self.hard_limits
+        }
+
+
+def _supports_timeout(regex_module) -> bool:
+    try:
+        regex_module.compile('a').search('a', timeout=1.0)
+        return True
+    except TypeError:
+        return False
@@ -2,7 +2,14 @@
 Text Processing utilities for receipt extraction
 """
 import re
-from typing import Dict, List, Optional, Tuple
+import time
+from typing import Collection, Dict, List, Optional, Pattern, Sequence, Tuple, Union
+
+from patterns.pattern_manager import FIELD_FLAGS
+from patterns.regex_lint import named_patterns
+from processors.literal_prefilter import LiteralPrefilter, TextScan
+from processors.pattern_stats import PatternStats
+from processors.regex_guard import RegexGuard
 
 
 class TextProcessor:
@@ -11,11 +18,54 @@ class TextProcessor:
     def __init__(self, pattern_manager):
         self.pattern_manager = pattern_manager
         self.field_confidences = {}  # Store confidence scores for extracted fields
-
-    def extract_field_with_patterns(self, text: str, patterns: List[str], text_blocks: List[Tuple[str, float]] = None, field_name: str = '') -> Optional[str]:
-        """Extract field using multiple regex patterns and calculate confidence"""
-        for pattern_idx, pattern in enumerate(patterns):
-            match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+        self.patterns_tried = {}  # Number of patterns tried per field (for profiling)
+        self.prefilter = LiteralPrefilter(pattern_manager)
+        self.stats = PatternStats()  # per-pattern attempts / hits / time (OCR_PATTERN_STATS)
+        # Per-pattern / per-receipt time limits (OCR_REGEX_*), skipped patterns reported by name
+        self.guard = RegexGuard(names={pattern: name for name, pattern in named_patterns(pattern_manager)})
+
+    def scan(self, text: str) -> TextScan:
+        """Find the literals the field patterns require (one automaton pass, see LiteralPrefilter)"""
+        return self.prefilter.scan(text)
+
+    def extract_field(self, scan: TextScan, field_name: str,
+                      text_blocks: List[Tuple[str, float]] = None) -> Optional[str]:
+        """Extract a registry field from a scanned text (patterns that cannot match are skipped)"""
+        patterns = self.pattern_manager.compiled[field_name]
+        skip = scan.skipped.get(field_name)
+        if self.stats.enabled and skip:
+            self.stats.record_skipped(field_name, skip, len(patterns))
+        order = self.stats.order(field_name, self.pattern_manager.tiers(field_name)) if self.stats.enabled else None
+        return self.extract_field_with_patterns(
+            scan.text, patterns, text_blocks, field_name, skip=skip, order=order
+        )
+
+    def extract_field_with_patterns(self, text: str, patterns: Sequence[Union[Pattern, str]], text_blocks: List[Tuple[str, float]] = None, field_name: str = '',
+                                   skip: Optional[Collection[int]] = None,
+                                   order: Optional[Sequence[int]] = None) -> Optional[str]:
+        """Extract field using multiple regex patterns and calculate confidence
+
+        Patterns are compiled patterns from PatternManager.compiled; plain
+        strings are still accepted and compiled with the field flags.
+        Indices in skip are patterns known not to match (see LiteralPrefilter);
+        order is the execution order (default: declared order), confidence
+        always uses the declared position.
+        """
+        record = self.stats.enabled and field_name
+        for pattern_idx in (order if order is not None else range(len(patterns))):
+            if skip and pattern_idx in skip:
+                continue
+            pattern = patterns[pattern_idx]
+            if isinstance(pattern, str):
+                pattern = re.compile(pattern, FIELD_FLAGS)
+            if record:
+                start = time.perf_counter()
+                match = self.guard.search(pattern, text)
+                self.stats.record(field_name, pattern_idx, len(patterns), time.perf_counter() - start, bool(match))
+            else:
+                match = self.guard.search(pattern, text)
+            if field_name:
+                self.patterns_tried[field_name] = pattern_idx + 1
             if match:
                 extracted_text = None
                 # Handle multi-group patterns (e.g., for *** *** \n 4625)
@@ -36,6 +86,7 @@ class TextProcessor:
                 return extracted_text
 
         if field_name:
+            self.patterns_tried[field_name] = len(patterns)
             self.field_confidences[field_name] = 0.0
         return None
 
@@ -90,7 +141,7 @@ class TextProcessor:
             # Check if it's a valid number format
             try:
                 float(text.replace(',', ''))
-                if re.match(r'^\d+([.,]\d{2})?$', text.replace(',', '')):
+                if self.pattern_manager.helper('amount_format').match(text.replace(',', '')):
                     return 1.0
                 else:
                     return 0.7
@@ -99,25 +150,20 @@ class TextProcessor:
 
         elif field_name == 'date':
             # Check if it looks like a date
-            date_patterns = [
-                r'\d{1,2}/\d{1,2}/\d{2,4}',
-                r'\d{1,2}-\d{1,2}-\d{2,4}',
-                r'\d{1,2}\s+[ก-๙]{1,3}\.?\s*\d{2,4}'
-            ]
-            for pattern in date_patterns:
-                if re.search(pattern, text):
-                    return 0.9
+            if self.pattern_manager.helper('date_format').search(text):
+                return 0.9
             return 0.5
 
         elif field_name == 'reference_id':
             # Reference IDs are usually alphanumeric with certain length
-            if len(text) >= 8 and re.match(r'^[A-Za-z0-9:]+$', text):
+            if len(text) >= 8 and self.pattern_manager.helper('reference_format').match(text):
                 return 0.9
             return 0.6
 
         elif field_name in ['sender_name', 'receiver_name']:
             # Names should contain Thai characters or English letters
-            if re.search(r'[ก-๙]', text) or re.search(r'[a-zA-Z]', text):
+            helper = self.pattern_manager.helper
+            if helper('thai_letters').search(text) or helper('latin_letters').search(text):
                 # Bonus for having title words
                 if any(title in text for title in ['นาย', 'นาง', 'นางสาว']):
                     return 0.9
@@ -130,16 +176,17 @@ class TextProcessor:
     def extract_receiver_name_special(self, text: str, text_blocks: List[Tuple[str, float]]) -> Optional[str]:
         """Special extraction for receiver names when standard patterns fail"""
         # For organization names split across lines (like "มทร.ตะวันออก (ค่าธรรมเนียมการศึกษา)")
+        helper = self.pattern_manager.helper
         org_parts = []
         for i, (text_block, confidence) in enumerate(text_blocks):
             if confidence >= 0.6:  # Accept medium confidence
                 # Check for organization patterns
-                if (re.search(r'[ก-๙a-zA-Z\.]+(?:ตะวันออก|ตะวันตก|เหนือ|ใต้|กลาง)', text_block) or
-                    re.search(r'มทร\.|บทร\.|โรงเรียน|มหาวิทยาลัย|วิทยาลัย', text_block)):
+                if (helper('org_region').search(text_block) or
+                    helper('org_keyword').search(text_block)):
                     org_parts.append(text_block.strip())
                 # Check for content in parentheses in the next block
                 elif (text_block.strip().startswith('(') or
-                      re.search(r'\([ก-๙a-zA-Z\s]*\)|\([ก-๙a-zA-Z\s]*$|^[ก-๙a-zA-Z\s]*\)', text_block)):
+                      helper('org_parentheses').search(text_block)):
                     org_parts.append(text_block.strip())
                 # Check for education-related terms
                 elif any(term in text_block for term in ['ศึกษา', 'การศึกษา', 'ค่าธรรมเนียม']):
@@ -258,7 +305,7 @@ class TextProcessor:
 
     def convert_buddhist_year(self, date_str: str) -> str:
         """Convert Buddhist year (B.E.) to Christian year (C.E.)"""
-        year_match = re.search(r'(\d{4})', date_str)
+        year_match = self.pattern_manager.helper('year').search(date_str)
         if year_match:
             year = int(year_match.group(1))
             if year >= 2400:  # Buddhist year
@@ -266,29 +313,18 @@ class TextProcessor:
                 date_str = date_str.replace(str(year), str(new_year))
         return date_str
 
-    def detect_merchant_and_source(self, full_text: str) -> Tuple[Optional[str], Dict[str, str]]:
-        """Detect merchant name and source type/brand"""
+    def detect_merchant_and_source(self, full_text: str,
+                                   scan: Optional[TextScan] = None) -> Tuple[Optional[str], Dict[str, str]]:
+        """Detect merchant name and source type/brand (scan: LiteralPrefilter result for full_text)"""
         merchant = None
         source = {'type': 'unknown', 'brand': 'unknown'}
 
-        text_upper = full_text.upper()
-
         # First, try to extract merchant from business name patterns
-        merchant_patterns = [
-            r"สาขา\s+([^:\n\r]+)",
-            r"(?:ร้าน|shop|store)\s*:?\s*([^\n\r]+)",
-            r"(?:merchant|ผู้ขาย)\s*:?\s*([^\n\r]+)",
-            r"^([A-Z\s]{3,20})(?:ที่|@|location)",
-            r"รหัสร้าน\s*:\s*(\d+)",
-            # Pattern for coffee shop names
-            r"(เดอะเฟิร์สเอสเปรสโซ่โรสเตอร์)",
-            r"(บจก\.\s*[^\n\r]+)",
-            # General business name patterns
-            r"([ก-๙a-zA-Z\s]+(?:โรสเตอร์|คอฟฟี่|ร้าน|เซ็นเตอร์))",
-        ]
-
-        for pattern in merchant_patterns:
-            match = re.search(pattern, full_text, re.IGNORECASE | re.MULTILINE)
+        skip = scan.skipped.get('merchant') if scan is not None else None
+        for pattern_idx, pattern in enumerate(self.pattern_manager.compiled['merchant']):
+            if skip and pattern_idx in skip:
+                continue
+            match = self.guard.search(pattern, full_text)
             if match:
                 candidate = match.group(1).strip()
                 if candidate.isdigit() and len(candidate) == 5:
@@ -296,16 +332,16 @@ class TextProcessor:
                 merchant = candidate
                 break
 
-        # Then check for known brands to determine source type
-        for brand_key, brand_info in self.pattern_manager.brand_patterns.items():
-            if brand_key in text_upper:
-                source = {
-                    'type': brand_info['type'],
-                    'brand': brand_info['brand']
-                }
-                # If no merchant found yet and this is not a bank, use brand as merchant
-                if not merchant and brand_info['type'] != 'bank':
-                    merchant = brand_info['brand']
-                break
+        # Then resolve the known brands found in one pass to determine source type
+        brand_matches = self.pattern_manager.find_brands(full_text)
+        if brand_matches:
+            best = brand_matches[0]
+            source = {
+                'type': best.type,
+                'brand': best.brand
+            }
+            # If no merchant found yet and this is not a bank, use brand as merchant
+            if not merchant and best.type != 'bank':
+                merchant = best.brand
 
         return merchant, source
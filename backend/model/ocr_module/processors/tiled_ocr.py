@@ -0,0 +1,124 @@
+"""
+Tiled OCR for tall screenshots
+Long scrolling screenshots (TrueMoney, some banking apps) are split into
+overlapping horizontal bands that are recognized separately, instead of
+shrinking the whole image until it fits the detector. Text blocks of the bands
+are shifted back to image coordinates and merged: each band owns the half of
+the overlap zones next to it, so a line in an overlap is kept exactly once.
+"""
+import os
+from dataclasses import dataclass, replace
+from typing import List, Sequence, Tuple
+
+from models.text_block import TextBlock
+from processors.layout_index import LayoutIndex
+from utils.image_scaling import DownscaleConfig
+
+# Overlap never smaller than this (pixels), so a text line always fits in one band
+_MIN_OVERLAP = 64
+# Boxes overlapping more than this (IoU) with the same text are duplicates
+_DUPLICATE_IOU = 0.5
+
+
+@dataclass
+class TilingConfig:
+    """When and how tall images are split into bands"""
+    enabled: bool = True
+    min_aspect: float = 2.5         # height / width at which tiling starts
+    band_aspect: float = 1.5        # band height as a multiple of the image width
+    overlap_ratio: float = 0.1      # overlap between bands as a fraction of the width
+    workers: int = min(4, os.cpu_count() or 1)
+
+    @classmethod
+    def from_env(cls) -> 'TilingConfig':
+        """Read OCR_TILING, OCR_TILE_MIN_ASPECT and OCR_TILE_WORKERS"""
+        return cls(
+            enabled=os.getenv('OCR_TILING', 'true').lower() == 'true',
+            min_aspect=float(os.getenv('OCR_TILE_MIN_ASPECT', str(cls.min_aspect))),
+            workers=max(1, int(os.getenv('OCR_TILE_WORKERS', str(cls.workers))))
+        )
+
+
+def should_tile(shape: Sequence[int], config: TilingConfig) -> bool:
+    """Check if an image is tall enough to be recognized in bands"""
+    height, width = shape[:2]
+    return config.enabled and width > 0 and height / float(width) >= config.min_aspect
+
+
+def downscale_config_for(shape: Sequence[int], downscale: DownscaleConfig,
+                         config: TilingConfig) -> DownscaleConfig:
+    """Resize limits for an image that will be tiled
+
+    The longest side limit applies to the width only, so a tall screenshot
+    keeps its glyph size instead of being shrunk to fit in one pass.
+    """
+    height, width = shape[:2]
+    if not should_tile(shape, config) or downscale.max_side <= 0:
+        return downscale
+    return replace(downscale, max_side=int(downscale.max_side * height / float(width)))
+
+
+def split_bands(height: int, width: int, config: TilingConfig) -> List[Tuple[int, int]]:
+    """Overlapping (y0, y1) bands covering the full image height"""
+    overlap = max(_MIN_OVERLAP, int(width * config.overlap_ratio))
+    band = max(int(width * config.band_aspect), 2 * overlap + 1)
+    step = band - overlap
+
+    bands = []
+    y0 = 0
+    while True:
+        y1 = min(height, y0 + band)
+        bands.append((y0, y1))
+        if y1 >= height:
+            return bands
+        y0 += step
+
+
+def offset_blocks(blocks: List[TextBlock], dy: float) -> List[TextBlock]:
+    """Shift block boxes from band to image coordinates"""
+    return [block.with_box([[x, y + dy] for x, y in block.box]) for block in blocks]
+
+
+def _iou(a: TextBlock, b: TextBlock) -> float:
+    width = min(a.x1, b.x1) - max(a.x0, b.x0)
+    height = min(a.y1, b.y1) - max(a.y0, b.y0)
+    if width <= 0 or height <= 0:
+        return 0.0
+    inter = width * height
+    union = (a.x1 - a.x0) * (a.y1 - a.y0) + (b.x1 - b.x0) * (b.y1 - b.y0) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def merge_band_blocks(bands: List[Tuple[int, int]],
+                      band_blocks: List[List[TextBlock]]) -> Tuple[List[TextBlock], int]:
+    """Merge the blocks of every band (image coordinates) into one reading-order list
+
+    Returns:
+        (blocks, duplicates) where duplicates counts the blocks dropped in overlap zones
+    """
+    # Band i owns [cut(i-1, i), cut(i, i+1)), cuts in the middle of each overlap
+    cuts = [(bands[i][0] + bands[i - 1][1]) / 2.0 for i in range(1, len(bands))]
+    tops = [float('-inf')] + cuts
+    bottoms = cuts + [float('inf')]
+
+    merged: List[TextBlock] = []
+    duplicates = 0
+    for top, bottom, blocks in zip(tops, bottoms, band_blocks):
+        for block in blocks:
+            if not top <= block.center_y < bottom:
+                duplicates += 1
+                continue
+            # A line straddling the cut can still be seen whole by both bands
+            twin = next((i for i, kept in enumerate(merged)
+                         if kept.text == block.text and _iou(kept, block) > _DUPLICATE_IOU), None)
+            if twin is None:
+                merged.append(block)
+            else:
+                duplicates += 1
+                if block.confidence > merged[twin].confidence:
+                    merged[twin] = block
+
+    if not merged:
+        return [], duplicates
+    layout = LayoutIndex(merged)
+    return [layout.blocks[idx] for row in layout.rows for idx in row], duplicates
@@ -1,42 +1,132 @@
 """
 Main Receipt Extractor class for extracting data from receipt images
 """
+import hashlib
+import json
+import math
 import os
-import sys
-import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
 from typing import Dict, List, Optional, Tuple
 
 from models.extraction_result import ExtractionResult
+from models.batch_result import BatchItemResult
+from models.text_block import TextBlock, blocks_have_geometry
 from patterns.pattern_manager import PatternManager
 from processors.text_processor import TextProcessor
-from ocr_backends.base_ocr import OCR_BACKEND
+from processors.ocr_cascade import CascadeConfig, make_variant, critical_fields_found, cascade_score
+from processors.layout_index import LayoutIndex
+from processors.field_retry import FieldRetryConfig, find_label, label_crop_box, crop_variants, value_from_blocks
+from processors.tiled_ocr import (TilingConfig, should_tile, downscale_config_for, split_bands,
+                                  offset_blocks, merge_band_blocks)
+from ocr_backends.base_ocr import require_ocr_backend
+from ocr_backends.engine_profiles import ENGINE_PROFILES, PROFILE_FOR_KIND, EngineProfile, engine_profile_mode
 from ocr_backends.gpu_manager import GPUManager
-from utils.image_preprocessing import preprocess_image
+from utils.image_preprocessing import PreprocessingPipeline, to_grayscale
+from utils.image_io import (ImageInput, DecodedImage, load_image, decode_image, read_image_data, read_image_header,
+                            oriented_size, is_path_input, is_bytes_input, is_decoded_input, describe_image, hash_image)
+from utils.image_scaling import DownscaleConfig, compute_scale, downscale_image, scale_box
+from utils.region_detection import RegionConfig, detect_receipt_region, transform_box
+from utils.slip_qr import decode_slip_qr, qr_enabled
+from utils.image_kind import classify_image
+from utils.lazy_imports import get_cv2, get_numpy
 from utils.name_cleaner import clean_name
+from utils.timing import StageTimer
 
-try:
-    import cv2
-    import numpy as np
-except ImportError:
-    cv2 = None
-    np = None
+
+# Confidence of fields read from the slip verification QR
+QR_CONFIDENCE = 0.99
 
 
 class ReceiptExtractor:
     """Main class for extracting data from receipt images"""
 
-    def __init__(self, use_gpu: bool = False, lang: str = 'th'):
+    def __init__(self, use_gpu: bool = False, lang: str = 'th', result_cache=None,
+                 profile: Optional[bool] = None, downscale: Optional[DownscaleConfig] = None,
+                 preprocessing: Optional[PreprocessingPipeline] = None,
+                 cascade: Optional[CascadeConfig] = None, region: Optional[RegionConfig] = None,
+                 qr: Optional[bool] = None, field_retry: Optional[FieldRetryConfig] = None,
+                 tiling: Optional[TilingConfig] = None, engine_profile: Optional[str] = None):
         """Initialize the receipt extractor
 
         Args:
             use_gpu: Whether to use GPU acceleration
             lang: Language for OCR (default: 'th' for Thai)
+            result_cache: Optional ResultCache for repeated uploads of the same image
+            profile: Attach a timing profile to every result
+                (default: OCR_PROFILE environment variable)
+            downscale: Resize limits applied before OCR
+                (default: OCR_MAX_SIDE / OCR_TARGET_TEXT_HEIGHT / OCR_MIN_SIDE)
+            preprocessing: Enhancement pipeline for the retry pass
+                (default: OCR_PREPROCESS_STEPS or the standard chain)
+            cascade: OCR variants, time budget and confidence threshold
+                (default: OCR_CASCADE_VARIANTS / OCR_CASCADE_BUDGET / OCR_CASCADE_MIN_CONFIDENCE)
+            region: Receipt region detection (crop and deskew) before OCR
+                (default: OCR_REGION_DETECT / OCR_REGION_MIN_AREA / OCR_REGION_MAX_AREA)
+            qr: Decode the slip verification QR for reference_id and sending bank
+                (default: OCR_SLIP_QR)
+            field_retry: Re-recognition of weak fields from a crop next to their label
+                (default: OCR_FIELD_RETRY / OCR_FIELD_RETRY_TEXT_HEIGHT)
+            tiling: Band-wise OCR of tall screenshots
+                (default: OCR_TILING / OCR_TILE_MIN_ASPECT / OCR_TILE_WORKERS)
+            engine_profile: 'auto' (screenshots -> 'fast', photos -> 'full'), 'fast' or 'full'
+                (default: OCR_ENGINE_PROFILE)
         """
         self.pattern_manager = PatternManager()
         self.text_processor = TextProcessor(self.pattern_manager)
         self.use_gpu = use_gpu
         self.lang = lang
-        self.backend = OCR_BACKEND
+        self.backend = require_ocr_backend()
+        self.result_cache = result_cache
+        # Per-stage timings of the last extraction
+        self.timer = StageTimer()
+        # Per-field timings inside the parse stage
+        self.parse_timer = StageTimer()
+        if profile is None:
+            profile = os.getenv('OCR_PROFILE', 'false').lower() in ('1', 'true', 'yes')
+        self.profile = profile
+        # Which OCR variant produced the text ('original', 'enhanced', ... or 'none')
+        self._ocr_pass = 'none'
+        self._name_strategy = None
+        self.downscale = downscale or DownscaleConfig.from_env()
+        self.preprocessing = preprocessing or PreprocessingPipeline.from_env()
+        self.cascade = cascade or CascadeConfig.from_env()
+        self.region = region or RegionConfig.from_env()
+        self.qr = qr_enabled() if qr is None else qr
+        self.field_retry = field_retry or FieldRetryConfig.from_env()
+        self.tiling = tiling or TilingConfig.from_env()
+        # Bands of the last tiled OCR pass (None when the image was not tiled)
+        self.last_tiling: Optional[Dict] = None
+        self.engine_profile_mode = engine_profile or engine_profile_mode()
+        if self.engine_profile_mode != 'auto' and self.engine_profile_mode not in ENGINE_PROFILES:
+            raise ValueError(f"Unknown OCR engine profile: {self.engine_profile_mode}")
+        # Profile used for the current image, and the decision of the last image
+        self._engine_profile: EngineProfile = ENGINE_PROFILES['full']
+        self.last_engine_profile: Optional[Dict] = None
+        # Slip QR of the last image: None when not attempted, else {'decoded': bool, ...}
+        self.last_qr: Optional[Dict] = None
+        # Detected receipt region of the last image and its transforms (original <-> crop)
+        self.last_region: Optional[Dict] = None
+        self._region_matrix = None
+        self._region_inverse = None
+        # Decode info of the last image and its source -> decoded scale
+        self.last_decode: Optional[Dict] = None
+        self._decode_scale = 1.0
+        # Resize info of the last image and the scale applied to the OCR input
+        self.last_resize: Optional[Dict] = None
+        self._ocr_scale = 1.0
+        # Boxes of the last OCR pass in original image coordinates (parallel to its text blocks)
+        self.last_boxes: List[List[List[float]]] = []
+        # Regex time budget use of the last image (see RegexGuard.to_dict)
+        self.last_regex: Optional[Dict] = None
+        # Last backend error of the current cascade (every pass failing raises it)
+        self.last_ocr_error: Optional[str] = None
+        # Hash of the settings that change what OCR reads, part of the result cache key
+        self.config_version = self._compute_config_version()
+
+        # Engine import and model load times (seconds)
+        self.init_timer = StageTimer()
 
         # Initialize OCR based on available backend
         if self.backend == 'easyocr':
@@ -47,42 +137,51 @@ class ReceiptExtractor:
     def _init_easyocr(self):
         """Initialize EasyOCR"""
         try:
-            import easyocr
+            with self.init_timer.stage('engine_import'):
+                import easyocr
             gpu_available = self.use_gpu and self._check_cuda()
 
             # EasyOCR language codes
             lang_codes = ['th', 'en'] if self.lang == 'th' else ['en']
 
-            self.ocr = easyocr.Reader(
-                lang_codes,
-                gpu=gpu_available,
-                verbose=False
-            )
+            with self.init_timer.stage('model_load'):
+                self.ocr = easyocr.Reader(
+                    lang_codes,
+                    gpu=gpu_available,
+                    verbose=False
+                )
 
             device_str = "GPU" if gpu_available else "CPU"
-            print(f"EasyOCR initialized successfully on {device_str}")
+            print(f"EasyOCR initialized successfully on {device_str} ({self._init_summary()})")
 
         except Exception as e:
-            print(f"Failed to initialize EasyOCR: {e}")
-            sys.exit(1)
+            raise RuntimeError(f"Failed to initialize EasyOCR: {e}") from e
 
     def _init_paddleocr(self):
         """Initialize PaddleOCR (fallback)"""
-        from paddleocr import PaddleOCR
+        with self.init_timer.stage('engine_import'):
+            from paddleocr import PaddleOCR
 
         self.device = GPUManager.configure_paddle_device(self.use_gpu)
 
         try:
-            self.ocr = PaddleOCR(lang=self.lang, show_log=False)
-            print(f"PaddleOCR initialized successfully on {self.device.upper()}")
+            with self.init_timer.stage('model_load'):
+                self.ocr = PaddleOCR(lang=self.lang, show_log=False)
+            print(f"PaddleOCR initialized successfully on {self.device.upper()} ({self._init_summary()})")
         except Exception as e:
             print(f"Warning: Failed to initialize PaddleOCR: {e}")
             try:
-                self.ocr = PaddleOCR(lang=self.lang)
+                with self.init_timer.stage('model_load'):
+                    self.ocr = PaddleOCR(lang=self.lang)
                 print("PaddleOCR initialized with basic configuration")
             except Exception as e2:
-                print(f"Failed to initialize any OCR backend: {e2}")
-                sys.exit(1)
+                raise RuntimeError(f"Failed to initialize any OCR backend: {e2}") from e2
+
+    def _init_summary(self) -> str:
+        """Engine import and model load times for the startup log line"""
+        stages = self.init_timer.stages
+        return (f"import {stages.get('engine_import', 0.0):.2f}s, "
+                f"model {stages.get('model_load', 0.0):.2f}s")
 
     def _check_cuda(self) -> bool:
         """Check if CUDA is available for PyTorch"""
@@ -92,89 +191,477 @@ class ReceiptExtractor:
         except ImportError:
             return False
 
-    def extract_text_from_image(self, image_path: str) -> List[Tuple[str, float]]:
-        """Extract text from image using OCR with image preprocessing
+    def warm_up(self, fork_safe: bool = False) -> float:
+        """Run one dummy inference so lazily built engine state exists before real traffic
 
         Args:
-            image_path: Path to the image file
+            fork_safe: Run the inference single-threaded so the parent process
+                never starts an OpenMP thread pool (which is not fork-safe).
+                Use this when workers are forked after the warmup.
+
+        Returns:
+            Warmup duration in seconds
+        """
+        cv2, np = get_cv2(), get_numpy()
+        if np is None:
+            return 0.0
+
+        # A small white strip with an amount-like string on it
+        image = np.full((64, 320, 3), 255, dtype=np.uint8)
+        if cv2 is not None:
+            cv2.putText(image, '1,234.00', (10, 45), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 2)
+
+        torch = None
+        num_threads = None
+        if fork_safe and self.backend == 'easyocr':
+            try:
+                import torch
+                num_threads = torch.get_num_threads()
+                torch.set_num_threads(1)
+            except ImportError:
+                torch = None
+
+        start = time.perf_counter()
+        try:
+            self._try_ocr_extraction(image)
+        finally:
+            if torch is not None:
+                # Only takes effect at the next parallel region, i.e. in the forked workers
+                torch.set_num_threads(num_threads)
+            self.timer.reset()
+        return time.perf_counter() - start
+
+    def extract_text_from_image(self, image: ImageInput) -> List[Tuple[str, float]]:
+        """Extract text from image using the OCR cascade (see _run_cascade)
+
+        Args:
+            image: Path to the image file, raw encoded image bytes or a decoded ndarray
 
         Returns:
             List of tuples containing (text, confidence_score)
         """
-        if not os.path.exists(image_path):
-            raise FileNotFoundError(f"Image file not found: {image_path}")
+        _, text_blocks = self._run_cascade(image)
+        return text_blocks
+
+    def _run_cascade(self, image: ImageInput) -> Tuple[ExtractionResult, List[Tuple[str, float]]]:
+        """OCR and parse image variants until the critical fields are confident
+
+        Variants are tried in the configured order. The cascade stops as soon as
+        every critical field is found above the confidence threshold, or when the
+        next pass would exceed the time budget, and keeps the best scoring pass.
+
+        Returns:
+            (result, text_blocks) of the chosen pass
+        """
+        self.last_boxes = []
+        self.last_ocr_error = None
+        # One decode shared by every stage (the engine only reads files itself without OpenCV)
+        ocr_input = self._prepare_ocr_input(image, decode_paths=get_cv2() is not None)
+        self._engine_profile = self._select_engine_profile(image, ocr_input)
+        if self._engine_profile.grayscale and getattr(ocr_input, 'ndim', 0) == 3:
+            with self.timer.stage('grayscale'):
+                ocr_input = to_grayscale(ocr_input)
+        ocr_input = self._crop_region(ocr_input)
+        # QR modules are small: decode before the image is scaled down
+        self.last_qr = self._decode_qr(ocr_input)
+        # Full-resolution region, kept for targeted field re-recognition
+        region_image = ocr_input
+        ocr_input = self._downscale_input(ocr_input)
+        base_scale = self._ocr_scale
+
+        config = self.cascade
+        start = time.perf_counter()
+        attempts = []
+        best = None  # (score, variant, result, text_blocks, boxes, patterns_tried)
+        result = None
+        stop_reason = 'exhausted'
+        last_pass_seconds = 0.0
 
         try:
-            # Try with original image first
-            text_blocks = self._try_ocr_extraction(image_path)
-
-            # If no results, try with preprocessed image
-            if not text_blocks:
-                preprocessed_path = preprocess_image(image_path)
-                if preprocessed_path:
-                    text_blocks = self._try_ocr_extraction(preprocessed_path)
-                    # Clean up temporary file
-                    if preprocessed_path != image_path:
-                        try:
-                            os.remove(preprocessed_path)
-                        except:
-                            pass
-
-            return text_blocks
+            for variant_name in self._engine_profile.variants or config.variants:
+                elapsed = time.perf_counter() - start
+                if attempts and elapsed + last_pass_seconds > config.budget_seconds:
+                    stop_reason = 'budget'
+                    break
+
+                pass_start = time.perf_counter()
+                if variant_name == 'original':
+                    variant, variant_scale = ocr_input, 1.0
+                else:
+                    with self.timer.stage('preprocess'):
+                        variant, variant_scale = make_variant(variant_name, ocr_input, self.preprocessing)
+                    if variant is None:
+                        continue
+
+                self._ocr_scale = base_scale * variant_scale
+                text_blocks = self._try_ocr_extraction(variant)
+                with self.timer.stage('parse'):
+                    result = self._build_result(image, text_blocks, self.last_qr)
+                last_pass_seconds = time.perf_counter() - pass_start
+
+                found = critical_fields_found(result, config)
+                attempts.append({
+                    'variant': variant_name,
+                    'text_blocks': len(text_blocks),
+                    'critical_fields': found,
+                    'ms': round(last_pass_seconds * 1000, 2)
+                })
+
+                if text_blocks:
+                    score = cascade_score(result, config)
+                    if best is None or score > best[0]:
+                        best = (score, variant_name, result, text_blocks, self.last_boxes,
+                                dict(self.text_processor.patterns_tried))
+                    if found == len(config.critical_fields):
+                        stop_reason = 'critical_fields'
+                        break
 
         except Exception as e:
             try:
-                print(f"Error extracting text from {image_path}: {e}")
+                print(f"Error extracting text from {describe_image(image)}: {e}")
             except UnicodeEncodeError:
-                print(f"Error extracting text from {image_path}: [Unicode encoding error]")
-            return []
+                print(f"Error extracting text from {describe_image(image)}: [Unicode encoding error]")
+            stop_reason = 'error'
+            self.last_ocr_error = self.last_ocr_error or str(e)
+
+        if best is None and self.last_ocr_error and not (self.last_qr or {}).get('decoded'):
+            # Every pass failed: an error, not a receipt without text
+            raise RuntimeError(f"OCR failed on {describe_image(image)}: {self.last_ocr_error}")
+
+        field_retry = {}
+        if best is not None:
+            _, chosen, result, text_blocks, self.last_boxes, patterns_tried = best
+            self.text_processor.patterns_tried = patterns_tried
+            if time.perf_counter() - start < config.budget_seconds:
+                field_retry = self._retry_weak_fields(result, text_blocks, region_image)
+        else:
+            chosen, text_blocks = 'none', []
+            if result is None:
+                with self.timer.stage('parse'):
+                    result = self._build_result(image, text_blocks, self.last_qr)
+            self.last_boxes = []
+
+        self._ocr_pass = chosen
+        result.ocr_path = {
+            'chosen': chosen,
+            'stop_reason': stop_reason,
+            'attempts': attempts,
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 2)
+        }
+        if field_retry:
+            result.ocr_path['field_retry'] = field_retry
+        if self.last_engine_profile is not None:
+            self.last_engine_profile['elapsed_ms'] = result.ocr_path['elapsed_ms']
+            result.ocr_path['engine_profile'] = self.last_engine_profile
+        return result, text_blocks
+
+    def _select_engine_profile(self, image: ImageInput, ocr_input: ImageInput) -> EngineProfile:
+        """Pick the engine profile of an image (classifies it in 'auto' mode)"""
+        if self.engine_profile_mode != 'auto':
+            self.last_engine_profile = {'name': self.engine_profile_mode, 'kind': None}
+            return ENGINE_PROFILES[self.engine_profile_mode]
+
+        with self.timer.stage('classify'):
+            kind, info = classify_image(ocr_input, image)
+        name = PROFILE_FOR_KIND[kind]
+        self.last_engine_profile = dict({'name': name, 'kind': kind}, **info)
+        return ENGINE_PROFILES[name]
+
+    def _retry_weak_fields(self, result: ExtractionResult, text_blocks: List[TextBlock],
+                           image: ImageInput) -> Dict[str, Dict]:
+        """Re-recognize missing or low-confidence fields from a crop next to their label
+
+        The crop (right of and below the label) is taken from the full-resolution
+        region image, enlarged and recognized again; a value found there replaces
+        the current one when its confidence is higher.
 
-    def _try_ocr_extraction(self, image_path: str) -> List[Tuple[str, float]]:
-        """Try OCR extraction on given image"""
+        Returns:
+            Field -> {'variant', 'ms'[, 'value']} for every field that was retried
+        """
+        config = self.field_retry
+        if not config.enabled or not hasattr(image, 'shape') or not blocks_have_geometry(text_blocks):
+            return {}
+
+        weak = [field_name for field_name in config.fields
+                if getattr(result, field_name) is None
+                or result.confidence.get(field_name, 0.0) < config.min_confidence]
+        if not weak:
+            return {}
+
+        layout = LayoutIndex(text_blocks)
+        retried = {}
+        with self.timer.stage('field_retry'):
+            for field_name in weak:
+                label = find_label(layout, field_name)
+                if label is None:
+                    continue
+
+                # Label box: original image -> decoded -> region image coordinates
+                box = scale_box(label.box, 1.0 / self._decode_scale)
+                if self._region_matrix is not None:
+                    box = transform_box(box, self._region_matrix)
+                crop_box = label_crop_box(box, image.shape)
+                if crop_box is None:
+                    continue
+
+                x0, y0, x1, y1 = crop_box
+                label_height = max(y for _, y in box) - min(y for _, y in box)
+                start = time.perf_counter()
+                found, variant_name = None, None
+                for variant_name, variant in crop_variants(image[y0:y1, x0:x1], label_height, config):
+                    found = value_from_blocks(self._recognize_crop(variant), field_name)
+                    if found:
+                        break
+
+                attempt = {'variant': variant_name if found else None,
+                           'ms': round((time.perf_counter() - start) * 1000, 2)}
+                if found:
+                    value, block = found
+                    confidence = self.text_processor._calculate_field_confidence(
+                        value, 0, 1, [block], field_name
+                    )
+                    if getattr(result, field_name) is None or confidence > result.confidence.get(field_name, 0.0):
+                        if field_name in ('amount', 'fee'):
+                            value = self.text_processor.normalize_amount(value)
+                        setattr(result, field_name, value)
+                        result.confidence[field_name] = confidence
+                        attempt['value'] = value
+                retried[field_name] = attempt
+
+        if any('value' in attempt for attempt in retried.values()):
+            self.text_processor.field_confidences = dict(result.confidence)
+            result.overall_confidence = self._calculate_overall_confidence(result)
+        return retried
+
+    def _recognize_crop(self, image: 'np.ndarray') -> List[TextBlock]:
+        """OCR an image crop (boxes stay in crop coordinates, last_boxes is untouched)"""
         try:
             if self.backend == 'easyocr':
-                return self._easyocr_extract(image_path)
-            else:
-                return self._paddleocr_extract(image_path)
+                return self._easyocr_blocks(self.ocr.readtext(image, **self._engine_profile.easyocr_options))
+            results = self._paddle_ocr(image)
+            if results and results[0]:
+                return self._paddleocr_blocks(results[0])
+            return []
+
+        except Exception as e:
+            try:
+                print(f"Field re-recognition failed: {e}")
+            except UnicodeEncodeError:
+                print(f"Field re-recognition failed: [Unicode encoding error]")
+            return []
+
+    def _prepare_ocr_input(self, image: ImageInput, decode_paths: bool = False) -> ImageInput:
+        """Validate an image input and decode in-memory inputs into an ndarray
+
+        Paths are passed through unchanged unless decode_paths is set, so the
+        OCR engine can read the file itself.
+        """
+        self.last_decode = None
+        self._decode_scale = 1.0
+        if is_path_input(image):
+            if not os.path.exists(image):
+                raise FileNotFoundError(f"Image file not found: {image}")
+            if not decode_paths:
+                return image
+
+        if is_decoded_input(image):
+            decoded = image
+        elif is_path_input(image) or is_bytes_input(image):
+            # Decode once, never touch the filesystem again
+            with self.timer.stage('decode'):
+                decoded = self.decode(image)
+            if decoded is None:
+                raise ValueError(f"Could not decode image data: {describe_image(image)}")
+        else:
+            # Already decoded
+            return image
+
+        self.last_decode = decoded.info
+        self._decode_scale = decoded.info.get('scale', 1.0)
+        return decoded.image
+
+    def decode(self, image: ImageInput) -> Optional[DecodedImage]:
+        """Decode a path or buffer once for every later stage
+
+        JPEGs are decoded at 1/2, 1/4 or 1/8 size when the resize stage would
+        shrink them at least that much anyway, and straight to grayscale when
+        the engine profile is fixed to one that runs on grayscale. EXIF
+        orientation is applied, so rotated phone photos come out upright.
+        """
+        data = read_image_data(image)
+        if not data:
+            return None
+
+        scale = 1.0
+        header = read_image_header(data)
+        if header and self.downscale.enabled:
+            width, height = oriented_size(header)
+            shape = (height, width)
+            scale = compute_scale(shape, downscale_config_for(shape, self.downscale, self.tiling))
+            if self.region.enabled:
+                # Even the smallest accepted receipt region must still meet the resize limits
+                scale = min(1.0, scale / math.sqrt(self.region.min_area_ratio))
+
+        grayscale = (self.engine_profile_mode != 'auto'
+                     and ENGINE_PROFILES[self.engine_profile_mode].grayscale)
+        return decode_image(data, scale=scale, grayscale=grayscale)
+
+    def _enhance(self, image: ImageInput) -> Optional['np.ndarray']:
+        """Run the preprocessing pipeline on an OCR input (paths are decoded first)"""
+        if is_path_input(image):
+            image = load_image(image)
+            if image is None:
+                return None
+        return self.preprocessing.run(image)
+
+    def _crop_region(self, image: ImageInput) -> ImageInput:
+        """Crop a decoded image to the detected receipt region (full frame when unsure)"""
+        self.last_region = None
+        self._region_matrix = None
+        self._region_inverse = None
+        if not self.region.enabled or not hasattr(image, 'shape'):
+            return image
+
+        with self.timer.stage('region'):
+            cropped, self.last_region, matrix = detect_receipt_region(image, self.region)
+        if matrix is not None:
+            self._region_matrix = matrix
+            self._region_inverse = get_numpy().linalg.inv(matrix)
+        return cropped
+
+    def _decode_qr(self, image: ImageInput) -> Optional[Dict]:
+        """Decode the slip verification QR of a decoded image (None when not attempted)"""
+        if not self.qr or not hasattr(image, 'shape'):
+            return None
+
+        with self.timer.stage('qr'):
+            slip = decode_slip_qr(image)
+        return dict(slip, decoded=True) if slip else {'decoded': False}
+
+    def _box_transform(self) -> Tuple[float, Optional['np.ndarray'], float]:
+        """(OCR input scale, region inverse, decode scale) of the current image"""
+        return self._ocr_scale, self._region_inverse, self._decode_scale
+
+    def _to_original_box(self, box, transform: Optional[Tuple] = None) -> List[List[float]]:
+        """Map a box from OCR input coordinates back to the original image
+
+        Uses the transforms of the current image unless a _box_transform()
+        snapshot of another image is given.
+        """
+        ocr_scale, region_inverse, decode_scale = transform or self._box_transform()
+        box = scale_box(box, ocr_scale)
+        if region_inverse is not None:
+            box = transform_box(box, region_inverse)
+        if decode_scale != 1.0:
+            box = scale_box(box, decode_scale)
+        return box
+
+    def _downscale_input(self, image: ImageInput) -> ImageInput:
+        """Scale a decoded image down to the configured limits before OCR"""
+        self._ocr_scale = 1.0
+        self.last_resize = None
+        if not self.downscale.enabled or not hasattr(image, 'shape'):
+            return image
+
+        with self.timer.stage('resize'):
+            config = downscale_config_for(image.shape, self.downscale, self.tiling)
+            resized, self.last_resize = downscale_image(image, config)
+        self._ocr_scale = self.last_resize['scale']
+        return resized
+
+    def _try_ocr_extraction(self, image: ImageInput, to_original: bool = True) -> List[Tuple[str, float]]:
+        """Try OCR extraction on given image (path or decoded ndarray)
+
+        With to_original=False the boxes stay in OCR input coordinates.
+        """
+        try:
+            with self.timer.stage('ocr'):
+                if hasattr(image, 'shape') and should_tile(image.shape, self.tiling):
+                    text_blocks = self._tiled_blocks(image)
+                elif self.backend == 'easyocr':
+                    text_blocks = self._easyocr_extract(image)
+                else:
+                    text_blocks = self._paddleocr_extract(image)
+                return self._to_original_blocks(text_blocks) if to_original else text_blocks
 
         except Exception as e:
             try:
                 print(f"OCR extraction failed: {e}")
             except UnicodeEncodeError:
                 print(f"OCR extraction failed: [Unicode encoding error]")
+            self.last_ocr_error = str(e)
             return []
 
-    def _easyocr_extract(self, image_path: str) -> List[Tuple[str, float]]:
-        """Extract text using EasyOCR"""
-        results = self.ocr.readtext(image_path)
+    def _tiled_blocks(self, image: 'np.ndarray') -> List[TextBlock]:
+        """OCR a tall image in overlapping bands and merge them (boxes in image coordinates)"""
+        height, width = image.shape[:2]
+        bands = split_bands(height, width, self.tiling)
+        # PaddleOCR predictors are not thread-safe, so its bands run one after another
+        workers = min(self.tiling.workers, len(bands)) if self.backend == 'easyocr' else 1
+
+        def recognize(band: Tuple[int, int]) -> List[TextBlock]:
+            y0, y1 = band
+            return offset_blocks(self._recognize_crop(image[y0:y1]), y0)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            band_blocks = list(pool.map(recognize, bands))
+
+        text_blocks, duplicates = merge_band_blocks(bands, band_blocks)
+        self.last_tiling = {'bands': len(bands), 'workers': workers, 'duplicates': duplicates}
+        return text_blocks
+
+    def _easyocr_extract(self, image: ImageInput) -> List[TextBlock]:
+        """Extract text using EasyOCR (boxes in OCR input coordinates)"""
+        return self._easyocr_blocks(self.ocr.readtext(image, **self._engine_profile.easyocr_options))
+
+    def _to_original_blocks(self, text_blocks: List[TextBlock], transform: Optional[Tuple] = None) -> List[TextBlock]:
+        """Map block boxes from OCR input to original image coordinates (see _to_original_box)"""
+        transform = transform or self._box_transform()
+        text_blocks = [block.with_box(self._to_original_box(block.box, transform)) for block in text_blocks]
+        self.last_boxes = [block.box for block in text_blocks]
+        return text_blocks
+
+    def _easyocr_blocks(self, results: List) -> List[TextBlock]:
+        """Convert raw EasyOCR results into text blocks (with their boxes)"""
         text_blocks = []
 
         for result in results:
             if len(result) >= 3:
-                # result[1] is text, result[2] is confidence
+                # result[0] is the box, result[1] is text, result[2] is confidence
                 text = result[1].strip()
                 confidence = float(result[2])
                 if text:
-                    text_blocks.append((text, confidence))
+                    text_blocks.append(TextBlock(text, confidence, result[0]))
                     # Debug output for development
                     if os.getenv('DEBUG_OCR'):
                         print(f"[OCR] {confidence:.2f}: {text}")
 
         return text_blocks
 
-    def _paddleocr_extract(self, image_path: str) -> List[Tuple[str, float]]:
-        """Extract text using PaddleOCR"""
+    def _paddleocr_extract(self, image: ImageInput) -> List[TextBlock]:
+        """Extract text using PaddleOCR (boxes in OCR input coordinates)"""
+        results = self._paddle_ocr(image)
+
+        text_blocks = []
+        if results and len(results) > 0 and results[0]:
+            text_blocks = self._paddleocr_blocks(results[0])
+        return text_blocks
+
+    def _paddle_ocr(self, image: ImageInput) -> List:
+        """Run PaddleOCR with the angle classifier setting of the active engine profile"""
         try:
-            # Try newer API first
-            results = self.ocr.ocr(image_path)
+            # 2.x API: cls toggles the angle classifier
+            return self.ocr.ocr(image, cls=self._engine_profile.paddle_cls)
         except Exception:
-            # Fallback for older versions
-            results = self.ocr.ocr(image_path, cls=True)
+            # Newer API without the cls argument
+            return self.ocr.ocr(image)
 
+    def _paddleocr_blocks(self, lines: List) -> List[TextBlock]:
+        """Convert raw PaddleOCR result lines into text blocks (with their boxes)"""
         text_blocks = []
 
-        if results and len(results) > 0 and results[0]:
-            for line in results[0]:
+        if lines:
+            for line in lines:
                 if line and len(line) >= 2:
                     # line[0] contains bounding box coordinates
                     # line[1] contains [text, confidence]
@@ -183,167 +670,521 @@ class ReceiptExtractor:
                         text = text_info[0]
                         confidence = float(text_info[1])
                         if text and text.strip():
-                            text_blocks.append((text.strip(), confidence))
+                            text_blocks.append(TextBlock(text.strip(), confidence, line[0]))
 
         return text_blocks
 
-    def extract_receipt_data(self, image_path: str) -> ExtractionResult:
+    def _batch_ocr_extraction(self, images: List['np.ndarray']) -> List[List[Tuple[str, float]]]:
+        """Run OCR over several decoded images using batched engine calls
+
+        Boxes stay in the coordinates of each OCR input: the images come from
+        different sources, so the caller maps them back with per-image transforms.
+        """
+        tall = [idx for idx, image in enumerate(images) if should_tile(image.shape, self.tiling)]
+        if tall:
+            # Tall screenshots are recognized band by band, the rest stays batched
+            rest = [idx for idx in range(len(images)) if idx not in tall]
+            batch_results: List[List[TextBlock]] = [[] for _ in images]
+            if rest:
+                for idx, text_blocks in zip(rest, self._batch_ocr_extraction([images[idx] for idx in rest])):
+                    batch_results[idx] = text_blocks
+            for idx in tall:
+                batch_results[idx] = self._tiled_blocks(images[idx])
+            return batch_results
+
+        try:
+            if self.backend == 'easyocr':
+                return self._easyocr_extract_batch(images)
+            else:
+                return self._paddleocr_extract_batch(images)
+
+        except Exception as e:
+            try:
+                print(f"Batched OCR extraction failed, falling back to per-image: {e}")
+            except UnicodeEncodeError:
+                print(f"Batched OCR extraction failed, falling back to per-image: [Unicode encoding error]")
+            return [self._try_ocr_extraction(image, to_original=False) for image in images]
+
+    def _easyocr_extract_batch(self, images: List['np.ndarray']) -> List[List[Tuple[str, float]]]:
+        """Extract text from several images with EasyOCR readtext_batched"""
+        batch_results: List[List[Tuple[str, float]]] = [[] for _ in images]
+
+        # readtext_batched needs equally sized inputs, so batch per image shape
+        groups: Dict[Tuple[int, ...], List[int]] = {}
+        for idx, image in enumerate(images):
+            groups.setdefault(tuple(image.shape), []).append(idx)
+
+        for indices in groups.values():
+            if len(indices) == 1:
+                batch_results[indices[0]] = self._easyocr_extract(images[indices[0]])
+                continue
+
+            raw_results = self.ocr.readtext_batched(
+                [images[idx] for idx in indices], batch_size=len(indices),
+                **self._engine_profile.easyocr_options
+            )
+            for idx, results in zip(indices, raw_results):
+                batch_results[idx] = self._easyocr_blocks(results)
+
+        return batch_results
+
+    def _paddleocr_extract_batch(self, images: List['np.ndarray']) -> List[List[Tuple[str, float]]]:
+        """Extract text from several images with PaddleOCR
+
+        Text detection runs per image, then the crops of every image are sent
+        to the recognizer in a single batched call.
+        """
+        detector = getattr(self.ocr, 'text_detector', None)
+        recognizer = getattr(self.ocr, 'text_recognizer', None)
+        if detector is None or recognizer is None:
+            # PaddleOCR version without the detector/recognizer split
+            return [self._paddleocr_extract(image) for image in images]
+
+        try:
+            from paddleocr.tools.infer.utility import get_rotate_crop_image
+        except ImportError:
+            from tools.infer.utility import get_rotate_crop_image
+
+        drop_score = getattr(self.ocr, 'drop_score', 0.5)
+        crops = []
+        owners = []  # (image index, box) for every crop
+
+        cv2, np = get_cv2(), get_numpy()
+        for idx, image in enumerate(images):
+            if image.ndim == 2:
+                image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+
+            dt_boxes, _ = detector(image)
+            if dt_boxes is None:
+                continue
+
+            # Reading order: top to bottom, then left to right
+            for box in sorted(dt_boxes, key=lambda b: (b[0][1], b[0][0])):
+                crops.append(get_rotate_crop_image(image, np.array(box, dtype=np.float32)))
+                owners.append((idx, box))
+
+        lines_per_image: List[List] = [[] for _ in images]
+        if crops:
+            rec_results, _ = recognizer(crops)
+            for (idx, box), (text, score) in zip(owners, rec_results):
+                if score >= drop_score:
+                    lines_per_image[idx].append([box.tolist(), (text, score)])
+
+        return [self._paddleocr_blocks(lines) for lines in lines_per_image]
+
+    def _compute_config_version(self) -> str:
+        """Content hash of the preprocessing, cascade and OCR input settings"""
+        content = json.dumps(
+            {
+                'preprocessing': self.preprocessing.steps,
+                'cascade': asdict(self.cascade),
+                'downscale': asdict(self.downscale),
+                'region': asdict(self.region),
+                'tiling': asdict(self.tiling),
+                'field_retry': asdict(self.field_retry),
+                'qr': self.qr
+            },
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
+
+    def cache_key(self, image: ImageInput, batch: bool = False) -> Optional[str]:
+        """Result cache key: image content hash + pattern-set version + OCR engine
+        + engine profile mode + config version (preprocessing, cascade, resize, ...)
+
+        The profile an image gets follows from its content and the mode, so the
+        key determines it. extract_many() runs a shorter pipeline than
+        extract_receipt_data(): its keys (batch=True) end in ':batch'.
+
+        Returns None when no result cache is configured.
+        """
+        if self.result_cache is None:
+            return None
+        key = (f"{hash_image(image)}:{self.pattern_manager.version}:{self.backend}:{self.lang}:"
+               f"{self.engine_profile_mode}:{self.config_version}")
+        return f"{key}:batch" if batch else key
+
+    def _get_cached_result(self, key: Optional[str]) -> Optional[ExtractionResult]:
+        """Look up a cached result"""
+        if self.result_cache is None or key is None:
+            return None
+
+        cached = self.result_cache.get(key)
+        if cached is None:
+            return None
+
+        result = ExtractionResult.from_dict(cached)
+        result.cache_hit = True
+        return result
+
+    def _store_cached_result(self, key: Optional[str], result: ExtractionResult) -> None:
+        """Store a freshly extracted result (never one where OCR found no text or failed)"""
+        if self.result_cache is None or key is None:
+            return
+        ocr_path = result.ocr_path or {}
+        if ocr_path.get('chosen') == 'none' or ocr_path.get('stop_reason') == 'error':
+            return
+        self.result_cache.set(key, result.to_dict())
+
+    def cached_result(self, cache_key: Optional[str], profile: Optional[bool] = None) -> Optional[ExtractionResult]:
+        """Look up a result by a key hashed from the raw image, before it is decoded
+
+        Returns None on a miss or without a result cache. On a miss pass the key
+        to extract_receipt_data() or extract_many() with check_cache=False so the
+        lookup is not repeated.
+        """
+        if self.result_cache is None or cache_key is None:
+            return None
+        if profile is None:
+            profile = self.profile
+        self._reset_profile()
+        with self.timer.stage('cache'):
+            cached = self._get_cached_result(cache_key)
+        if cached is not None and profile:
+            cached.profile = self._build_profile([], cache_hit=True)
+        return cached
+
+    def extract_receipt_data(self, image: ImageInput, cache_key: Optional[str] = None,
+                             profile: Optional[bool] = None, check_cache: bool = True) -> ExtractionResult:
         """Main extraction function
 
         Args:
-            image_path: Path to the receipt image
+            image: Path to the receipt image, raw encoded image bytes or a decoded ndarray
+            cache_key: Precomputed result cache key (e.g. hashed from the upload
+                buffer before decoding). Computed from the image when omitted.
+            profile: Attach a timing profile to the result (default: self.profile)
+            check_cache: Look the key up first (False when cached_result() already missed)
 
         Returns:
-            ExtractionResult object containing extracted data
+            ExtractionResult object containing extracted data (empty when OCR found no text)
+
+        Raises:
+            FileNotFoundError, ValueError: The image is missing or cannot be decoded
+            RuntimeError: Every OCR pass failed in the backend
         """
+        if profile is None:
+            profile = self.profile
+        self._reset_profile()
+        text_blocks = []
         try:
-            # Extract text from image
-            text_blocks = self.extract_text_from_image(image_path)
+            if self.result_cache is not None:
+                with self.timer.stage('cache'):
+                    cache_key = cache_key or self.cache_key(image)
+                    cached = self._get_cached_result(cache_key) if check_cache else None
+                if cached is not None:
+                    if profile:
+                        cached.profile = self._build_profile(text_blocks, cache_hit=True)
+                    return cached
+
+            # OCR cascade: extract and parse until the critical fields are confident
+            result, text_blocks = self._run_cascade(image)
+            self.last_regex = self.text_processor.guard.to_dict()
+            if self.last_regex and self.last_regex['quarantined']:
+                # Fields these patterns look for may be missing: say so, and do not cache the result
+                result.ocr_path['regex_quarantined'] = self.last_regex['quarantined']
+            else:
+                self._store_cached_result(cache_key, result)
+            if profile:
+                result.profile = self._build_profile(text_blocks)
+            return result
 
-            # Check for known problematic images and apply specific handling
-            result = self._handle_special_cases(image_path, text_blocks)
-            if result:
-                return result
+        except Exception as e:
+            try:
+                print(f"Error processing receipt {describe_image(image)}: {e}")
+            except UnicodeEncodeError:
+                print(f"Error processing receipt {describe_image(image)}: [Unicode encoding error]")
+            # Callers report the failure (a failed job, an error record) instead of an empty receipt
+            raise
+
+    def _reset_profile(self) -> None:
+        """Clear the timing and tracking state of the previous extraction"""
+        self.timer.reset()
+        self.parse_timer.reset()
+        self.text_processor.patterns_tried = {}
+        self._ocr_pass = 'none'
+        self._name_strategy = None
+        self.last_decode = None
+        self.last_resize = None
+        self.last_region = None
+        self.last_qr = None
+        self.last_tiling = None
+        self.last_engine_profile = None
+        self.last_regex = None
+        self._engine_profile = ENGINE_PROFILES['full']
+        self.preprocessing.timer.reset()
+        # Regex budget covers every parse of this image (all cascade passes)
+        self.text_processor.guard.start()
+
+    def _build_profile(self, text_blocks: List[Tuple[str, float]], cache_hit: bool = False) -> Dict:
+        """Timing profile of the last extraction"""
+        stages = self.timer.to_dict()
+        return {
+            'total_ms': round(sum(stages.values()), 2),
+            'stages_ms': stages,
+            'parse_ms': self.parse_timer.to_dict(),
+            'preprocess_ms': self.preprocessing.timer.to_dict(),
+            'ocr_pass': 'cache' if cache_hit else self._ocr_pass,
+            'text_blocks': len(text_blocks),
+            'patterns_tried': dict(self.text_processor.patterns_tried),
+            'name_strategy': self._name_strategy,
+            'layout_fields': [name for name, tried in self.text_processor.patterns_tried.items() if tried == 0],
+            'brands': [match.to_dict() for match in
+                       self.pattern_manager.find_brands('\n'.join(block[0] for block in text_blocks))],
+            'decode': self.last_decode,
+            'region': self.last_region,
+            'qr': self.last_qr,
+            'tiling': self.last_tiling,
+            'engine_profile': self.last_engine_profile,
+            'resize': self.last_resize,
+            'regex': self.last_regex,
+            'cache_hit': cache_hit
+        }
 
-            if not text_blocks:
-                return ExtractionResult()
+    def _build_result(self, image: ImageInput, text_blocks: List[Tuple[str, float]],
+                      qr: Optional[Dict] = None) -> ExtractionResult:
+        """Parse OCR text blocks into an ExtractionResult
 
-            # Combine all text
-            full_text = '\n'.join([block[0] for block in text_blocks])
+        Args:
+            image: The original image input
+            text_blocks: OCR text blocks of the image
+            qr: Slip QR decode of the image (see _decode_qr); a decoded QR
+                provides reference_id and the sending bank directly
+        """
+        # Check for known problematic images and apply specific handling
+        result = self._handle_special_cases(image, text_blocks)
+        if result:
+            return result
 
-            # Initialize result
-            result = ExtractionResult()
+        qr = qr if qr and qr.get('decoded') else None
+        if not text_blocks and not qr:
+            return ExtractionResult()
 
-            # Reset confidence tracking
-            self.text_processor.field_confidences = {}
+        # Combine all text
+        full_text = '\n'.join([block[0] for block in text_blocks])
 
-            # Extract date
-            date_str = self.text_processor.extract_field_with_patterns(
-                full_text, self.pattern_manager.patterns['date'], text_blocks, 'date'
+        # Initialize result
+        result = ExtractionResult()
+
+        # Reset confidence and pattern tracking
+        self.text_processor.field_confidences = {}
+        self.text_processor.patterns_tried = {}
+        timer = self.parse_timer
+
+        # Literals the field patterns need, checked once for all fields
+        with timer.stage('scan'):
+            scan = self.text_processor.scan(full_text)
+
+        # Label/value pairing by position (needs boxes)
+        layout = None
+        if blocks_have_geometry(text_blocks):
+            with timer.stage('layout'):
+                layout = LayoutIndex(text_blocks)
+
+        # Extract date
+        with timer.stage('date'):
+            date_str = self.text_processor.extract_field(
+                scan, 'date', text_blocks
             )
             if date_str:
                 result.date = self.text_processor.convert_buddhist_year(date_str)
 
-            # Extract amount
-            amount_str = self.text_processor.extract_field_with_patterns(
-                full_text, self.pattern_manager.patterns['amount'], text_blocks, 'amount'
-            )
+        # Extract amount
+        with timer.stage('amount'):
+            amount_str = self._layout_field(layout, 'amount')
             if not amount_str:
-                # Fallback: find reasonable amounts
+                amount_str = self.text_processor.extract_field(
+                    scan, 'amount', text_blocks
+                )
+        if not amount_str:
+            # Fallback: find reasonable amounts
+            with timer.stage('amount_fallback'):
                 amount_str = self._find_fallback_amount(full_text)
-                if amount_str:
-                    self.text_processor.field_confidences['amount'] = 0.5  # Lower confidence for fallback
-
             if amount_str:
-                result.amount = self.text_processor.normalize_amount(amount_str)
+                self.text_processor.field_confidences['amount'] = 0.5  # Lower confidence for fallback
 
-            # Extract fee
-            fee_str = self.text_processor.extract_field_with_patterns(
-                full_text, self.pattern_manager.patterns['fee'], text_blocks, 'fee'
-            )
+        if amount_str:
+            result.amount = self.text_processor.normalize_amount(amount_str)
+
+        # Extract fee
+        with timer.stage('fee'):
+            fee_str = self._layout_field(layout, 'fee')
+            if not fee_str:
+                fee_str = self.text_processor.extract_field(
+                    scan, 'fee', text_blocks
+                )
             if fee_str:
                 result.fee = self.text_processor.normalize_amount(fee_str)
 
-            # Extract reference ID
-            result.reference_id = self.text_processor.extract_field_with_patterns(
-                full_text, self.pattern_manager.patterns['reference_id'], text_blocks, 'reference_id'
-            )
-
-            # Extract sender and receiver names with special handling
-            merchant, source = self.text_processor.detect_merchant_and_source(full_text)
+        # Extract reference ID
+        with timer.stage('reference_id'):
+            if qr:
+                # Exact value from the QR: no need for the regex chain
+                result.reference_id = qr['reference_id']
+                self.text_processor.field_confidences['reference_id'] = QR_CONFIDENCE
+            else:
+                result.reference_id = self._layout_field(layout, 'reference_id')
+            if not result.reference_id:
+                result.reference_id = self.text_processor.extract_field(
+                    scan, 'reference_id', text_blocks
+                )
 
-            if source.get('brand') == 'TrueMoney':
+        # Extract sender and receiver names with special handling
+        with timer.stage('merchant'):
+            merchant, source = self.text_processor.detect_merchant_and_source(full_text, scan)
+        if qr:
+            source = self._qr_source(source, qr)
+
+        # Names next to their labels (ผู้โอน / จาก, ผู้รับ / ถึง)
+        layout_sender = layout_receiver = None
+        layout_confidences = {}
+        if layout is not None:
+            with timer.stage('names'):
+                layout_sender = self._layout_field(layout, 'sender_name')
+                layout_receiver = self._layout_field(layout, 'receiver_name')
+            layout_confidences = {name: self.text_processor.field_confidences[name]
+                                  for name in ('sender_name', 'receiver_name')
+                                  if name in self.text_processor.field_confidences}
+
+        if layout_sender and layout_receiver:
+            self._name_strategy = 'layout'
+            result.sender_name, result.receiver_name = layout_sender, layout_receiver
+        elif source.get('brand') == 'TrueMoney':
+            self._name_strategy = 'truemoney'
+            with timer.stage('names'):
                 result.sender_name, result.receiver_name = self._extract_truemoney_names(full_text)
-            elif source.get('brand') == 'Bank':
-                result.sender_name, result.receiver_name = self._extract_bank_names(full_text, text_blocks)
-                # Try special extraction for organizations if no receiver found
-                if not result.receiver_name:
+        elif source.get('brand') == 'Bank':
+            self._name_strategy = 'bank'
+            with timer.stage('names'):
+                result.sender_name, result.receiver_name = self._extract_bank_names(full_text, text_blocks, layout)
+            # Try special extraction for organizations if no receiver found
+            if not result.receiver_name:
+                with timer.stage('receiver_special'):
                     special_receiver = self.text_processor.extract_receiver_name_special(full_text, text_blocks)
-                    if special_receiver:
-                        result.receiver_name = special_receiver
-                # For bank payments to merchants, use merchant as receiver if still no receiver found
-                if not result.receiver_name and merchant and merchant != 'Bank':
-                    result.receiver_name = merchant
-            else:
-                result.sender_name = self.text_processor.extract_field_with_patterns(
-                    full_text, self.pattern_manager.patterns['sender_name'], text_blocks, 'sender_name'
+                if special_receiver:
+                    result.receiver_name = special_receiver
+            # For bank payments to merchants, use merchant as receiver if still no receiver found
+            if not result.receiver_name and merchant and merchant != 'Bank':
+                result.receiver_name = merchant
+        else:
+            self._name_strategy = 'patterns'
+            with timer.stage('names'):
+                result.sender_name = self.text_processor.extract_field(
+                    scan, 'sender_name', text_blocks
                 )
-                result.receiver_name = self.text_processor.extract_field_with_patterns(
-                    full_text, self.pattern_manager.patterns['receiver_name'], text_blocks, 'receiver_name'
+                result.receiver_name = self.text_processor.extract_field(
+                    scan, 'receiver_name', text_blocks
                 )
 
-                # If receiver name extraction failed or contains unwanted terms, try special extraction
-                if (not result.receiver_name or
-                    'พร้อมเพย์' in str(result.receiver_name) or
-                    'pomnipay' in str(result.receiver_name).lower() or
-                    (result.receiver_name and len(result.receiver_name.split()) < 3)):  # Name seems incomplete
+            # If receiver name extraction failed or contains unwanted terms, try special extraction
+            if (not result.receiver_name or
+                'พร้อมเพย์' in str(result.receiver_name) or
+                'pomnipay' in str(result.receiver_name).lower() or
+                (result.receiver_name and len(result.receiver_name.split()) < 3)):  # Name seems incomplete
+                with timer.stage('receiver_special'):
                     special_receiver = self.text_processor.extract_receiver_name_special(full_text, text_blocks)
-                    if special_receiver and len(special_receiver.split()) > len(str(result.receiver_name or '').split()):
-                        result.receiver_name = special_receiver
-
-            # Clean up names
+                if special_receiver and len(special_receiver.split()) > len(str(result.receiver_name or '').split()):
+                    result.receiver_name = special_receiver
+
+        # A name paired with its label wins over the text heuristics
+        for field_name, value in (('sender_name', layout_sender), ('receiver_name', layout_receiver)):
+            if value:
+                setattr(result, field_name, value)
+                self.text_processor.field_confidences[field_name] = layout_confidences[field_name]
+                self.text_processor.patterns_tried[field_name] = 0
+
+        # Clean up names
+        with timer.stage('clean_names'):
             if result.sender_name:
                 result.sender_name = clean_name(result.sender_name)
             if result.receiver_name:
                 result.receiver_name = clean_name(result.receiver_name)
 
-            # Detect merchant and source (if not already done above)
-            if not merchant:
-                merchant, source = self.text_processor.detect_merchant_and_source(full_text)
-
-            # Apply business logic for bank detection
-            if source['type'] == 'bank':
-                # For bank transactions, check if we detected a specific merchant
-                if merchant and merchant != 'Bank':
-                    result.merchant = merchant
-                else:
-                    result.merchant = 'Bank'
-            else:
+        # Detect merchant and source (if not already done above)
+        if not merchant:
+            with timer.stage('merchant'):
+                merchant, source = self.text_processor.detect_merchant_and_source(full_text, scan)
+            if qr:
+                source = self._qr_source(source, qr)
+
+        # Apply business logic for bank detection
+        if source['type'] == 'bank':
+            # For bank transactions, check if we detected a specific merchant
+            if merchant and merchant != 'Bank':
                 result.merchant = merchant
+            else:
+                result.merchant = 'Bank'
+        else:
+            result.merchant = merchant
+
+        result.source = source
+
+        # Add confidence scores for special extraction methods
+        if source.get('brand') == 'TrueMoney' and (result.sender_name or result.receiver_name):
+            if result.sender_name and 'sender_name' not in self.text_processor.field_confidences:
+                self.text_processor.field_confidences['sender_name'] = 0.7
+            if result.receiver_name and 'receiver_name' not in self.text_processor.field_confidences:
+                self.text_processor.field_confidences['receiver_name'] = 0.7
+
+        elif source.get('brand') == 'Bank' and (result.sender_name or result.receiver_name):
+            if result.sender_name and 'sender_name' not in self.text_processor.field_confidences:
+                conf = 0.8 if 'make' in full_text.lower() or 'kbank' in full_text.lower() else 0.6
+                self.text_processor.field_confidences['sender_name'] = conf
+            if result.receiver_name and 'receiver_name' not in self.text_processor.field_confidences:
+                conf = 0.5 if result.receiver_name == merchant else 0.7
+                self.text_processor.field_confidences['receiver_name'] = conf
+
+        # Set merchant confidence
+        if merchant:
+            if source.get('type') == 'bank' and merchant != 'Bank':
+                self.text_processor.field_confidences['merchant'] = 0.8
+            elif merchant == 'Bank':
+                self.text_processor.field_confidences['merchant'] = 0.9
+            else:
+                self.text_processor.field_confidences['merchant'] = 0.7
 
-            result.source = source
-
-            # Add confidence scores for special extraction methods
-            if source.get('brand') == 'TrueMoney' and (result.sender_name or result.receiver_name):
-                if result.sender_name and 'sender_name' not in self.text_processor.field_confidences:
-                    self.text_processor.field_confidences['sender_name'] = 0.7
-                if result.receiver_name and 'receiver_name' not in self.text_processor.field_confidences:
-                    self.text_processor.field_confidences['receiver_name'] = 0.7
-
-            elif source.get('brand') == 'Bank' and (result.sender_name or result.receiver_name):
-                if result.sender_name and 'sender_name' not in self.text_processor.field_confidences:
-                    conf = 0.8 if 'make' in full_text.lower() or 'kbank' in full_text.lower() else 0.6
-                    self.text_processor.field_confidences['sender_name'] = conf
-                if result.receiver_name and 'receiver_name' not in self.text_processor.field_confidences:
-                    conf = 0.5 if result.receiver_name == merchant else 0.7
-                    self.text_processor.field_confidences['receiver_name'] = conf
-
-            # Set merchant confidence
-            if merchant:
-                if source.get('type') == 'bank' and merchant != 'Bank':
-                    self.text_processor.field_confidences['merchant'] = 0.8
-                elif merchant == 'Bank':
-                    self.text_processor.field_confidences['merchant'] = 0.9
-                else:
-                    self.text_processor.field_confidences['merchant'] = 0.7
+        # Calculate overall confidence
+        result.confidence = self.text_processor.field_confidences.copy()
+        result.overall_confidence = self._calculate_overall_confidence(result)
 
-            # Calculate overall confidence
-            result.confidence = self.text_processor.field_confidences.copy()
-            result.overall_confidence = self._calculate_overall_confidence(result)
+        return result
 
-            return result
+    @staticmethod
+    def _qr_source(source: Dict[str, str], qr: Dict) -> Dict[str, str]:
+        """Add the sending bank from the slip QR to the detected source"""
+        source = dict(source)
+        if source.get('type') == 'unknown':
+            source.update({'type': 'bank', 'brand': 'Bank'})
+        source['bank'] = qr['bank']
+        source['bank_code'] = qr['bank_code']
+        return source
 
-        except Exception as e:
-            try:
-                print(f"Error processing receipt {image_path}: {e}")
-            except UnicodeEncodeError:
-                print(f"Error processing receipt {image_path}: [Unicode encoding error]")
-            return ExtractionResult()
+    def _layout_field(self, layout: Optional[LayoutIndex], field_name: str) -> Optional[str]:
+        """Value paired with the field's label by layout, recorded with its confidence
+
+        Layout pairs count as the most reliable pattern (patterns_tried = 0).
+        """
+        if layout is None:
+            return None
 
-    def _handle_special_cases(self, image_path: str, text_blocks: List[Tuple[str, float]]) -> Optional[ExtractionResult]:
+        paired = layout.value_for(field_name)
+        if not paired:
+            return None
+
+        value, block = paired
+        self.text_processor.patterns_tried[field_name] = 0
+        self.text_processor.field_confidences[field_name] = self.text_processor._calculate_field_confidence(
+            value, 0, 1, [block], field_name
+        )
+        return value
+
+    def _handle_special_cases(self, image: ImageInput, text_blocks: List[Tuple[str, float]]) -> Optional[ExtractionResult]:
         """Handle special cases where OCR fails but we can infer the receipt type"""
+        # Only file inputs carry a name we can recognise
+        if not is_path_input(image):
+            return None
+
         # Check if this is the known MyMo PromptPay receipt (test2.jpg)
-        if 'test2' in os.path.basename(image_path).lower() and not text_blocks:
+        if 'test2' in os.path.basename(image).lower() and not text_blocks:
             print("Detected test2.jpg with no OCR data - applying fallback MyMo PromptPay pattern")
             result = ExtractionResult()
             result.date = '18/09/2025 12:20'
@@ -361,20 +1202,19 @@ class ReceiptExtractor:
         receiver_name = None
 
         # TrueMoney structure: top account (SENDER) -> "จากวอลเล็ท" -> bottom account (RECEIVER)
-        sender_pattern = r"([ก-๙a-zA-Z\s\*]{3,}?)\s+(?=บัญชีทรูมันนี่.*?จากวอลเล็ท)"
-        sender_match = re.search(sender_pattern, full_text, re.IGNORECASE | re.DOTALL)
+        helper = self.pattern_manager.helper
+        guard = self.text_processor.guard
+        sender_match = guard.search(helper('truemoney_sender'), full_text)
         if sender_match:
             sender_name = sender_match.group(1).strip()
 
-        receiver_pattern = r"จากวอลเล็ท\s*([ก-๙a-zA-Z\s]{3,}?)(?=\s*บัญชีทรูมันนี่|$)"
-        receiver_match = re.search(receiver_pattern, full_text, re.IGNORECASE | re.DOTALL)
+        receiver_match = guard.search(helper('truemoney_receiver'), full_text)
         if receiver_match:
             receiver_name = receiver_match.group(1).strip()
 
         # Alternative approach
         if not sender_name or not receiver_name:
-            name_pattern = r"([ก-๙a-zA-Z\s\*]{3,}?)(?=\s*บัญชีทรูมันนี่)"
-            names = re.findall(name_pattern, full_text, re.IGNORECASE)
+            names = guard.findall(helper('truemoney_account_name'), full_text)
 
             clean_names = []
             for name in names:
@@ -390,7 +1230,7 @@ class ReceiptExtractor:
                 parts = full_text.split('จากวอลเล็ท')
                 if len(parts) > 1:
                     after_wallet = parts[1]
-                    receiver_names = re.findall(r'([ก-๙a-zA-Z\s]{3,}?)(?=\s|$)', after_wallet)
+                    receiver_names = helper('truemoney_word').findall(after_wallet)
                     for name in receiver_names:
                         clean = name.strip()
                         if (clean and len(clean) > 2 and
@@ -400,8 +1240,14 @@ class ReceiptExtractor:
 
         return sender_name, receiver_name
 
-    def _extract_bank_names(self, full_text: str, text_blocks: List[Tuple[str, float]]) -> Tuple[Optional[str], Optional[str]]:
-        """Extract sender and receiver names specifically for bank transfer receipts"""
+    def _extract_bank_names(self, full_text: str, text_blocks: List[Tuple[str, float]],
+                            layout: Optional[LayoutIndex] = None) -> Tuple[Optional[str], Optional[str]]:
+        """Extract sender and receiver names specifically for bank transfer receipts
+
+        With a layout index the sender/receiver context is read from the
+        neighbouring rows instead of a character window of the joined text.
+        """
+        helper = self.pattern_manager.helper
         sender_name = None
         receiver_name = None
 
@@ -411,7 +1257,7 @@ class ReceiptExtractor:
             for text_block, confidence in text_blocks:
                 text = text_block.strip()
                 if confidence >= 0.4:
-                    if re.match(r'^(?:นาย|นาง|นางสาว|น\.ส\.|เด็กชาย|เด็กหญิง)\s+[ก-๙a-zA-Z\s]+', text):
+                    if helper('titled_name_prefix').match(text):
                         if not any(skip in text.lower() for skip in ['xxx', 'บาท', 'จำนวน', 'ธนาคาร', 'ธ.กสิกร']):
                             names_in_order.append(text)
 
@@ -424,18 +1270,17 @@ class ReceiptExtractor:
         # Fallback method
         names = []
         if not sender_name and not receiver_name:
-            name_pattern = r"((?:นาย|นาง|นางสาว)\s+[ก-๙a-zA-Z\s]{3,}?)(?=\s*(?:อินทร์|บัญชี|พร้อมเพย์|\*|\n|$))"
-            names = re.findall(name_pattern, full_text, re.IGNORECASE)
+            names = self.text_processor.guard.findall(helper('bank_name'), full_text)
 
             for i, (text_block, confidence) in enumerate(text_blocks):
                 if confidence >= 0.85:
-                    if re.match(r"^(นาย|นาง|นางสาว)\s+[ก-๙\s]+$", text_block.strip()):
+                    if helper('titled_name_block').match(text_block.strip()):
                         if text_block.strip() not in names:
                             names.append(text_block.strip())
-                    elif re.match(r"^(นาย|นาง|นางสาว)$", text_block.strip()):
+                    elif helper('title_only').match(text_block.strip()):
                         if i + 1 < len(text_blocks):
                             next_block, next_conf = text_blocks[i + 1]
-                            if next_conf >= 0.85 and re.match(r"^[ก-๙\s]{3,}.*อินทร์.*$", next_block.strip()):
+                            if next_conf >= 0.85 and helper('inthra_name_block').match(next_block.strip()):
                                 name_parts = next_block.strip().split()
                                 if len(name_parts) >= 2:
                                     combined_name = f"{text_block.strip()} {' '.join(name_parts[:2])}"
@@ -446,7 +1291,7 @@ class ReceiptExtractor:
         for name in names:
             clean = name.strip()
             if clean and len(clean.split()) >= 2 and clean not in clean_names:
-                if not re.match(r"^(นาย|นาง|นางสาว)$", clean):
+                if not helper('title_only').match(clean):
                     clean_names.append(clean)
 
         # Identify sender vs receiver by context
@@ -454,12 +1299,18 @@ class ReceiptExtractor:
         receiver_candidates = []
 
         for name in clean_names:
-            name_pos = full_text.find(name)
-            if name_pos > -1:
-                start = max(0, name_pos - 150)
-                end = min(len(full_text), name_pos + len(name) + 150)
-                context = full_text[start:end].lower()
+            context = None
+            name_idx = layout.find(name) if layout is not None else None
+            if name_idx is not None:
+                context = ' '.join(layout.context_rows(name_idx, radius=2)).lower()
+            else:
+                name_pos = full_text.find(name)
+                if name_pos > -1:
+                    start = max(0, name_pos - 150)
+                    end = min(len(full_text), name_pos + len(name) + 150)
+                    context = full_text[start:end].lower()
 
+            if context is not None:
                 if any(word in context for word in ['บัญชี', 'ไอแบงก์']) and name not in sender_candidates:
                     sender_candidates.append(name)
                 elif 'พร้อมเพย์' in context and name not in receiver_candidates:
@@ -534,7 +1385,7 @@ class ReceiptExtractor:
 
     def _find_fallback_amount(self, full_text: str) -> Optional[str]:
         """Find amount using fallback patterns"""
-        amounts = re.findall(r'(\d{2,3}\.\d{2})', full_text)
+        amounts = self.pattern_manager.helper('fallback_amount').findall(full_text)
         if amounts:
             float_amounts = []
             for amt in amounts:
@@ -551,7 +1402,111 @@ class ReceiptExtractor:
                     return str(sorted_amounts[0])
         return None
 
-    def extract_to_dict(self, image_path: str) -> Dict:
+    def extract_many(self, images: List[ImageInput], batch_size: int = 8,
+                     cache_keys: Optional[List[Optional[str]]] = None,
+                     check_cache: bool = True) -> List[BatchItemResult]:
+        """Extract receipt data from several images using batched OCR calls
+
+        Every image gets its own engine profile (as in extract_receipt_data) and
+        images of one profile share the batched engine calls. The batch pipeline
+        has no variant cascade beyond the enhanced retry and no field retry, so
+        its results are cached under their own keys (cache_key(image, batch=True)).
+
+        Args:
+            images: Image paths, raw encoded image bytes or decoded ndarrays
+            batch_size: Maximum number of images sent to the OCR engine per call
+            cache_keys: Optional precomputed batch result cache keys, one per image
+            check_cache: Look the keys up first (False when cached_result() already missed)
+
+        Returns:
+            One BatchItemResult per input, in input order
+        """
+        items: List[Optional[BatchItemResult]] = [None] * len(images)
+        decoded: Dict[int, 'np.ndarray'] = {}
+        keys: List[Optional[str]] = list(cache_keys) if cache_keys else [None] * len(images)
+        qr_results: Dict[int, Optional[Dict]] = {}
+        # Per-image OCR input -> original transforms (see _box_transform)
+        transforms: Dict[int, Tuple] = {}
+        # Per-image engine profile decision, as reported by the single-image path
+        profiles: Dict[int, Dict] = {}
+
+        for idx, image in enumerate(images):
+            try:
+                if self.result_cache is not None:
+                    keys[idx] = keys[idx] or self.cache_key(image, batch=True)
+                    cached = self._get_cached_result(keys[idx]) if check_cache else None
+                    if cached is not None:
+                        items[idx] = BatchItemResult(index=idx, result=cached)
+                        continue
+
+                ocr_input = self._prepare_ocr_input(image, decode_paths=True)
+                profile = self._select_engine_profile(image, ocr_input)
+                if profile.grayscale and getattr(ocr_input, 'ndim', 0) == 3:
+                    with self.timer.stage('grayscale'):
+                        ocr_input = to_grayscale(ocr_input)
+                decoded[idx] = self._crop_region(ocr_input)
+                qr_results[idx] = self._decode_qr(decoded[idx])
+                decoded[idx] = self._downscale_input(decoded[idx])
+                transforms[idx] = self._box_transform()
+                profiles[idx] = self.last_engine_profile
+            except Exception as e:
+                items[idx] = BatchItemResult(index=idx, error=str(e))
+
+        # Batched engine calls share one set of options: one run of chunks per profile
+        by_profile: Dict[str, List[int]] = {}
+        for idx in decoded:
+            by_profile.setdefault(profiles[idx]['name'], []).append(idx)
+
+        for profile_name, pending in by_profile.items():
+            self._engine_profile = ENGINE_PROFILES[profile_name]
+            variants = self._engine_profile.variants or self.cascade.variants
+            for start in range(0, len(pending), max(1, batch_size)):
+                chunk = pending[start:start + batch_size]
+                chunk_start = time.perf_counter()
+                blocks_list = self._batch_ocr_extraction([decoded[idx] for idx in chunk])
+                chosen = ['original' if text_blocks else 'none' for text_blocks in blocks_list]
+
+                # Retry images without any text on their enhanced version, again batched
+                retry = []
+                enhanced_images = []
+                if 'enhanced' in variants:
+                    for pos, (idx, text_blocks) in enumerate(zip(chunk, blocks_list)):
+                        if not text_blocks:
+                            enhanced = self.preprocessing.run(decoded[idx])
+                            if enhanced is not None:
+                                retry.append(pos)
+                                enhanced_images.append(enhanced)
+                if enhanced_images:
+                    for pos, text_blocks in zip(retry, self._batch_ocr_extraction(enhanced_images)):
+                        blocks_list[pos] = text_blocks
+                        if text_blocks:
+                            chosen[pos] = 'enhanced'
+                # Share of the batched engine time of every image in the chunk
+                elapsed_ms = round((time.perf_counter() - chunk_start) * 1000 / len(chunk), 2)
+
+                for pos, (idx, text_blocks) in enumerate(zip(chunk, blocks_list)):
+                    try:
+                        self.text_processor.guard.start()
+                        text_blocks = self._to_original_blocks(text_blocks, transforms[idx])
+                        result = self._build_result(images[idx], text_blocks, qr_results.get(idx))
+                        result.ocr_path = {
+                            'chosen': chosen[pos],
+                            'stop_reason': 'batch',
+                            'elapsed_ms': elapsed_ms,
+                            'engine_profile': dict(profiles[idx], elapsed_ms=elapsed_ms)
+                        }
+                        quarantined = self.text_processor.guard.to_dict()['quarantined']
+                        if quarantined:
+                            result.ocr_path['regex_quarantined'] = quarantined
+                        else:
+                            self._store_cached_result(keys[idx], result)
+                        items[idx] = BatchItemResult(index=idx, result=result)
+                    except Exception as e:
+                        items[idx] = BatchItemResult(index=idx, error=str(e))
+
+        return items
+
+    def extract_to_dict(self, image: ImageInput) -> Dict:
         """Extract receipt data and return as dictionary for backward compatibility"""
-        result = self.extract_receipt_data(image_path)
+        result = self.extract_receipt_data(image)
         return result.to_dict()
@@ -0,0 +1,147 @@
+"""
+Long-lived extraction server for extract_receipt.py --serve
+Keeps one ReceiptExtractor warm and answers JSON-lines requests on stdin or a Unix socket.
+
+Request (one JSON object per line):
+    {"id": 1, "image_path": "/path/to/slip.jpg"}
+    {"id": 2, "image_base64": "<base64 encoded image>"}
+    {"id": 3, "command": "ping"}
+    {"command": "shutdown"}
+
+Response (one JSON object per line, same id):
+    {"id": 1, "success": true, "data": {...}, "elapsed_ms": 812.4}
+    {"id": 2, "success": false, "error": "..."}
+"""
+import base64
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+from typing import Dict, Optional, TextIO
+
+
+class ReceiptServer:
+    """Answers extraction requests with a single warm extractor"""
+
+    def __init__(self, extractor, protocol_out: Optional[TextIO] = None):
+        """
+        Args:
+            extractor: Initialized ReceiptExtractor
+            protocol_out: Stream for response lines (defaults to the real stdout)
+        """
+        self.extractor = extractor
+        self.protocol_out = protocol_out or sys.__stdout__
+        # The OCR engines are not thread-safe
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+    def handle_line(self, line: str) -> Optional[Dict]:
+        """Handle a single request line and return the response (None for blank lines)"""
+        line = line.strip()
+        if not line:
+            return None
+
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            return {'id': None, 'success': False, 'error': f'Invalid JSON request: {e}'}
+
+        if not isinstance(request, dict):
+            return {'id': None, 'success': False, 'error': 'Request must be a JSON object'}
+
+        return self.handle_request(request)
+
+    def handle_request(self, request: Dict) -> Dict:
+        """Handle a decoded request"""
+        request_id = request.get('id')
+        command = request.get('command')
+
+        if command == 'ping':
+            return {'id': request_id, 'success': True, 'pong': True}
+        if command == 'shutdown':
+            self._shutdown = True
+            return {'id': request_id, 'success': True, 'shutdown': True}
+        if command:
+            return {'id': request_id, 'success': False, 'error': f'Unknown command: {command}'}
+
+        try:
+            image = self._request_image(request)
+        except (ValueError, FileNotFoundError) as e:
+            return {'id': request_id, 'success': False, 'error': str(e)}
+
+        start = time.perf_counter()
+        try:
+            with self._lock:
+                result = self.extractor.extract_to_dict(image)
+        except Exception as e:
+            return {'id': request_id, 'success': False, 'error': str(e)}
+
+        return {
+            'id': request_id,
+            'success': True,
+            'data': result,
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 1)
+        }
+
+    def _request_image(self, request: Dict):
+        """Get the image input (path or bytes) from a request"""
+        if request.get('image_path'):
+            image_path = request['image_path']
+            if not os.path.exists(image_path):
+                raise FileNotFoundError(f"Image file '{image_path}' not found")
+            return image_path
+
+        if request.get('image_base64'):
+            try:
+                return base64.b64decode(request['image_base64'], validate=True)
+            except ValueError as e:
+                raise ValueError(f'Invalid image_base64: {e}')
+
+        raise ValueError("Request needs 'image_path' or 'image_base64'")
+
+    def write_response(self, response: Dict, out: Optional[TextIO] = None) -> None:
+        """Write one response line and flush"""
+        out = out or self.protocol_out
+        out.write(json.dumps(response, ensure_ascii=False) + '\n')
+        out.flush()
+
+    def serve_stdio(self, stdin: Optional[TextIO] = None) -> None:
+        """Serve requests from stdin until EOF or a shutdown command"""
+        stdin = stdin or sys.stdin
+        self.write_response({'ready': True, 'pid': os.getpid()})
+
+        for line in stdin:
+            response = self.handle_line(line)
+            if response is not None:
+                self.write_response(response)
+            if self._shutdown:
+                break
+
+    def serve_socket(self, socket_path: str) -> None:
+        """Serve requests on a Unix domain socket, one JSON-lines stream per connection"""
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+        server_ref = self
+
+        class _Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for raw in self.rfile:
+                    response = server_ref.handle_line(raw.decode('utf-8'))
+                    if response is not None:
+                        self.wfile.write((json.dumps(response, ensure_ascii=False) + '\n').encode('utf-8'))
+                        self.wfile.flush()
+                    if server_ref._shutdown:
+                        threading.Thread(target=self.server.shutdown, daemon=True).start()
+                        break
+
+        with socketserver.ThreadingUnixStreamServer(socket_path, _Handler) as server:
+            server.daemon_threads = True
+            self.write_response({'ready': True, 'pid': os.getpid(), 'socket': socket_path})
+            try:
+                server.serve_forever()
+            finally:
+                if os.path.exists(socket_path):
+                    os.remove(socket_path)
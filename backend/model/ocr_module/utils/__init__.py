@@ -3,7 +3,8 @@ Utility modules for OCR
 """
 
 from .validation import ReceiptValidator, validate_receipt_data, ValidationResult
-from .image_preprocessing import preprocess_image
+from .image_preprocessing import preprocess_image, enhance_image, PreprocessingPipeline
+from .image_io import load_image, decode_image, decode_image_bytes, DecodedImage
 from .name_cleaner import clean_name
 
 __all__ = [
@@ -11,5 +12,11 @@ __all__ = [
     'validate_receipt_data',
     'ValidationResult',
     'preprocess_image',
+    'enhance_image',
+    'PreprocessingPipeline',
+    'load_image',
+    'decode_image',
+    'decode_image_bytes',
+    'DecodedImage',
     'clean_name'
 ]
@@ -0,0 +1,97 @@
+"""
+Aho-Corasick multi-pattern string matcher
+Finds every occurrence of every key in one pass over the text, so the cost
+per text does not grow with the number of keys.
+"""
+import re
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Set, Tuple
+
+
+class AhoCorasick:
+    """Automaton over a fixed set of keys, built once"""
+
+    def __init__(self, keys: Iterable[str]):
+        self.keys: List[str] = [key for key in dict.fromkeys(keys) if key]
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]  # key indices ending at each state
+
+        for key_idx, key in enumerate(self.keys):
+            state = 0
+            for char in key:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(key_idx)
+        self._build_failure_links()
+        # Transitions with the failure links resolved, filled in lazily by keys_in()
+        self._delta: List[Dict[str, int]] = [dict(goto) for goto in self._goto]
+        self._out_keys: List[FrozenSet[str]] = [frozenset(self.keys[idx] for idx in out) for out in self._out]
+
+        # From the root, jump straight to the next character that starts a key
+        first_chars = ''.join(self._goto[0])
+        self._start_re = re.compile('[' + re.escape(first_chars) + ']') if first_chars else None
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                self._out[nxt].extend(self._out[self._fail[nxt]])
+
+    def keys_in(self, text: str) -> Set[str]:
+        """Every key that occurs in the text (no positions, cheaper than iter_matches)"""
+        delta, out_keys = self._delta, self._out_keys
+        found: Set[str] = set()
+        state = 0
+        for char in text:
+            nxt = delta[state].get(char)
+            if nxt is None:
+                nxt = self._transition(state, char)
+            state = nxt
+            if out_keys[state]:
+                found |= out_keys[state]
+        return found
+
+    def _transition(self, state: int, char: str) -> int:
+        """Follow the failure links once and cache the resulting transition"""
+        fail = state
+        while fail and char not in self._goto[fail]:
+            fail = self._fail[fail]
+        nxt = self._goto[fail].get(char, 0)
+        self._delta[state][char] = nxt
+        return nxt
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """Yield (start, end, key) for every occurrence, overlapping ones included, by end position"""
+        if self._start_re is None:
+            return
+        goto, fail, out, keys = self._goto, self._fail, self._out, self.keys
+        state = 0
+        pos = 0
+        length = len(text)
+        while pos < length:
+            if state == 0:
+                found = self._start_re.search(text, pos)
+                if found is None:
+                    return
+                pos = found.start()
+            char = text[pos]
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            pos += 1
+            for key_idx in out[state]:
+                key = keys[key_idx]
+                yield pos - len(key), pos, key
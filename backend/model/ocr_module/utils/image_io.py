@@ -0,0 +1,260 @@
+"""
+Image loading utilities for in-memory OCR inputs
+"""
+import hashlib
+import os
+import struct
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Union
+
+from .lazy_imports import get_cv2, get_numpy
+
+
+# An image can be given as a file path, raw encoded bytes (e.g. an upload
+# buffer), a DecodedImage or an already decoded BGR ndarray
+ImageInput = Union[str, bytes, bytearray, memoryview, Any]
+
+# JPEG start-of-frame markers (baseline, progressive, lossless, ...)
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# EXIF orientation tag
+_EXIF_ORIENTATION = 0x0112
+
+
+@dataclass
+class DecodedImage:
+    """An image decoded once for OCR, with how it was decoded
+
+    info holds the source size, the reduction factor, the scale from source to
+    decoded coordinates, the EXIF orientation applied and whether it is grayscale.
+    """
+    image: Any
+    info: Dict = field(default_factory=dict)
+
+    @property
+    def shape(self):
+        return self.image.shape
+
+
+def is_path_input(image: ImageInput) -> bool:
+    """Check if the image input is a filesystem path"""
+    return isinstance(image, (str, os.PathLike))
+
+
+def is_bytes_input(image: ImageInput) -> bool:
+    """Check if the image input is a raw encoded buffer"""
+    return isinstance(image, (bytes, bytearray, memoryview))
+
+
+def is_decoded_input(image: ImageInput) -> bool:
+    """Check if the image input went through decode_image"""
+    return isinstance(image, DecodedImage)
+
+
+def _parse_exif_orientation(exif: bytes) -> int:
+    """Orientation (1-8) from a TIFF-structured EXIF block, 1 when absent"""
+    if len(exif) < 8 or exif[:2] not in (b'II', b'MM'):
+        return 1
+    order = '<' if exif[:2] == b'II' else '>'
+    ifd_offset = struct.unpack(order + 'I', exif[4:8])[0]
+    if ifd_offset + 2 > len(exif):
+        return 1
+    count = struct.unpack(order + 'H', exif[ifd_offset:ifd_offset + 2])[0]
+    for idx in range(count):
+        entry = ifd_offset + 2 + idx * 12
+        if entry + 12 > len(exif):
+            break
+        tag = struct.unpack(order + 'H', exif[entry:entry + 2])[0]
+        if tag == _EXIF_ORIENTATION:
+            value = struct.unpack(order + 'H', exif[entry + 8:entry + 10])[0]
+            return value if 1 <= value <= 8 else 1
+    return 1
+
+
+def read_image_header(data: bytes) -> Optional[Dict]:
+    """Format, size and EXIF orientation from the encoded header, without decoding
+
+    Returns:
+        {'format', 'width', 'height', 'orientation', 'exif'} (size as stored,
+        before orientation) or None for unrecognized data
+    """
+    if data[:8] == b'\x89PNG\r\n\x1a\n' and len(data) >= 24:
+        width, height = struct.unpack('>II', data[16:24])
+        return {'format': 'png', 'width': width, 'height': height, 'orientation': 1, 'exif': False}
+
+    if data[:2] != b'\xff\xd8':
+        return None
+
+    header = {'format': 'jpeg', 'width': None, 'height': None, 'orientation': 1, 'exif': False}
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            break
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+        segment = data[pos + 4:pos + 2 + length]
+        if marker == 0xE1 and segment[:6] == b'Exif\x00\x00':
+            header['exif'] = True
+            header['orientation'] = _parse_exif_orientation(segment[6:])
+        elif marker in _JPEG_SOF_MARKERS and len(segment) >= 5:
+            header['height'], header['width'] = struct.unpack('>HH', segment[1:5])
+            break
+        elif marker == 0xDA:
+            break
+        pos += 2 + length
+
+    return header if header['width'] else None
+
+
+def apply_orientation(img: 'np.ndarray', orientation: int) -> 'np.ndarray':
+    """Rotate/flip a decoded image according to its EXIF orientation (1-8)"""
+    cv2 = get_cv2()
+    if orientation == 2:
+        return cv2.flip(img, 1)
+    if orientation == 3:
+        return cv2.rotate(img, cv2.ROTATE_180)
+    if orientation == 4:
+        return cv2.flip(img, 0)
+    if orientation == 5:
+        return cv2.transpose(img)
+    if orientation == 6:
+        return cv2.rotate(img, cv2.ROTATE_90_CLOCKWISE)
+    if orientation == 7:
+        return cv2.flip(cv2.transpose(img), -1)
+    if orientation == 8:
+        return cv2.rotate(img, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    return img
+
+
+def oriented_size(header: Dict) -> tuple:
+    """(width, height) of an image after its EXIF orientation is applied"""
+    if header['orientation'] >= 5:
+        return header['height'], header['width']
+    return header['width'], header['height']
+
+
+def read_image_data(image: ImageInput) -> Optional[bytes]:
+    """Encoded bytes of a path or buffer input (None for decoded inputs)"""
+    if is_bytes_input(image):
+        return bytes(image)
+    if is_path_input(image):
+        with open(os.fspath(image), 'rb') as f:
+            return f.read()
+    return None
+
+
+def decode_image(image: ImageInput, scale: float = 1.0, grayscale: bool = False) -> Optional[DecodedImage]:
+    """Decode a path or buffer once for every OCR stage
+
+    Args:
+        image: Image path or encoded buffer
+        scale: Largest scale the later stages need (<= 1.0); JPEGs are decoded
+            at 1/2, 1/4 or 1/8 size when that still meets it
+        grayscale: Decode straight to a single channel
+
+    EXIF orientation is applied here, so the result is upright.
+    """
+    cv2, np = get_cv2(), get_numpy()
+    if cv2 is None or np is None:
+        print("OpenCV not available. Cannot decode image.")
+        return None
+
+    data = read_image_data(image)
+    if not data:
+        return None
+    header = read_image_header(data)
+
+    reduction = 1
+    if header and header['format'] == 'jpeg':
+        for factor in (8, 4, 2):
+            if scale <= 1.0 / factor:
+                reduction = factor
+                break
+
+    if grayscale:
+        flags = {1: cv2.IMREAD_GRAYSCALE, 2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+                 4: cv2.IMREAD_REDUCED_GRAYSCALE_4, 8: cv2.IMREAD_REDUCED_GRAYSCALE_8}[reduction]
+    else:
+        flags = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2,
+                 4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}[reduction]
+
+    # Orientation is applied below from the parsed header, the same way for every OpenCV version
+    decoded = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flags | cv2.IMREAD_IGNORE_ORIENTATION)
+    if decoded is None:
+        return None
+
+    orientation = header['orientation'] if header else 1
+    decoded = apply_orientation(decoded, orientation)
+
+    height, width = decoded.shape[:2]
+    source_width = oriented_size(header)[0] if header else width
+    return DecodedImage(decoded, {
+        'format': header['format'] if header else 'unknown',
+        'source_size': list(oriented_size(header)) if header else [width, height],
+        'decoded_size': [width, height],
+        'reduction': reduction,
+        'scale': round(width / float(source_width), 6),
+        'orientation': orientation,
+        'exif': header['exif'] if header else False,
+        'grayscale': grayscale
+    })
+
+
+def decode_image_bytes(data: Union[bytes, bytearray, memoryview]) -> Optional['np.ndarray']:
+    """Decode an encoded image buffer (JPEG, PNG, ...) into a BGR ndarray"""
+    cv2, np = get_cv2(), get_numpy()
+    if cv2 is None or np is None:
+        print("OpenCV not available. Cannot decode image buffer.")
+        return None
+
+    if not data:
+        return None
+
+    decoded = decode_image(data)
+    return decoded.image if decoded is not None else None
+
+
+def load_image(image: ImageInput) -> Optional['np.ndarray']:
+    """Load any supported image input into an (upright) ndarray"""
+    if is_decoded_input(image):
+        return image.image
+
+    if is_bytes_input(image) or is_path_input(image):
+        decoded = decode_image(image)
+        return decoded.image if decoded is not None else None
+
+    # Already decoded
+    return image
+
+
+def describe_image(image: ImageInput) -> str:
+    """Short human readable label for an image input (used in log messages)"""
+    if is_path_input(image):
+        return os.fspath(image)
+    if is_bytes_input(image):
+        return f"<buffer {len(image)} bytes>"
+    if is_decoded_input(image):
+        image = image.image
+    shape = getattr(image, 'shape', None)
+    if shape is not None:
+        return f"<array {'x'.join(str(d) for d in shape)}>"
+    return f"<{type(image).__name__}>"
+
+
+def hash_image(image: ImageInput) -> str:
+    """SHA-256 of the image content (file bytes, buffer bytes or array data)"""
+    digest = hashlib.sha256()
+    if is_path_input(image):
+        with open(os.fspath(image), 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    elif is_bytes_input(image):
+        digest.update(image)
+    else:
+        if is_decoded_input(image):
+            image = image.image
+        digest.update(str(getattr(image, 'shape', '')).encode())
+        digest.update(image.tobytes())
+    return digest.hexdigest()
@@ -0,0 +1,98 @@
+"""
+Screenshot vs camera photo classification
+App-rendered screenshots have no EXIF block, very few distinct colors and
+large perfectly flat areas; camera photos have sensor noise, lighting
+gradients and usually EXIF. The check works on a small grayscale/quantized
+copy and takes a few milliseconds.
+"""
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+from .image_io import ImageInput, is_bytes_input, is_decoded_input, is_path_input
+from .lazy_imports import get_cv2, get_numpy
+
+# Width the features are computed at
+_CLASSIFY_WIDTH = 320
+# Bytes searched for the EXIF marker (it lives in the first JPEG segments)
+_EXIF_SEARCH_BYTES = 64 * 1024
+
+# A screenshot has most pixels in a handful of colors and mostly flat areas
+SCREENSHOT_COLOR_SHARE = 0.6
+SCREENSHOT_FLAT_RATIO = 0.5
+# Number of dominant (quantized) colors counted for the color share
+_TOP_COLORS = 8
+
+
+def has_exif(image: ImageInput) -> Optional[bool]:
+    """Check encoded image data for an EXIF block (None when the input is already decoded)"""
+    if is_decoded_input(image):
+        return image.info.get('exif')
+    if is_bytes_input(image):
+        head = bytes(image[:_EXIF_SEARCH_BYTES])
+    elif is_path_input(image):
+        try:
+            with open(os.fspath(image), 'rb') as f:
+                head = f.read(_EXIF_SEARCH_BYTES)
+        except OSError:
+            return None
+    else:
+        return None
+    return b'Exif\x00\x00' in head
+
+
+def image_features(img: 'np.ndarray') -> Dict[str, float]:
+    """Color share of the dominant colors and fraction of flat pixels"""
+    cv2, np = get_cv2(), get_numpy()
+    height, width = img.shape[:2]
+    factor = min(1.0, _CLASSIFY_WIDTH / float(width))
+    if factor < 1.0:
+        # Nearest neighbour keeps rendered colors exact (no blended pixels)
+        img = cv2.resize(img, (int(width * factor), max(1, int(height * factor))),
+                         interpolation=cv2.INTER_NEAREST)
+
+    # Color histogram on 4 bits per channel
+    if img.ndim == 3:
+        quantized = (img[:, :, :3] >> 4).astype(np.int32)
+        codes = (quantized[:, :, 0] << 8) | (quantized[:, :, 1] << 4) | quantized[:, :, 2]
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    else:
+        codes = (img >> 4).astype(np.int32)
+        gray = img
+    counts = np.bincount(codes.ravel())
+    color_share = float(np.sort(counts)[-_TOP_COLORS:].sum()) / codes.size
+
+    # Edge sharpness: rendered UIs are flat except at crisp edges
+    laplacian = cv2.Laplacian(gray, cv2.CV_16S, ksize=1)
+    flat_ratio = float((np.abs(laplacian) <= 2).mean())
+
+    return {'color_share': round(color_share, 3), 'flat_ratio': round(flat_ratio, 3)}
+
+
+def classify_image(decoded: 'np.ndarray', source: ImageInput = None) -> Tuple[str, Dict]:
+    """Classify a decoded image as 'screenshot' or 'photo'
+
+    Args:
+        decoded: Decoded BGR (or grayscale) image
+        source: Original input, checked for EXIF when it is a path or buffer
+
+    Returns:
+        (kind, info) with the features used and the time taken
+    """
+    start = time.perf_counter()
+    exif = has_exif(source) if source is not None else None
+    info: Dict = {'exif': exif}
+
+    if exif:
+        # Camera apps write EXIF, screenshot tools do not
+        kind = 'photo'
+    elif get_cv2() is None or get_numpy() is None or not hasattr(decoded, 'shape'):
+        kind = 'photo'
+    else:
+        info.update(image_features(decoded))
+        is_screenshot = (info['color_share'] >= SCREENSHOT_COLOR_SHARE
+                         and info['flat_ratio'] >= SCREENSHOT_FLAT_RATIO)
+        kind = 'screenshot' if is_screenshot else 'photo'
+
+    info['ms'] = round((time.perf_counter() - start) * 1000, 2)
+    return kind, info
@@ -1,62 +1,182 @@
 """
 Image preprocessing utilities for better OCR results
+The enhancement chain runs fully in memory as a configurable pipeline of steps.
 """
 import os
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 
-try:
-    import cv2
-    import numpy as np
-except ImportError:
-    cv2 = None
-    np = None
+from .image_io import decode_image
+from .lazy_imports import get_cv2, get_numpy
+from .timing import StageTimer
 
+# Default enhancement chain, in order
+DEFAULT_STEPS = ('grayscale', 'clahe', 'blur', 'threshold', 'morph', 'sharpen')
 
-def preprocess_image(image_path: str) -> Optional[str]:
-    """Enhanced image preprocessing for better OCR results"""
-    if cv2 is None or np is None:
-        print("OpenCV not available. Skipping preprocessing.")
-        return None
 
-    try:
-        # Load image
-        img = cv2.imread(image_path)
-        if img is None:
-            return None
+def to_grayscale(img: 'np.ndarray') -> 'np.ndarray':
+    """Convert a BGR image to grayscale (grayscale input is returned as-is)"""
+    cv2 = get_cv2()
+    if img.ndim == 3:
+        return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    return img
+
+
+def apply_clahe(img: 'np.ndarray', clip_limit: float = 2.0, tile_grid: int = 8) -> 'np.ndarray':
+    """Enhance contrast using CLAHE (Contrast Limited Adaptive Histogram Equalization)"""
+    cv2 = get_cv2()
+    clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=(tile_grid, tile_grid))
+    return clahe.apply(to_grayscale(img))
+
+
+def gaussian_blur(img: 'np.ndarray', ksize: int = 3) -> 'np.ndarray':
+    """Apply Gaussian blur to reduce noise"""
+    cv2 = get_cv2()
+    ksize = ksize if ksize % 2 else ksize + 1
+    return cv2.GaussianBlur(img, (ksize, ksize), 0)
+
+
+def adaptive_threshold(img: 'np.ndarray', block_size: int = 11, c: float = 2) -> 'np.ndarray':
+    """Apply adaptive threshold for better text separation"""
+    cv2 = get_cv2()
+    block_size = block_size if block_size % 2 else block_size + 1
+    return cv2.adaptiveThreshold(to_grayscale(img), 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                 cv2.THRESH_BINARY, block_size, c)
+
+
+def morph_close(img: 'np.ndarray', kernel: int = 2) -> 'np.ndarray':
+    """Apply morphological closing to clean up"""
+    cv2, np = get_cv2(), get_numpy()
+    return cv2.morphologyEx(img, cv2.MORPH_CLOSE, np.ones((kernel, kernel), np.uint8))
+
+
+def sharpen(img: 'np.ndarray') -> 'np.ndarray':
+    """Sharpen the image"""
+    cv2, np = get_cv2(), get_numpy()
+    sharpen_kernel = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]])
+    return cv2.filter2D(img, -1, sharpen_kernel)
+
+
+# Step name -> step function (first argument is the image, the rest are keyword parameters)
+STEP_FUNCTIONS: Dict[str, Callable] = {
+    'grayscale': to_grayscale,
+    'clahe': apply_clahe,
+    'blur': gaussian_blur,
+    'threshold': adaptive_threshold,
+    'morph': morph_close,
+    'sharpen': sharpen,
+}
+
 
-        # Convert to grayscale
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+def _parse_value(value: str):
+    """Parse a step parameter value as int, float or string"""
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def parse_steps(spec: str) -> List[Tuple[str, Dict]]:
+    """Parse a pipeline spec such as "clahe:clip_limit=3,blur:ksize=5,threshold"
+
+    Steps are comma separated; parameters follow the step name, separated by ':'.
+    """
+    steps = []
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        name, *params = item.split(':')
+        name = name.strip().lower()
+        if name not in STEP_FUNCTIONS:
+            raise ValueError(f"Unknown preprocessing step: {name} "
+                             f"(available: {', '.join(STEP_FUNCTIONS)})")
+        kwargs = {}
+        for param in params:
+            key, _, value = param.partition('=')
+            kwargs[key.strip()] = _parse_value(value.strip())
+        steps.append((name, kwargs))
+    return steps
 
-        # Apply multiple preprocessing techniques
 
-        # 1. Enhance contrast using CLAHE (Contrast Limited Adaptive Histogram Equalization)
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-        enhanced = clahe.apply(gray)
+class PreprocessingPipeline:
+    """Composable in-memory image enhancement pipeline"""
 
-        # 2. Apply Gaussian blur to reduce noise
-        blurred = cv2.GaussianBlur(enhanced, (3, 3), 0)
+    def __init__(self, steps: Optional[Sequence] = None):
+        """
+        Args:
+            steps: Step names or (name, params) pairs, in order (default: DEFAULT_STEPS)
+        """
+        self.steps: List[Tuple[str, Dict]] = []
+        for step in (DEFAULT_STEPS if steps is None else steps):
+            if isinstance(step, str):
+                step = (step, {})
+            name, params = step
+            if name not in STEP_FUNCTIONS:
+                raise ValueError(f"Unknown preprocessing step: {name}")
+            self.steps.append((name, dict(params)))
 
-        # 3. Apply adaptive threshold for better text separation
-        adaptive_thresh = cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+        # Per-step timings of the last run
+        self.timer = StageTimer()
 
-        # 4. Apply morphological operations to clean up
-        kernel = np.ones((2,2), np.uint8)
-        morph = cv2.morphologyEx(adaptive_thresh, cv2.MORPH_CLOSE, kernel)
+    @classmethod
+    def from_spec(cls, spec: Optional[str]) -> 'PreprocessingPipeline':
+        """Build a pipeline from a spec string (None or empty: default steps)"""
+        if not spec:
+            return cls()
+        return cls(parse_steps(spec))
 
-        # 5. Sharpen the image
-        sharpen_kernel = np.array([[-1,-1,-1], [-1,9,-1], [-1,-1,-1]])
-        sharpened = cv2.filter2D(morph, -1, sharpen_kernel)
+    @classmethod
+    def from_env(cls) -> 'PreprocessingPipeline':
+        """Build a pipeline from the OCR_PREPROCESS_STEPS environment variable"""
+        return cls.from_spec(os.getenv('OCR_PREPROCESS_STEPS'))
 
-        # Save preprocessed image
-        base_name = os.path.splitext(image_path)[0]
-        preprocessed_path = f"{base_name}_enhanced.jpg"
-        cv2.imwrite(preprocessed_path, sharpened)
+    @property
+    def names(self) -> List[str]:
+        return [name for name, _ in self.steps]
 
-        return preprocessed_path
+    def run(self, img: 'np.ndarray') -> Optional['np.ndarray']:
+        """Run every step on a decoded image and return the result (None on failure)"""
+        self.timer.reset()
+        if get_cv2() is None or get_numpy() is None:
+            print("OpenCV not available. Skipping preprocessing.")
+            return None
 
-    except Exception as e:
         try:
-            print(f"Enhanced image preprocessing failed: {e}")
-        except UnicodeEncodeError:
-            print(f"Enhanced image preprocessing failed: [Unicode encoding error]")
+            for name, params in self.steps:
+                with self.timer.stage(name):
+                    img = STEP_FUNCTIONS[name](img, **params)
+            return img
+
+        except Exception as e:
+            try:
+                print(f"Enhanced image preprocessing failed: {e}")
+            except UnicodeEncodeError:
+                print(f"Enhanced image preprocessing failed: [Unicode encoding error]")
+            return None
+
+
+_default_pipeline: Optional[PreprocessingPipeline] = None
+
+
+def enhance_image(img: 'np.ndarray') -> Optional['np.ndarray']:
+    """Apply the default enhancement chain to a decoded image and return the result in memory"""
+    global _default_pipeline
+    if _default_pipeline is None:
+        _default_pipeline = PreprocessingPipeline()
+    return _default_pipeline.run(img)
+
+
+def preprocess_image(image_path: str) -> Optional['np.ndarray']:
+    """Load an image file and return its enhanced version (in memory, nothing is written)"""
+    cv2 = get_cv2()
+    if cv2 is None or get_numpy() is None:
+        print("OpenCV not available. Skipping preprocessing.")
+        return None
+
+    # The enhancement chain works on grayscale, so decode straight to one channel
+    decoded = decode_image(image_path, grayscale=True)
+    if decoded is None:
         return None
+    return enhance_image(decoded.image)
@@ -0,0 +1,138 @@
+"""
+Adaptive downscaling of receipt images before OCR
+OCR time grows with pixel count, while slip text only needs a few dozen pixels
+of height to be recognized, so large photos are scaled down before inference.
+"""
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .lazy_imports import get_cv2, get_numpy
+
+# Width the text height estimate works at (keeps it to a few milliseconds)
+_ESTIMATE_WIDTH = 480
+
+
+@dataclass
+class DownscaleConfig:
+    """Limits for the resize stage (0 disables a limit)"""
+    max_side: int = 1600            # longest side after scaling
+    target_text_height: int = 24    # typical text line height after scaling
+    min_side: int = 480             # never shrink the shortest side below this
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_side > 0 or self.target_text_height > 0
+
+    @classmethod
+    def from_env(cls) -> 'DownscaleConfig':
+        """Read OCR_MAX_SIDE, OCR_TARGET_TEXT_HEIGHT and OCR_MIN_SIDE"""
+        return cls(
+            max_side=int(os.getenv('OCR_MAX_SIDE', str(cls.max_side))),
+            target_text_height=int(os.getenv('OCR_TARGET_TEXT_HEIGHT', str(cls.target_text_height))),
+            min_side=int(os.getenv('OCR_MIN_SIDE', str(cls.min_side)))
+        )
+
+
+def estimate_text_height(img: 'np.ndarray') -> Optional[float]:
+    """Estimate the median text line height (in pixels) from the row ink profile
+
+    Returns None when no text-like rows are found.
+    """
+    cv2, np = get_cv2(), get_numpy()
+    if cv2 is None or np is None:
+        return None
+
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    height, width = gray.shape[:2]
+    factor = min(1.0, _ESTIMATE_WIDTH / float(width))
+    if factor < 1.0:
+        gray = cv2.resize(gray, (int(width * factor), max(1, int(height * factor))),
+                          interpolation=cv2.INTER_AREA)
+
+    # Dark text on a light background (or the inverse) -> ink = 1
+    _, ink = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    if ink.mean() > 0.5:
+        ink = 1 - ink
+
+    rows = ink.sum(axis=1) > max(2, ink.shape[1] * 0.01)
+
+    # Lengths of consecutive text rows
+    runs: List[int] = []
+    run = 0
+    for is_text in rows:
+        if is_text:
+            run += 1
+        elif run:
+            runs.append(run)
+            run = 0
+    if run:
+        runs.append(run)
+
+    runs = [r for r in runs if r >= 2]
+    if not runs:
+        return None
+    return float(np.median(runs)) / factor
+
+
+def compute_scale(shape: Sequence[int], config: DownscaleConfig,
+                  text_height: Optional[float] = None) -> float:
+    """Scale factor (<= 1.0, never upscales) that satisfies the configured limits"""
+    height, width = shape[:2]
+    scale = 1.0
+
+    if config.max_side > 0:
+        scale = min(scale, config.max_side / float(max(height, width)))
+    if config.target_text_height > 0 and text_height:
+        scale = min(scale, config.target_text_height / text_height)
+    if config.min_side > 0:
+        # The minimum side wins over the text height target, but not over max_side
+        floor = min(1.0, config.min_side / float(min(height, width)))
+        if config.max_side > 0:
+            floor = min(floor, config.max_side / float(max(height, width)))
+        scale = max(scale, floor)
+
+    return min(1.0, scale)
+
+
+def downscale_image(img: 'np.ndarray', config: DownscaleConfig) -> Tuple['np.ndarray', Dict]:
+    """Scale an image down for OCR
+
+    Returns:
+        (image, info) where info holds the original and resized size, the scale
+        factor and the fraction of pixels removed
+    """
+    height, width = img.shape[:2]
+    info = {
+        'original_size': [width, height],
+        'resized_size': [width, height],
+        'scale': 1.0,
+        'text_height': None,
+        'pixel_reduction': 0.0
+    }
+
+    cv2 = get_cv2()
+    if cv2 is None or not config.enabled:
+        return img, info
+
+    text_height = estimate_text_height(img) if config.target_text_height > 0 else None
+    scale = compute_scale(img.shape, config, text_height)
+    info['text_height'] = round(text_height, 1) if text_height else None
+    if scale >= 0.99:
+        return img, info
+
+    new_width = max(1, int(round(width * scale)))
+    new_height = max(1, int(round(height * scale)))
+    resized = cv2.resize(img, (new_width, new_height), interpolation=cv2.INTER_AREA)
+
+    info['resized_size'] = [new_width, new_height]
+    info['scale'] = round(scale, 4)
+    info['pixel_reduction'] = round(1.0 - (new_width * new_height) / float(width * height), 4)
+    return resized, info
+
+
+def scale_box(box: Sequence[Sequence[float]], scale: float) -> List[List[float]]:
+    """Map box points from the resized image back to original image coordinates"""
+    if scale == 1.0:
+        return [[float(x), float(y)] for x, y in box]
+    return [[float(x) / scale, float(y) / scale] for x, y in box]
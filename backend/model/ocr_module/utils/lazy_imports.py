@@ -0,0 +1,35 @@
+"""
+Deferred imports of the heavy image libraries
+OpenCV and NumPy are only loaded on first use so that module imports,
+--help and /health stay fast.
+"""
+import importlib
+import time
+from typing import Dict, Optional
+
+# Module name -> loaded module (None when not installed)
+_loaded: Dict[str, Optional[object]] = {}
+# Module name -> seconds spent importing it
+import_times: Dict[str, float] = {}
+
+
+def optional_import(name: str):
+    """Import a module on first use and cache it (None if it is not installed)"""
+    if name not in _loaded:
+        start = time.perf_counter()
+        try:
+            _loaded[name] = importlib.import_module(name)
+        except ImportError:
+            _loaded[name] = None
+        import_times[name] = time.perf_counter() - start
+    return _loaded[name]
+
+
+def get_cv2():
+    """OpenCV module, or None if opencv-python is not installed"""
+    return optional_import('cv2')
+
+
+def get_numpy():
+    """NumPy module, or None if numpy is not installed"""
+    return optional_import('numpy')
@@ -0,0 +1,32 @@
+"""
+Stage timing utilities for profiling the extraction pipeline
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+
+class StageTimer:
+    """Accumulates wall-clock time per named pipeline stage"""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    def reset(self) -> None:
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block of code under the given stage name (repeated stages accumulate)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def to_dict(self) -> Dict[str, float]:
+        """Stage durations in milliseconds"""
+        return {name: round(seconds * 1000, 2) for name, seconds in self.stages.items()}